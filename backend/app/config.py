@@ -6,4 +6,175 @@ load_dotenv()
 class Settings:
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+    # Provider endpoints (override to point at a proxy or mock upstream)
+    GROQ_CHAT_URL = os.getenv("GROQ_CHAT_URL", "https://api.groq.com/openai/v1/chat/completions")
+    OPENAI_CHAT_URL = os.getenv("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+    HF_CHAT_URL = os.getenv("HF_CHAT_URL", "https://api-inference.huggingface.co/models")
+
+    # Upstream HTTP client pool (one long-lived pool per provider)
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+    HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "1000"))
+    HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "100"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"
+
+    # Self-hosted models (provider "local"); user models may set their own
+    # `base_url` / `api` via POST /models
+    LOCAL_BASE_URL = os.getenv("LOCAL_BASE_URL", "http://localhost:11434")
+    # ollama: native /api/chat; openai: OpenAI-compatible server whose
+    # base URL is the API root, e.g. http://localhost:8080/v1
+    LOCAL_API = os.getenv("LOCAL_API", "ollama")
+    # How long Ollama keeps a model loaded after a request (-1 = forever)
+    LOCAL_KEEP_ALIVE = os.getenv("LOCAL_KEEP_ALIVE", "30m")
+    # Load registered Ollama models at startup
+    LOCAL_PRELOAD = os.getenv("LOCAL_PRELOAD", "1") == "1"
+    LOCAL_PRELOAD_TIMEOUT = float(os.getenv("LOCAL_PRELOAD_TIMEOUT", "300"))
+    # Concurrent requests per local backend server
+    LOCAL_MAX_CONCURRENCY = int(os.getenv("LOCAL_MAX_CONCURRENCY", "4"))
+
+    # Config / model store
+    # json: one file per store (single worker); sqlite: shared WAL database
+    STORE_BACKEND = os.getenv("STORE_BACKEND", "json")
+    STORE_SQLITE_PATH = os.getenv("STORE_SQLITE_PATH", "~/.project_x.db")
+    # How often cached reads are re-checked against the backing store
+    STORE_REVALIDATE_SECONDS = float(os.getenv("STORE_REVALIDATE_SECONDS", "1"))
+
+    # Server-side conversations (SQLite WAL) and how many threads are
+    # kept in memory
+    CONVERSATIONS_DB_PATH = os.getenv("CONVERSATIONS_DB_PATH", "~/.project_x_conversations.db")
+    CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "128"))
+    # Full-text index: new messages are indexed in the background, in
+    # batches of SEARCH_INDEX_BATCH, every SEARCH_INDEX_INTERVAL seconds
+    SEARCH_INDEX_INTERVAL = float(os.getenv("SEARCH_INDEX_INTERVAL", "1"))
+    SEARCH_INDEX_BATCH = int(os.getenv("SEARCH_INDEX_BATCH", "1000"))
+
+    # Exact-match chat response cache (opt-in)
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    # Optional on-disk tier, e.g. ~/.project_x_cache.db (empty = memory only)
+    RESPONSE_CACHE_DISK_PATH = os.getenv("RESPONSE_CACHE_DISK_PATH", "")
+
+    # Coalesce identical in-flight chat requests into one upstream call
+    SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "1") == "1"
+    # A shared stream stops reading upstream while its slowest
+    # subscriber is this many events behind
+    SINGLEFLIGHT_STREAM_MAX_LAG = int(os.getenv("SINGLEFLIGHT_STREAM_MAX_LAG", "64"))
+
+    # Priority scheduler in front of upstream calls: at most
+    # SCHEDULER_MAX_CONCURRENCY run at once, the rest wait in bounded
+    # per-class queues drained in proportion to the class weights.
+    # A request whose queue wait would exceed its class deadline
+    # (seconds) is shed with 503 + Retry-After
+    SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "64"))
+    SCHEDULER_INTERACTIVE_WEIGHT = float(os.getenv("SCHEDULER_INTERACTIVE_WEIGHT", "8"))
+    SCHEDULER_INTERACTIVE_QUEUE = int(os.getenv("SCHEDULER_INTERACTIVE_QUEUE", "256"))
+    SCHEDULER_INTERACTIVE_DEADLINE = float(os.getenv("SCHEDULER_INTERACTIVE_DEADLINE", "10"))
+    SCHEDULER_BATCH_WEIGHT = float(os.getenv("SCHEDULER_BATCH_WEIGHT", "1"))
+    SCHEDULER_BATCH_QUEUE = int(os.getenv("SCHEDULER_BATCH_QUEUE", "2048"))
+    SCHEDULER_BATCH_DEADLINE = float(os.getenv("SCHEDULER_BATCH_DEADLINE", "120"))
+    SCHEDULER_VERIFY_WEIGHT = float(os.getenv("SCHEDULER_VERIFY_WEIGHT", "2"))
+    SCHEDULER_VERIFY_QUEUE = int(os.getenv("SCHEDULER_VERIFY_QUEUE", "16"))
+    SCHEDULER_VERIFY_DEADLINE = float(os.getenv("SCHEDULER_VERIFY_DEADLINE", "10"))
+
+    # POST /chat/batch
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+    # Model health (POST /config/verify, SystemState): a verification
+    # result per registry entry is reused for HEALTH_TTL seconds, and
+    # every HEALTH_CHECK_INTERVAL seconds results about to expire are
+    # re-probed in the background (0 = no background checks)
+    HEALTH_TTL = float(os.getenv("HEALTH_TTL", "300"))
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "60"))
+    # Background checks skip providers probed with a completion
+    # (HuggingFace) unless enabled: each one costs a billed request
+    HEALTH_CHECK_COMPLETIONS = os.getenv("HEALTH_CHECK_COMPLETIONS", "0") == "1"
+
+    # WebSocket transport (/ws): concurrent streams per connection, and
+    # bytes queued per connection before its streams wait for the
+    # client to read; a client that reads nothing for WS_SEND_TIMEOUT
+    # seconds is disconnected. SystemState is checked for changes
+    # every WS_STATE_INTERVAL seconds
+    WS_MAX_STREAMS = int(os.getenv("WS_MAX_STREAMS", "16"))
+    WS_SEND_BUFFER = int(os.getenv("WS_SEND_BUFFER", str(1024 * 1024)))
+    WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "30"))
+    WS_STATE_INTERVAL = float(os.getenv("WS_STATE_INTERVAL", "1"))
+
+    # Background chat jobs (POST /chat/jobs), kept in SQLite (WAL) so
+    # they survive restarts. JOBS_CONCURRENCY workers per process;
+    # finished jobs are kept JOBS_RESULT_TTL seconds, and at most
+    # JOBS_MAX_STORED jobs in total
+    JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "~/.project_x_jobs.db")
+    JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "4"))
+    JOBS_MAX_STORED = int(os.getenv("JOBS_MAX_STORED", "10000"))
+    JOBS_RESULT_TTL = float(os.getenv("JOBS_RESULT_TTL", "3600"))
+    # Upstream timeout for job calls (no client waiting on them)
+    JOBS_UPSTREAM_TIMEOUT = float(os.getenv("JOBS_UPSTREAM_TIMEOUT", "300"))
+    # Running jobs hold a lease renewed while they run; a job whose
+    # worker died is run again once its lease lapses, at most
+    # JOBS_MAX_ATTEMPTS times in all
+    JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "30"))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    # How often workers and long polls look for changes made by other
+    # processes, and the longest GET /chat/jobs/{id}?wait=
+    JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+    JOBS_MAX_WAIT = float(os.getenv("JOBS_MAX_WAIT", "60"))
+
+    # Context packing: history sent per request is trimmed to the model's
+    # context_window (else CONTEXT_DEFAULT_WINDOW) minus the completion
+    # allowance, and never more than CONTEXT_MAX_PROMPT_TOKENS
+    CONTEXT_DEFAULT_WINDOW = int(os.getenv("CONTEXT_DEFAULT_WINDOW", "8192"))
+    CONTEXT_MAX_PROMPT_TOKENS = int(os.getenv("CONTEXT_MAX_PROMPT_TOKENS", "8192"))
+    # Summarise dropped turns into one system message (extra upstream call)
+    CONTEXT_SUMMARIZE = os.getenv("CONTEXT_SUMMARIZE", "0") == "1"
+    CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "256"))
+    CONTEXT_ESTIMATOR_CACHE = int(os.getenv("CONTEXT_ESTIMATOR_CACHE", "4096"))
+
+    # Upstream rate limiting (0 = no local budget)
+    RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "0"))
+    RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", "0"))
+    # Per-provider budgets, e.g. RATE_LIMIT_GROQ_RPM / RATE_LIMIT_OPENAI_TPM
+    RATE_LIMIT_OVERRIDES = {
+        k: float(v) for k, v in os.environ.items()
+        if k.startswith("RATE_LIMIT_") and k.endswith(("_RPM", "_TPM"))
+        and k not in ("RATE_LIMIT_RPM", "RATE_LIMIT_TPM")
+    }
+    RATE_LIMIT_DEFAULT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_DEFAULT_COMPLETION_TOKENS", "256"))
+    RATE_LIMIT_MAX_QUEUE = int(os.getenv("RATE_LIMIT_MAX_QUEUE", "256"))
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+    RATE_LIMIT_INITIAL_CONCURRENCY = int(os.getenv("RATE_LIMIT_INITIAL_CONCURRENCY", "32"))
+    RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "512"))
+    RATE_LIMIT_LATENCY_FACTOR = float(os.getenv("RATE_LIMIT_LATENCY_FACTOR", "2.0"))
+    RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+    RATE_LIMIT_BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "0.5"))
+    RATE_LIMIT_BACKOFF_MAX = float(os.getenv("RATE_LIMIT_BACKOFF_MAX", "20"))
+
+    # Hedged requests: delay before racing a fallback when the primary
+    # has too few samples for a p95
+    HEDGE_DEFAULT_DELAY_MS = float(os.getenv("HEDGE_DEFAULT_DELAY_MS", "2000"))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+    # Auto routing: weight of each new latency sample in the per-model
+    # averages, and how long those stay trusted before the model is
+    # measured again; "balanced" requests with prompts up to
+    # ROUTING_AUTO_SHORT_PROMPT_TOKENS go to the fastest model
+    ROUTING_EWMA_ALPHA = float(os.getenv("ROUTING_EWMA_ALPHA", "0.2"))
+    ROUTING_AUTO_STALE_SECONDS = float(os.getenv("ROUTING_AUTO_STALE_SECONDS", "600"))
+    ROUTING_AUTO_SHORT_PROMPT_TOKENS = int(os.getenv("ROUTING_AUTO_SHORT_PROMPT_TOKENS", "1000"))
+    ROUTING_AUTO_DEFAULT_CLASS = os.getenv("ROUTING_AUTO_DEFAULT_CLASS", "balanced")
+
+    # Per provider/model circuit breaker
+    BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+    BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", "5"))
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+    # Sampled profiling of slow requests (PROFILE_SAMPLE_RATE=0 disables)
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "~/.project_x_profiles")
+
 settings = Settings()
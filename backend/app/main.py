@@ -1,17 +1,32 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import chat, models, config, system, providers
+from app.routes import chat, conversations, models, config, system, providers, metrics, proxy, ws
 from app.manifest.system import system_state
+from app.services.clients import close_clients
+from app.config import settings
+from app.services.llm import preload_local_models, warm_up
+from app.services.health import run_health_checks
+from app.services.jobs import run_job_workers
+from app.services.search import run_search_indexer
+from app.services.metrics import MetricsMiddleware
+from app.utils.profiling import SlowRequestProfiler
+from app.utils.timing import ServerTimingMiddleware
 
 app = FastAPI()
 
 # Routers (each included ONCE)
 app.include_router(chat.router)
+app.include_router(conversations.router)
 app.include_router(models.router)
 app.include_router(config.router)
 app.include_router(system.router)
 app.include_router(providers.router)
+app.include_router(metrics.router)
+app.include_router(proxy.router)
+app.include_router(ws.router)
 
 # Middleware
 app.add_middleware(
@@ -19,13 +34,49 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "Location"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(SlowRequestProfiler)
 
 @app.on_event("startup")
-def load_system_state():
+async def load_system_state():
     system_state.load()
     print(system_state.as_dict())
 
+    # Open pooled upstream connections before the first chat request
+    await warm_up(system_state.registered_providers())
+
+    # Conversation search index is filled in the background
+    app.state.search_indexer = asyncio.ensure_future(run_search_indexer())
+
+    # Registered models are verified in the background
+    app.state.health_checks = asyncio.ensure_future(run_health_checks())
+
+    # Background chat jobs (POST /chat/jobs)
+    app.state.job_workers = asyncio.ensure_future(run_job_workers(chat.complete_chat))
+
+    # Model loads can take a while: don't hold up startup
+    if settings.LOCAL_PRELOAD:
+        app.state.preload = asyncio.ensure_future(
+            preload_local_models(system_state.registered_models("local"))
+        )
+
+@app.on_event("shutdown")
+async def close_upstream_clients():
+    for name in ("preload", "search_indexer", "health_checks", "job_workers"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+
+    # Let interrupted jobs go back to the queue
+    job_workers = getattr(app.state, "job_workers", None)
+    if job_workers is not None:
+        await asyncio.wait({job_workers})
+
+    await close_clients()
+
 @app.get("/")
 def health():
     return {"status": "ok"}
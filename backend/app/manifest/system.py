@@ -1,7 +1,17 @@
-from typing import Optional, Dict, Any
-from app.persistence.config_store import load_config
+from typing import Optional, Dict, Any, Hashable
+from app.persistence.config_store import load_config, config_version
+from app.services.breaker import breaker_stats
+from app.services.cache import response_cache
+from app.services.health import health_cache
+from app.services.llm import call_flight, stream_flight
+from app.services.ratelimit import limiter_stats
+from app.registry.providers import requires_api_key
+from app.services.routing import latency_tracker, stream_latency_tracker
+from app.services.scheduler import scheduler
 import uuid
 
+_UNLOADED = object()
+
 
 class SystemState:
     """
@@ -20,13 +30,17 @@ class SystemState:
         self._active_model_id: Optional[str] = None
         self._models: Dict[str, Dict[str, Any]] = {}
 
+        # Store version this state was loaded from
+        self._version: Hashable = _UNLOADED
+
     def load(self) -> None:
         """
         Load configuration from disk into memory.
-        Called once at backend startup.
+        Called at backend startup and after config writes.
         Supports both legacy single-model config
         and new multi-model registry config.
         """
+        self._version = config_version()
         config = load_config()
 
         if not config:
@@ -76,6 +90,14 @@ class SystemState:
 
         self._apply_active_model(self._models[implicit_id])
 
+    def refresh(self) -> None:
+        """
+        Reload only if the stored config changed since the last load
+        (possibly written by another worker process).
+        """
+        if config_version() != self._version:
+            self.load()
+
     def _apply_active_model(self, model_entry: Dict[str, Any]) -> None:
         """
         Populate public runtime fields from an active model entry.
@@ -88,7 +110,7 @@ class SystemState:
         self.configured = bool(
             self.provider and
             self.model and
-            self.api_key_present
+            (self.api_key_present or not requires_api_key(self.provider))
         )
 
     def _reset(self) -> None:
@@ -100,6 +122,24 @@ class SystemState:
         self._active_model_id = None
         self._models = {}
 
+    def registered_providers(self) -> set[str]:
+        """
+        Providers referenced by any model in the registry.
+        """
+        return {
+            m["provider"] for m in self._models.values()
+            if m.get("provider")
+        }
+
+    def registered_models(self, provider: str) -> set[str]:
+        """
+        Model names registered for a provider.
+        """
+        return {
+            m["model"] for m in self._models.values()
+            if m.get("provider") == provider and m.get("model")
+        }
+
     def as_dict(self):
         return {
             "configured": self.configured,
@@ -108,6 +148,18 @@ class SystemState:
             "display_name": self.display_name(),
             "api_key_present": self.api_key_present,
             "auth_ok": self.auth_ok,
+            "cache": response_cache.stats(),
+            "singleflight": {
+                "in_flight": call_flight.in_flight() + stream_flight.in_flight(),
+                "coalesced": call_flight.coalesced + stream_flight.coalesced,
+            },
+            "rate_limits": limiter_stats(),
+            "scheduler": scheduler.stats(),
+            "latency": latency_tracker.stats(),
+            "stream_latency": stream_latency_tracker.stats(),
+            "breakers": breaker_stats(),
+            # Latest verification result per registry entry id
+            "health": health_cache.report(self._models),
         }
 
     def display_name(self) -> str | None:
@@ -0,0 +1,333 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.persistence.cache import CachedJSONFile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+
+# Legacy JSON file per store key (also the JSON backend's layout)
+JSON_PATHS: Dict[str, Path] = {
+    "config": Path.home() / ".project_x_config.json",
+    "user_models": Path.home() / ".project_x_models.json",
+}
+
+SQLITE_PATH = Path(settings.STORE_SQLITE_PATH).expanduser()
+
+
+class StoreBackend:
+    """
+    Key → JSON document storage used by config_store / model_store.
+    Implementations must make `write` / `update` atomic and keep
+    `version(key)` changing whenever any process modifies the key.
+    """
+
+    def read(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def write(self, key: str, value: Any) -> bool:
+        raise NotImplementedError
+
+    def update(self, key: str, fn: Callable[[Any], Any]) -> Any:
+        """
+        Atomically replace the value with fn(current) and return it.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def version(self, key: str) -> Hashable:
+        raise NotImplementedError
+
+
+class JSONFileBackend(StoreBackend):
+    """
+    One JSON file per key, cached in memory (see CachedJSONFile).
+    Writes are atomic renames; read-modify-write is serialised across
+    processes with an advisory lock file. Writes block while another
+    process holds it: async callers run them via asyncio.to_thread.
+    """
+
+    def __init__(self, paths: Dict[str, Path]):
+        self._files = {key: CachedJSONFile(path) for key, path in paths.items()}
+
+    def read(self, key: str) -> Any:
+        return self._files[key].read()
+
+    def write(self, key: str, value: Any) -> bool:
+        with self._locked(key):
+            return self._files[key].write(value)
+
+    def update(self, key: str, fn: Callable[[Any], Any]) -> Any:
+        f = self._files[key]
+
+        with self._locked(key):
+            f.invalidate()
+            value = fn(f.read())
+            f.write(value)
+
+        return copy.deepcopy(value)
+
+    def delete(self, key: str) -> None:
+        with self._locked(key):
+            self._files[key].delete()
+
+    def version(self, key: str) -> Hashable:
+        return self._files[key].signature()
+
+    @contextmanager
+    def _locked(self, key: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+
+        path = self._files[key].path
+        lock_path = path.with_name(path.name + ".lock")
+
+        with open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class SQLiteBackend(StoreBackend):
+    """
+    SQLite (WAL) key/value store shared by all worker processes.
+
+    Every write stamps the row with a new, database-wide increasing
+    version, so `version(key)` is a cheap cross-process change signal.
+    Deletes leave a NULL tombstone so the version keeps moving.
+    Values are cached in memory and revalidated against the stored
+    version at most every STORE_REVALIDATE_SECONDS.
+
+    Keys missing from the database are imported once from their legacy
+    JSON file (if any) on first access.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        legacy_paths: Optional[Dict[str, Path]] = None,
+        revalidate_after: Optional[float] = None,
+    ):
+        self.path = path
+        self.legacy_paths = legacy_paths or {}
+        self.revalidate_after = (
+            settings.STORE_REVALIDATE_SECONDS
+            if revalidate_after is None else revalidate_after
+        )
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # key -> (version, value, checked_at)
+        self._cache: Dict[str, Tuple[Optional[int], Any, float]] = {}
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT,"
+                " version INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    # ---- StoreBackend ----
+
+    def read(self, key: str) -> Any:
+        with self._lock:
+            cached = self._cache.get(key)
+            now = time.monotonic()
+
+            if cached and now - cached[2] < self.revalidate_after:
+                return copy.deepcopy(cached[1])
+
+            row = self._conn().execute(
+                "SELECT version, value FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._migrate(key)
+                row = self._conn().execute(
+                    "SELECT version, value FROM kv WHERE key = ?", (key,)
+                ).fetchone()
+
+            version, raw = row if row else (None, None)
+
+            if cached and cached[0] == version:
+                value = cached[1]
+            else:
+                value = json.loads(raw) if raw is not None else None
+
+            self._cache[key] = (version, value, now)
+            return copy.deepcopy(value)
+
+    def write(self, key: str, value: Any) -> bool:
+        with self._transaction() as conn:
+            current = self._select(conn, key)
+            if current is not None and current == value:
+                return False
+
+            version = self._put(conn, key, value)
+
+        self._remember(key, version, value)
+        return True
+
+    def update(self, key: str, fn: Callable[[Any], Any]) -> Any:
+        with self._transaction() as conn:
+            value = fn(self._select(conn, key))
+            version = self._put(conn, key, value)
+
+        self._remember(key, version, value)
+        return copy.deepcopy(value)
+
+    def delete(self, key: str) -> None:
+        with self._transaction() as conn:
+            version = self._put(conn, key, None)
+
+        self._remember(key, version, None)
+
+    def version(self, key: str) -> Hashable:
+        row = self._conn().execute(
+            "SELECT version FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        version = row[0] if row else None
+
+        # A newer version also drops the cached copy
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] != version:
+                del self._cache[key]
+
+        return version
+
+    # ---- Internals ----
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front so read-modify-write
+        # sequences from different workers cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _select(self, conn: sqlite3.Connection, key: str) -> Any:
+        row = conn.execute(
+            "SELECT value FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None and self._import_legacy(conn, key):
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def _put(self, conn: sqlite3.Connection, key: str, value: Any) -> int:
+        (version,) = conn.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM kv"
+        ).fetchone()
+
+        raw = json.dumps(value) if value is not None else None
+
+        conn.execute(
+            "INSERT INTO kv (key, value, version, updated_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET"
+            " value = excluded.value,"
+            " version = excluded.version,"
+            " updated_at = excluded.updated_at",
+            (key, raw, version, time.time()),
+        )
+        return version
+
+    def _remember(self, key: str, version: int, value: Any) -> None:
+        with self._lock:
+            self._cache[key] = (version, copy.deepcopy(value), time.monotonic())
+
+    def _migrate(self, key: str) -> None:
+        with self._transaction() as conn:
+            self._import_legacy(conn, key)
+
+    def _import_legacy(self, conn: sqlite3.Connection, key: str) -> bool:
+        """
+        Promote a legacy JSON file into the database (persisted once).
+        Must run inside a transaction.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if exists:
+            return False
+
+        legacy = self.legacy_paths.get(key)
+        if not legacy or not legacy.exists():
+            return False
+
+        value = json.loads(legacy.read_text())
+
+        (version,) = conn.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM kv"
+        ).fetchone()
+        conn.execute(
+            "INSERT INTO kv (key, value, version, updated_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), version, time.time()),
+        )
+        return True
+
+
+_backend: Optional[StoreBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StoreBackend:
+    """
+    Return the configured store backend (STORE_BACKEND=json|sqlite).
+    """
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            if settings.STORE_BACKEND == "sqlite":
+                _backend = SQLiteBackend(SQLITE_PATH, legacy_paths=JSON_PATHS)
+            elif settings.STORE_BACKEND == "json":
+                _backend = JSONFileBackend(JSON_PATHS)
+            else:
+                raise RuntimeError(
+                    f"Unknown STORE_BACKEND: {settings.STORE_BACKEND}"
+                )
+
+        return _backend
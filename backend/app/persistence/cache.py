@@ -0,0 +1,132 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from app.config import settings
+
+
+class CachedJSONFile:
+    """
+    JSON file with an in-memory copy.
+    Reads are served from memory; the file is re-read only when its
+    inode / mtime / size change (checked at most every
+    `revalidate_after` seconds) or after an in-process write.
+    Writes of an unchanged value are skipped.
+    """
+
+    def __init__(self, path: Path, revalidate_after: Optional[float] = None):
+        self.path = path
+        self.revalidate_after = (
+            settings.STORE_REVALIDATE_SECONDS
+            if revalidate_after is None else revalidate_after
+        )
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._data: Any = None
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._checked_at = 0.0
+
+    def read(self) -> Any:
+        """
+        Return a private copy of the file contents (None if missing).
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            if not self._loaded or now - self._checked_at >= self.revalidate_after:
+                self._revalidate()
+                self._checked_at = now
+
+            return copy.deepcopy(self._data)
+
+    def write(self, data: Any) -> bool:
+        """
+        Persist data. Returns False if it equals the cached value
+        and nothing was written.
+        """
+        with self._lock:
+            # Compare against the file as it is now: another process
+            # may have changed it since the last revalidation
+            self._revalidate()
+            self._checked_at = time.monotonic()
+
+            if self._data is not None and self._data == data:
+                return False
+
+            self._atomic_write(json.dumps(data, indent=2))
+
+            self._data = copy.deepcopy(data)
+            self._stat = self._file_stat()
+            self._loaded = True
+            self._checked_at = time.monotonic()
+            return True
+
+    def delete(self) -> None:
+        with self._lock:
+            if self.path.exists():
+                self.path.unlink()
+
+            self._data = None
+            self._stat = None
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Current on-disk identity (inode, mtime, size); None if missing.
+        A changed identity also drops the cached copy.
+        """
+        stat = self._file_stat()
+
+        with self._lock:
+            if self._loaded and stat != self._stat:
+                self._loaded = False
+
+        return stat
+
+    def invalidate(self) -> None:
+        """
+        Force the next read to go back to disk.
+        """
+        with self._lock:
+            self._loaded = False
+
+    def _atomic_write(self, text: str) -> None:
+        # Write a sibling temp file and rename over the target so
+        # readers never observe a partially written file
+        fd, tmp = tempfile.mkstemp(
+            dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _revalidate(self) -> None:
+        stat = self._file_stat()
+
+        if self._loaded and stat == self._stat:
+            return
+
+        self._data = json.loads(self.path.read_text()) if stat else None
+        self._stat = stat
+        self._loaded = True
+
+    def _file_stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
@@ -1,38 +1,57 @@
-import json
-from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Hashable
 import uuid
 
-CONFIG_PATH = Path.home() / ".project_x_config.json"
+from app.persistence.backends import JSON_PATHS, get_backend
+from app.utils.timing import span
+
+CONFIG_PATH = JSON_PATHS["config"]
+
+_KEY = "config"
 
 
 def load_config() -> Optional[Dict[str, Any]]:
-    if not CONFIG_PATH.exists():
-        return None
-    return json.loads(CONFIG_PATH.read_text())
+    # Served from the backend's in-memory cache
+    with span("config_read"):
+        return get_backend().read(_KEY)
 
 
 def save_config(data: Dict[str, Any]) -> None:
-    CONFIG_PATH.write_text(json.dumps(data, indent=2))
+    with span("config_write"):
+        get_backend().write(_KEY, data)
 
 
 def reset_config() -> None:
-    if CONFIG_PATH.exists():
-        CONFIG_PATH.unlink()
+    get_backend().delete(_KEY)
+
+
+def config_version() -> Hashable:
+    """
+    Opaque token that changes whenever any worker modifies the config.
+    """
+    return get_backend().version(_KEY)
 
 
 def update_config(patch: Dict[str, Any]) -> Dict[str, Any]:
     """
     Merge partial updates into existing config (shallow merge).
     Backward-compatible with legacy single-model config.
+    No write happens if the patch does not change anything.
     """
     config = load_config()
     if not config:
         raise RuntimeError("Config not initialized")
 
-    config.update(patch)
-    save_config(config)
-    return config
+    if all(config.get(k) == v for k, v in patch.items()):
+        return config
+
+    def apply(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not current:
+            raise RuntimeError("Config not initialized")
+        current.update(patch)
+        return current
+
+    with span("config_write"):
+        return get_backend().update(_KEY, apply)
 
 
 # ----------------------------
@@ -90,12 +109,75 @@ def update_active_model(config: Dict[str, Any], patch: Dict[str, Any]) -> Dict[s
     """
     Apply a shallow patch to the active model entry and persist.
     """
-    models = config.get("models")
-    active_id = config.get("active_model_id")
+    def apply(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        models = (current or {}).get("models")
+        active_id = (current or {}).get("active_model_id")
+
+        if not models or not active_id or active_id not in models:
+            raise RuntimeError("Active model not found")
+
+        models[active_id].update(patch)
+        return current
+
+    # Applied to the stored config so concurrent workers don't lose updates
+    with span("config_write"):
+        updated = get_backend().update(_KEY, apply)
+
+    config.clear()
+    config.update(updated)
+    return config
+
+
+def add_registry_model(entry: Dict[str, Any]) -> str:
+    """
+    Add a model entry to the registry (not activated) and persist.
+    Returns the new entry id.
+    """
+    model_id = str(uuid.uuid4())
+
+    def apply(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not current or "models" not in current:
+            raise RuntimeError("Config not initialized")
+
+        current["models"][model_id] = entry
+        return current
+
+    get_backend().update(_KEY, apply)
+    return model_id
+
+
+def update_registry_models(patches: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Apply shallow patches to registry entries by id and persist.
+    Ids no longer in the registry are skipped.
+    """
+    def apply(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not current or "models" not in current:
+            raise RuntimeError("Config not initialized")
+
+        for model_id, patch in patches.items():
+            if model_id in current["models"]:
+                current["models"][model_id].update(patch)
+        return current
+
+    with span("config_write"):
+        get_backend().update(_KEY, apply)
+
+
+def set_active_model(config: Dict[str, Any], model_id: str) -> Dict[str, Any]:
+    """
+    Make a registry entry the active model and persist.
+    """
+    def apply(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not current or model_id not in current.get("models", {}):
+            raise RuntimeError("Model not in registry")
+
+        current["active_model_id"] = model_id
+        return current
 
-    if not models or not active_id or active_id not in models:
-        raise RuntimeError("Active model not found")
+    with span("config_write"):
+        updated = get_backend().update(_KEY, apply)
 
-    models[active_id].update(patch)
-    save_config(config)
+    config.clear()
+    config.update(updated)
     return config
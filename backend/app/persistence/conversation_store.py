@@ -0,0 +1,500 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+CONVERSATIONS_PATH = Path(settings.CONVERSATIONS_DB_PATH).expanduser()
+
+_TITLE_LENGTH = 80
+
+# Search snippet highlighting and length (tokens)
+_HIGHLIGHT_OPEN = "<mark>"
+_HIGHLIGHT_CLOSE = "</mark>"
+_SNIPPET_TOKENS = 16
+
+
+class ConversationStore:
+    """
+    Conversations and their messages in SQLite (WAL), shared by all
+    worker processes.
+
+    The full message list of recently used conversations is kept in an
+    LRU cache. A cached thread is checked against the stored message
+    count on every read; messages appended by other workers are loaded
+    incrementally (only the missing tail).
+
+    Message contents are searchable through an FTS5 index that is
+    filled in batches by `index_pending` (see app.services.search),
+    so appends never pay for indexing.
+    """
+
+    def __init__(self, path: Path, cache_size: Optional[int] = None):
+        self.path = path
+        self.cache_size = (
+            settings.CONVERSATION_CACHE_SIZE if cache_size is None else cache_size
+        )
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # conversation id -> messages (in seq order)
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " id TEXT PRIMARY KEY,"
+                " title TEXT,"
+                " message_count INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_updated"
+                " ON conversations (updated_at DESC)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY,"
+                " conversation_id TEXT NOT NULL"
+                "  REFERENCES conversations (id) ON DELETE CASCADE,"
+                " seq INTEGER NOT NULL,"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " provider TEXT,"
+                " model TEXT,"
+                " created_at REAL NOT NULL,"
+                " UNIQUE (conversation_id, seq))"
+            )
+
+        # External-content FTS5 table over messages.content; fts_state
+        # records the last message id that has been indexed
+        self.search_enabled = True
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+                    " content, content='messages', content_rowid='id',"
+                    " tokenize='unicode61 remove_diacritics 2', prefix='3')"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS fts_state ("
+                    " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                    " last_id INTEGER NOT NULL)"
+                )
+                conn.execute("INSERT OR IGNORE INTO fts_state (id, last_id) VALUES (0, 0)")
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5
+            self.search_enabled = False
+
+    # ---- Conversations ----
+
+    def create(
+        self,
+        title: Optional[str] = None,
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        conversation_id = str(uuid.uuid4())
+        now = time.time()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO conversations (id, title, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                (conversation_id, title, now, now),
+            )
+            if messages:
+                self._insert(conn, conversation_id, 0, messages, now, title=title)
+
+        return self.get(conversation_id)
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT id, title, message_count, created_at, updated_at"
+            " FROM conversations WHERE id = ?",
+            (conversation_id,),
+        ).fetchone()
+
+        return _conversation(row) if row else None
+
+    def list(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Most recently updated first.
+        """
+        rows = self._conn().execute(
+            "SELECT id, title, message_count, created_at, updated_at"
+            " FROM conversations ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+
+        return [_conversation(row) for row in rows]
+
+    def count(self) -> int:
+        (total,) = self._conn().execute(
+            "SELECT COUNT(*) FROM conversations"
+        ).fetchone()
+        return total
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._transaction() as conn:
+            if self.search_enabled:
+                # Indexed rows must be removed with their original content
+                conn.execute(
+                    "INSERT INTO messages_fts (messages_fts, rowid, content)"
+                    " SELECT 'delete', id, content FROM messages"
+                    " WHERE conversation_id = ?"
+                    " AND id <= (SELECT last_id FROM fts_state)",
+                    (conversation_id,),
+                )
+            conn.execute(
+                "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+            )
+            deleted = conn.execute(
+                "DELETE FROM conversations WHERE id = ?", (conversation_id,)
+            ).rowcount
+
+        with self._lock:
+            self._cache.pop(conversation_id, None)
+
+        return bool(deleted)
+
+    # ---- Messages ----
+
+    def messages(
+        self,
+        conversation_id: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        A page of messages in order. Served from the cache when the
+        thread is there, otherwise straight from the seq index.
+        None if the conversation does not exist.
+        """
+        end = offset + limit if limit is not None else None
+
+        with self._lock:
+            cached = self._cache.get(conversation_id)
+            cached = list(cached) if cached is not None else None
+
+        count = self._message_count(conversation_id)
+        if count is None:
+            return None
+
+        if cached is not None and len(cached) == count:
+            return [dict(m) for m in cached[offset:end]]
+
+        rows = self._conn().execute(
+            "SELECT seq, role, content, provider, model, created_at"
+            " FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ?"
+            " ORDER BY seq",
+            (conversation_id, offset, end if end is not None else count),
+        ).fetchall()
+        return [_message(r) for r in rows]
+
+    def history(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Every message of a conversation, for building chat context
+        (cached). None if the conversation does not exist.
+        """
+        history = self._history(conversation_id)
+        return [dict(m) for m in history] if history is not None else None
+
+    def append(
+        self,
+        conversation_id: str,
+        messages: List[Dict[str, Any]],
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Append messages and return them with their seq numbers.
+        None if the conversation does not exist.
+        """
+        now = time.time()
+
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT message_count, title FROM conversations WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            count, title = row
+            appended = self._insert(
+                conn, conversation_id, count, messages, now, provider, model, title
+            )
+
+        with self._lock:
+            cached = self._cache.get(conversation_id)
+            if cached is not None and len(cached) == count:
+                cached.extend(appended)
+
+        return [dict(m) for m in appended]
+
+    # ---- Search ----
+
+    def search(
+        self,
+        match: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        role: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Messages matching an FTS5 `match` expression, best first (bm25),
+        with a highlighted snippet. Raises sqlite3.OperationalError for
+        an invalid expression.
+        """
+        where = ["messages_fts MATCH ?"]
+        args: List[Any] = [match]
+
+        for column, value in (
+            ("m.provider", provider),
+            ("m.model", model),
+            ("m.role", role),
+            ("m.conversation_id", conversation_id),
+        ):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+
+        if since is not None:
+            where.append("m.created_at >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("m.created_at < ?")
+            args.append(until)
+
+        rows = self._conn().execute(
+            "SELECT m.conversation_id, c.title, m.seq, m.role, m.provider, m.model,"
+            " m.created_at, snippet(messages_fts, 0, ?, ?, '…', ?), messages_fts.rank"
+            " FROM messages_fts"
+            " JOIN messages m ON m.id = messages_fts.rowid"
+            " JOIN conversations c ON c.id = m.conversation_id"
+            f" WHERE {' AND '.join(where)}"
+            " ORDER BY messages_fts.rank LIMIT ? OFFSET ?",
+            [_HIGHLIGHT_OPEN, _HIGHLIGHT_CLOSE, _SNIPPET_TOKENS, *args, limit, offset],
+        ).fetchall()
+
+        return [_search_hit(row) for row in rows]
+
+    def index_pending(self, batch: int) -> int:
+        """
+        Add up to `batch` not yet indexed messages to the search index
+        (one transaction). Returns how many were indexed.
+        """
+        if not self.search_enabled:
+            return 0
+
+        with self._transaction() as conn:
+            (last_id,) = conn.execute("SELECT last_id FROM fts_state").fetchone()
+            rows = conn.execute(
+                "SELECT id, content FROM messages WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch),
+            ).fetchall()
+
+            if rows:
+                conn.executemany(
+                    "INSERT INTO messages_fts (rowid, content) VALUES (?, ?)", rows
+                )
+                conn.execute("UPDATE fts_state SET last_id = ?", (rows[-1][0],))
+
+        return len(rows)
+
+    def pending_index(self) -> int:
+        """
+        Messages not yet searchable.
+        """
+        if not self.search_enabled:
+            return 0
+
+        (pending,) = self._conn().execute(
+            "SELECT COUNT(*) FROM messages"
+            " WHERE id > (SELECT last_id FROM fts_state)"
+        ).fetchone()
+        return pending
+
+    # ---- Internals ----
+
+    def _message_count(self, conversation_id: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT message_count FROM conversations WHERE id = ?",
+            (conversation_id,),
+        ).fetchone()
+
+        if row is None:
+            with self._lock:
+                self._cache.pop(conversation_id, None)
+            return None
+
+        return row[0]
+
+    def _history(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        count = self._message_count(conversation_id)
+        if count is None:
+            return None
+
+        with self._lock:
+            cached = self._cache.get(conversation_id)
+            if cached is not None:
+                self._cache.move_to_end(conversation_id)
+                if len(cached) == count:
+                    return cached
+
+        # Cold, or behind another worker's appends: load what's missing
+        known = len(cached) if cached is not None else 0
+        rows = self._conn().execute(
+            "SELECT seq, role, content, provider, model, created_at"
+            " FROM messages WHERE conversation_id = ? AND seq >= ?"
+            " ORDER BY seq",
+            (conversation_id, known),
+        ).fetchall()
+
+        history = (cached or [])[:known] + [_message(r) for r in rows]
+
+        with self._lock:
+            self._cache[conversation_id] = history
+            self._cache.move_to_end(conversation_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return history
+
+    def _insert(
+        self,
+        conn: sqlite3.Connection,
+        conversation_id: str,
+        start: int,
+        messages: List[Dict[str, Any]],
+        now: float,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            {
+                "seq": start + i,
+                "role": m["role"],
+                "content": m["content"],
+                # Assistant replies record the model that wrote them
+                "provider": provider if m["role"] == "assistant" else None,
+                "model": model if m["role"] == "assistant" else None,
+                "created_at": now,
+            }
+            for i, m in enumerate(messages)
+        ]
+
+        conn.executemany(
+            "INSERT INTO messages"
+            " (conversation_id, seq, role, content, provider, model, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (conversation_id, r["seq"], r["role"], r["content"],
+                 r["provider"], r["model"], r["created_at"])
+                for r in rows
+            ],
+        )
+
+        # Untitled threads are named after their first user message
+        if title is None:
+            first = next((r["content"] for r in rows if r["role"] == "user"), None)
+            title = first[:_TITLE_LENGTH] if first else None
+
+        conn.execute(
+            "UPDATE conversations SET message_count = ?, updated_at = ?, title = ?"
+            " WHERE id = ?",
+            (start + len(rows), now, title, conversation_id),
+        )
+        return rows
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def _conversation(row: tuple) -> Dict[str, Any]:
+    conversation_id, title, count, created_at, updated_at = row
+    return {
+        "id": conversation_id,
+        "title": title,
+        "message_count": count,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+def _message(row: tuple) -> Dict[str, Any]:
+    seq, role, content, provider, model, created_at = row
+    return {
+        "seq": seq,
+        "role": role,
+        "content": content,
+        "provider": provider,
+        "model": model,
+        "created_at": created_at,
+    }
+
+
+def _search_hit(row: tuple) -> Dict[str, Any]:
+    conversation_id, title, seq, role, provider, model, created_at, snippet, rank = row
+    return {
+        "conversation_id": conversation_id,
+        "title": title,
+        "seq": seq,
+        "role": role,
+        "provider": provider,
+        "model": model,
+        "created_at": created_at,
+        "snippet": snippet,
+        # bm25 rank is lower-is-better; flip it so higher is better
+        "score": -rank,
+    }
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore(CONVERSATIONS_PATH)
+
+    return _store
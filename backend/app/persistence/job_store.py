@@ -0,0 +1,344 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+JOBS_PATH = Path(settings.JOBS_DB_PATH).expanduser()
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+_SUMMARY_COLUMNS = (
+    "id, status, priority, attempts, created_at, started_at, finished_at, expires_at"
+)
+_DETAIL_COLUMNS = _SUMMARY_COLUMNS + ", request, result, error"
+
+
+class JobStore:
+    """
+    Background chat jobs in SQLite (WAL), shared by all worker
+    processes, so queued and interrupted jobs survive restarts.
+
+    A worker claims a job with a lease it keeps renewing while the job
+    runs. A job whose worker died is claimed again once its lease has
+    lapsed (up to JOBS_MAX_ATTEMPTS runs). Finished jobs expire
+    JOBS_RESULT_TTL seconds after they finish; at most JOBS_MAX_STORED
+    jobs are kept, the oldest finished ones making room for new jobs.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " priority TEXT NOT NULL,"
+                " request TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL,"
+                " lease_until REAL,"
+                " expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status"
+                " ON jobs (status, created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_expires"
+                " ON jobs (expires_at) WHERE expires_at IS NOT NULL"
+            )
+
+    def create(self, request: Dict[str, Any], priority: str) -> Optional[Dict[str, Any]]:
+        """
+        Queue a job. None if the store is full of unfinished jobs.
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        with self._transaction() as conn:
+            self._purge(conn, now)
+
+            (total,) = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+            if total >= settings.JOBS_MAX_STORED:
+                # Make room by dropping the oldest finished jobs
+                conn.execute(
+                    "DELETE FROM jobs WHERE id IN ("
+                    " SELECT id FROM jobs WHERE expires_at IS NOT NULL"
+                    " ORDER BY finished_at LIMIT ?)",
+                    (total - settings.JOBS_MAX_STORED + 1,),
+                )
+                (total,) = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+                if total >= settings.JOBS_MAX_STORED:
+                    return None
+
+            conn.execute(
+                "INSERT INTO jobs (id, status, priority, request, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, priority, json.dumps(request), now),
+            )
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f"SELECT {_DETAIL_COLUMNS} FROM jobs"
+            " WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (job_id, time.time()),
+        ).fetchone()
+
+        return _job(row) if row else None
+
+    def list(
+        self,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest first, without requests and results.
+        """
+        where, args = self._filter(status)
+        rows = self._conn().execute(
+            f"SELECT {_SUMMARY_COLUMNS} FROM jobs WHERE {where}"
+            " ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        ).fetchall()
+
+        return [_job(row) for row in rows]
+
+    def count(self, status: Optional[str] = None) -> int:
+        where, args = self._filter(status)
+        (total,) = self._conn().execute(
+            f"SELECT COUNT(*) FROM jobs WHERE {where}", args
+        ).fetchone()
+        return total
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job (a finished one is left as is).
+        None if the job does not exist.
+        """
+        now = time.time()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ?,"
+                " lease_until = NULL WHERE id = ? AND status IN (?, ?)",
+                (JOB_CANCELLED, now, now + settings.JOBS_RESULT_TTL,
+                 job_id, JOB_QUEUED, JOB_RUNNING),
+            )
+
+        return self.get(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        with self._transaction() as conn:
+            return bool(conn.execute(
+                "DELETE FROM jobs"
+                " WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).rowcount)
+
+    # ---- Workers ----
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job, or one whose worker's lease lapsed,
+        and lease it to the caller. Jobs out of attempts are failed.
+        """
+        now = time.time()
+
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    f"SELECT {_DETAIL_COLUMNS} FROM jobs"
+                    " WHERE status = ? OR (status = ? AND lease_until < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (JOB_QUEUED, JOB_RUNNING, now),
+                ).fetchone()
+
+                if row is None:
+                    return None
+
+                job = _job(row)
+                if job["attempts"] >= settings.JOBS_MAX_ATTEMPTS:
+                    self._finish(conn, job["id"], JOB_FAILED, None, {
+                        "status": 500,
+                        "detail": f"Job abandoned after {job['attempts']} attempts",
+                    }, now)
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1,"
+                    " started_at = ?, lease_until = ? WHERE id = ?",
+                    (JOB_RUNNING, now, now + settings.JOBS_LEASE_SECONDS, job["id"]),
+                )
+                job.update(status=JOB_RUNNING, attempts=job["attempts"] + 1, started_at=now)
+                return job
+
+    def renew(self, job_id: str) -> bool:
+        """
+        Extend a running job's lease. False if the job is no longer
+        running (cancelled, or claimed elsewhere after a lapse).
+        """
+        now = time.time()
+
+        with self._transaction() as conn:
+            return bool(conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?",
+                (now + settings.JOBS_LEASE_SECONDS, job_id, JOB_RUNNING),
+            ).rowcount)
+
+    def finish(
+        self,
+        job_id: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Store the outcome of a running job. False if it was cancelled
+        in the meantime.
+        """
+        status = JOB_FAILED if error is not None else JOB_SUCCEEDED
+
+        with self._transaction() as conn:
+            return self._finish(conn, job_id, status, result, error, time.time())
+
+    def release(self, job_id: str) -> None:
+        """
+        Put a running job back in the queue (worker shutting down).
+        The interrupted run does not count as an attempt.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1,"
+                " started_at = NULL, lease_until = NULL WHERE id = ? AND status = ?",
+                (JOB_QUEUED, job_id, JOB_RUNNING),
+            )
+
+    def purge(self) -> int:
+        """
+        Delete expired jobs; returns how many.
+        """
+        with self._transaction() as conn:
+            return self._purge(conn, time.time())
+
+    # ---- Internals ----
+
+    def _finish(
+        self,
+        conn: sqlite3.Connection,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]],
+        error: Optional[Dict[str, Any]],
+        now: float,
+    ) -> bool:
+        return bool(conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?,"
+            " expires_at = ?, lease_until = NULL WHERE id = ? AND status = ?",
+            (
+                status,
+                json.dumps(result) if result is not None else None,
+                json.dumps(error) if error is not None else None,
+                now,
+                now + settings.JOBS_RESULT_TTL,
+                job_id,
+                JOB_RUNNING,
+            ),
+        ).rowcount)
+
+    def _purge(self, conn: sqlite3.Connection, now: float) -> int:
+        return conn.execute(
+            "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (now,),
+        ).rowcount
+
+    def _filter(self, status: Optional[str]) -> "tuple[str, tuple]":
+        where = "(expires_at IS NULL OR expires_at > ?)"
+        args: tuple = (time.time(),)
+        if status is not None:
+            where += " AND status = ?"
+            args += (status,)
+        return where, args
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def _job(row: tuple) -> Dict[str, Any]:
+    job_id, status, priority, attempts, created_at, started_at, finished_at, expires_at = row[:8]
+    job = {
+        "id": job_id,
+        "status": status,
+        "priority": priority,
+        "attempts": attempts,
+        "created_at": created_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "expires_at": expires_at,
+    }
+
+    if len(row) > 8:
+        request, result, error = row[8:]
+        job["request"] = json.loads(request)
+        job["result"] = json.loads(result) if result else None
+        job["error"] = json.loads(error) if error else None
+
+    return job
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore(JOBS_PATH)
+
+    return _store
@@ -1,18 +1,53 @@
-import json
-from pathlib import Path
-from typing import List, Dict
+from typing import Hashable, List, Dict, Optional
 
-MODELS_PATH = Path.home() / ".project_x_models.json"
+from app.persistence.backends import JSON_PATHS, get_backend
+
+MODELS_PATH = JSON_PATHS["user_models"]
+
+_KEY = "user_models"
 
 def load_user_models() -> List[Dict]:
-    if not MODELS_PATH.exists():
-        return []
-    return json.loads(MODELS_PATH.read_text())
+    return get_backend().read(_KEY) or []
 
 def save_user_models(models: List[Dict]):
-    MODELS_PATH.write_text(json.dumps(models, indent=2))
+    get_backend().write(_KEY, models)
+
+def user_models_version() -> Hashable:
+    """
+    Opaque token that changes whenever any worker modifies user models.
+    """
+    return get_backend().version(_KEY)
 
 def add_user_model(model: Dict):
-    models = load_user_models()
-    models.append(model)
-    save_user_models(models)
+    """
+    Add a user model; an existing entry with the same provider + id
+    is replaced in place (no duplicates).
+    """
+    def apply(models: Optional[List[Dict]]) -> List[Dict]:
+        models = list(models or [])
+        for i, existing in enumerate(models):
+            if _same_model(existing, model):
+                models[i] = model
+                return models
+        return models + [model]
+
+    get_backend().update(_KEY, apply)
+
+def remove_user_model(provider: str, model_id: str) -> bool:
+    """
+    Remove a user model. Returns False if it was not registered.
+    """
+    removed = False
+    target = {"provider": provider, "id": model_id}
+
+    def apply(models: Optional[List[Dict]]) -> List[Dict]:
+        nonlocal removed
+        kept = [m for m in (models or []) if not _same_model(m, target)]
+        removed = len(kept) != len(models or [])
+        return kept
+
+    get_backend().update(_KEY, apply)
+    return removed
+
+def _same_model(a: Dict, b: Dict) -> bool:
+    return a.get("provider") == b.get("provider") and a.get("id") == b.get("id")
@@ -1,27 +1,41 @@
-from typing import List, Dict
-from app.persistence.model_store import load_user_models
+import hashlib
+import threading
+import time
+from typing import Any, Hashable, List, Dict, Optional
+
+from app.config import settings
+from app.persistence.model_store import (
+    add_user_model,
+    load_user_models,
+    remove_user_model,
+    user_models_version,
+)
 
 
 # Static, validated model lists per provider adapter
-_PROVIDER_MODELS: dict[str, List[Dict[str, str]]] = {
+_PROVIDER_MODELS: dict[str, List[Dict[str, Any]]] = {
     "groq": [
         {
             "id": "llama-3.1-8b-instant",
             "name": "LLaMA 3.1 (8B Instant)",
+            "context_window": 131072,
         },
         {
             "id": "llama-3.1-70b-versatile",
             "name": "LLaMA 3.1 (70B Versatile)",
+            "context_window": 131072,
         },
     ],
     "openai": [
         {
             "id": "gpt-4o-mini",
             "name": "GPT-4o Mini",
+            "context_window": 128000,
         },
         {
             "id": "gpt-4o",
             "name": "GPT-4o",
+            "context_window": 128000,
         },
     ],
     # Adapters with no predefined models yet
@@ -29,18 +43,142 @@ _PROVIDER_MODELS: dict[str, List[Dict[str, str]]] = {
     "custom-openai": [],
 }
 
-def get_models_for_provider(provider: str) -> List[Dict[str, str]]:
+# Part of every ETag, so a deploy that changes built-ins invalidates it
+_BUILTIN_DIGEST = hashlib.sha256(repr(_PROVIDER_MODELS).encode()).hexdigest()
+
+
+def get_models_for_provider(provider: str) -> List[Dict[str, Any]]:
     if provider not in _PROVIDER_MODELS:
         raise KeyError(f"Unknown provider: {provider}")
     return _PROVIDER_MODELS[provider]
 
+
+class ModelRegistry:
+    """
+    In-memory index of built-in + user models: provider -> id -> model.
+    Built once from the model store and updated incrementally on
+    add / remove. Changes made by other workers are picked up by
+    re-checking the store version (at most every STORE_REVALIDATE_SECONDS).
+    """
+
+    def __init__(self):
+        self._index: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+        self._store_version: Hashable = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model_id: str) -> Optional[Dict[str, Any]]:
+        return self._models(provider).get(model_id)
+
+    def list(
+        self,
+        provider: str,
+        query: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Models for a provider (built-in first, then user models in
+        insertion order), optionally filtered by a case-insensitive
+        substring of id / name and by source ("builtin" | "user").
+        """
+        models = self._models(provider).values()
+        builtin_ids = {m["id"] for m in _PROVIDER_MODELS[provider]}
+
+        if source == "builtin":
+            models = [m for m in models if m["id"] in builtin_ids]
+        elif source == "user":
+            models = [m for m in models if m["id"] not in builtin_ids]
+
+        if query:
+            needle = query.lower()
+            models = [
+                m for m in models
+                if needle in m["id"].lower() or needle in str(m.get("name", "")).lower()
+            ]
+
+        return list(models)
+
+    def add(self, model: Dict[str, Any]) -> None:
+        """
+        Persist a user model (replacing one with the same id) and index it.
+        Built-in ids cannot be overridden.
+        """
+        provider = model["provider"]
+        if any(m["id"] == model["id"] for m in get_models_for_provider(provider)):
+            raise ValueError(f"{model['id']} is a built-in {provider} model")
+
+        add_user_model(model)
+
+        with self._lock:
+            if self._index is not None:
+                self._index[provider][model["id"]] = model
+                self._store_version = user_models_version()
+
+    def remove(self, provider: str, model_id: str) -> bool:
+        """
+        Remove a user model. Returns False if it was not registered.
+        """
+        removed = remove_user_model(provider, model_id)
+
+        with self._lock:
+            if removed and self._index is not None:
+                self._index[provider].pop(model_id, None)
+                self._store_version = user_models_version()
+
+        return removed
+
+    def etag(self) -> str:
+        """
+        Validator for GET /models; changes whenever user models change.
+        """
+        self._sync()
+        tag = f"{_BUILTIN_DIGEST}:{self._store_version!r}"
+        digest = hashlib.sha256(tag.encode()).hexdigest()[:16]
+        return f'"{digest}"'
+
+    def _models(self, provider: str) -> Dict[str, Dict[str, Any]]:
+        get_models_for_provider(provider)  # KeyError for unknown providers
+        return self._sync()[provider]
+
+    def _sync(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        index = self._index
+        now = time.monotonic()
+
+        if index is not None and now - self._checked_at < settings.STORE_REVALIDATE_SECONDS:
+            return index
+
+        with self._lock:
+            version = user_models_version()
+            if self._index is None or version != self._store_version:
+                self._index, self._store_version = self._build(), version
+            self._checked_at = now
+            return self._index
+
+    def _build(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        index = {
+            provider: {m["id"]: m for m in models}
+            for provider, models in _PROVIDER_MODELS.items()
+        }
+
+        for model in load_user_models():
+            provider = model.get("provider")
+            if provider not in index or not model.get("id"):
+                continue
+
+            # Built-ins win over (legacy) user entries with the same id
+            if any(m["id"] == model["id"] for m in _PROVIDER_MODELS[provider]):
+                continue
+
+            index[provider][model["id"]] = model
+
+        return index
+
+
+model_registry = ModelRegistry()
+
+
 def get_all_models_for_provider(provider: str):
-    builtin = get_models_for_provider(provider)
-    user_models = [
-        m for m in load_user_models()
-        if m.get("provider") == provider
-    ]
-    return builtin + user_models
+    return model_registry.list(provider)
 
 def get_model_by_id(provider: str, model_id: str) -> Dict[str, str] | None:
     """
@@ -48,12 +186,6 @@ def get_model_by_id(provider: str, model_id: str) -> Dict[str, str] | None:
     Includes both built-in and user-added models.
     """
     try:
-        models = get_all_models_for_provider(provider)
+        return model_registry.get(provider, model_id)
     except KeyError:
         return None
-
-    for model in models:
-        if model.get("id") == model_id:
-            return model
-
-    return None
@@ -1,5 +1,9 @@
 from typing import List, Dict
 
+# Providers that work without an API key (self-hosted servers)
+KEYLESS_PROVIDERS = ("local",)
+
+
 def get_available_providers() -> List[Dict[str, str]]:
     return [
         {"id": "groq", "name": "Groq"},
@@ -7,3 +11,7 @@ def get_available_providers() -> List[Dict[str, str]]:
         {"id": "huggingface", "name": "HuggingFace"},
         {"id": "local", "name": "Local / Ollama"},
     ]
+
+
+def requires_api_key(provider: str) -> bool:
+    return provider not in KEYLESS_PROVIDERS
@@ -1,22 +1,49 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.chat import ChatRequest, ChatResponse
-from app.persistence.config_store import load_config, update_config
-from app.services.llm import call_llm
+import asyncio
+import json
+import logging
+import math
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.schemas.chat import (
+    BatchChatError,
+    BatchChatItem,
+    BatchChatRequest,
+    BatchChatResponse,
+    ChatJob,
+    ChatRequest,
+    ChatResponse,
+)
+from app.persistence.config_store import load_config, update_active_model
+from app.persistence.conversation_store import get_conversation_store
+from app.persistence.job_store import get_job_store
+from app.services.breaker import is_auth_failure
+from app.services.cache import CACHE_DEFAULT, cache_policy_from_headers, cache_status
+from app.services.context import PackedContext, build_context, conversation_tokens
+from app.services.jobs import cancel_job, submit_job, wait_for_job
+from app.services.llm import call_llm, stream_llm
+from app.services.routing import route, routing_decision
+from app.services.scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, priority_from_headers
 from app.manifest.system import system_state
+from app.utils.disconnect import cancel_on_disconnect, stream_until_disconnect
+from app.utils.streams import ClosingStream
+from app.utils.timing import mark_since_start, span
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+def _resolve_registry(
+    req: Optional[ChatRequest] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], str]:
     """
-    Main chat endpoint.
-    Backend is authoritative:
-    - Uses stored config
-    - Uses active model from registry
-    - Updates auth_ok
+    Validate the request (if given) against stored config and
+    return the model registry and the active model id.
     """
-
     config = load_config()
     if not config:
         raise HTTPException(
@@ -24,15 +51,9 @@ def chat(req: ChatRequest):
             detail="System not configured. Run setup first."
         )
 
-    if not req.messages or not req.messages[-1].content.strip():
-        raise HTTPException(
-            status_code=400,
-            detail="Empty message"
-        )
+    if req is not None:
+        _validate_messages(req)
 
-    # -------------------------
-    # Resolve active model
-    # -------------------------
     models = config.get("models")
     active_id = config.get("active_model_id")
 
@@ -42,36 +63,553 @@ def chat(req: ChatRequest):
             detail="Active model not configured"
         )
 
+    return models, active_id
+
+
+def _validate_messages(req: ChatRequest) -> None:
+    if not req.messages or not req.messages[-1].content.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Empty message"
+        )
+
+
+async def _conversation_messages(req: ChatRequest) -> List[Dict[str, str]]:
+    """
+    Messages to build context from: the stored conversation followed
+    by the request's new messages, or the request messages as sent.
+    """
+    messages = req.message_dicts()
+    if req.conversation_id is None:
+        return messages
+
+    with span("conversation_read"):
+        # SQLite (may wait on a writer): off the event loop
+        history = await asyncio.to_thread(get_conversation_store().history, req.conversation_id)
+
+    if history is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return [{"role": m["role"], "content": m["content"]} for m in history] + messages
+
+
+async def _save_turn(req: ChatRequest, reply: str, routed_to: Dict[str, Any]) -> None:
+    # Persist the new turn and the reply on the conversation (if any)
+    if req.conversation_id is None:
+        return
+
+    with span("conversation_write"):
+        await asyncio.to_thread(
+            get_conversation_store().append,
+            req.conversation_id,
+            req.message_dicts() + [{"role": "assistant", "content": reply}],
+            provider=routed_to["provider"],
+            model=routed_to["model"],
+        )
+
+
+async def _set_auth_ok(active_model: Dict[str, Any], value: bool) -> None:
+    # Persist on the active model entry (what SystemState reads),
+    # skipping the write when nothing changes. Off the event loop:
+    # the store may wait on another process's lock
+    if active_model.get("auth_ok") != value:
+        await asyncio.to_thread(lambda: update_active_model(load_config(), {"auth_ok": value}))
+        active_model["auth_ok"] = value
+
+    system_state.auth_ok = value
+
+
+def _entry_key(entry: Dict[str, Any]) -> Tuple[str, str]:
+    return entry["provider"], entry["model"]
+
+
+def _routed_to(models: Dict[str, Dict[str, Any]], model_id: str) -> Dict[str, Any]:
+    return {
+        "model_id": model_id,
+        "provider": models[model_id]["provider"],
+        "model": models[model_id]["model"],
+    }
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, request: Request, response: Response):
+    """
+    Main chat endpoint.
+    Backend is authoritative:
+    - Uses stored config
+    - Uses active model from registry
+    - Updates auth_ok
+    - Aborts the upstream call if the client disconnects
+    """
+
+    # Body read + JSON decode + validation
+    mark_since_start("parse")
+
+    return await cancel_on_disconnect(request, _chat(req, request, response))
+
+
+async def _chat(req: ChatRequest, request: Request, response: Response) -> ChatResponse:
+    reply = await complete_chat(
+        req,
+        cache=cache_policy_from_headers(request.headers),
+        priority=priority_from_headers(request.headers, PRIORITY_INTERACTIVE),
+    )
+
+    if cache_status.get():
+        response.headers["X-Cache"] = cache_status.get()
+
+    return reply
+
+
+async def complete_chat(
+    req: ChatRequest,
+    cache: str = CACHE_DEFAULT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> ChatResponse:
+    """
+    Answer a chat request (POST /chat without the HTTP parts); also
+    what background chat jobs run.
+    """
+    models, active_id = _resolve_registry(req)
     active_model = models[active_id]
 
-    last_message = req.messages[-1].content
+    messages = await _conversation_messages(req)
 
-    try:
-        reply = call_llm(
-            provider=active_model["provider"],
-            model=active_model["model"],
-            api_key=active_model.get("api_key"),
-            message=last_message,
+    # Packed per candidate model (budgets differ); reported for the winner
+    contexts: Dict[Tuple[str, str], PackedContext] = {}
+
+    async def call(entry: Dict[str, Any]) -> str:
+        with span("context"):
+            context = await build_context(entry, messages, req.generation_params(), priority)
+        contexts[_entry_key(entry)] = context
+
+        return await call_llm(
+            provider=entry["provider"],
+            model=entry["model"],
+            api_key=entry.get("api_key"),
+            messages=context.messages,
+            params=req.generation_params(),
+            cache=cache,
+            priority=priority,
         )
 
+    try:
+        # Active model, or a fallback per its routing policy
+        with span("route"):
+            reply, winner_id = await route(
+                models, active_id, call,
+                prompt_tokens=conversation_tokens(messages),
+                latency_class=req.latency_class,
+            )
+
         # Mark auth OK on success
-        update_config({"auth_ok": True})
-        system_state.auth_ok = True
+        if winner_id == active_id:
+            await _set_auth_ok(active_model, True)
 
-        return ChatResponse(content=reply)
+        routed_to = _routed_to(models, winner_id)
+        await _save_turn(req, reply, routed_to)
 
-    except HTTPException:
-        # Provider / request errors
-        update_config({"auth_ok": False})
-        system_state.auth_ok = False
+        return ChatResponse(
+            content=reply,
+            context=contexts[_entry_key(models[winner_id])].report(),
+            routing=routing_decision.get(),
+            conversation_id=req.conversation_id,
+            **routed_to,
+        )
+
+    except HTTPException as e:
+        # Only auth failures say anything about the key;
+        # outages / rate limits must not lock chat
+        if is_auth_failure(e):
+            await _set_auth_ok(active_model, False)
         raise
 
     except Exception as e:
-        # Auth / provider / quota failures
-        update_config({"auth_ok": False})
-        system_state.auth_ok = False
+        # Unexpected provider response
+        raise HTTPException(
+            status_code=502,
+            detail="Unexpected provider error"
+        ) from e
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+    Emits `token` events as the provider produces them and a
+    final `done` event carrying usage and timing.
+    Errors after the stream has started are sent as an `error` event.
+    A client disconnect closes the upstream stream immediately.
+    """
+
+    mark_since_start("parse")
+
+    return await cancel_on_disconnect(request, _chat_stream(req, request))
+
+
+async def _chat_stream(req: ChatRequest, request: Request) -> StreamingResponse:
+    events, winner_id = await stream_chat(
+        req,
+        cache=cache_policy_from_headers(request.headers),
+        priority=priority_from_headers(request.headers, PRIORITY_INTERACTIVE),
+    )
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Model-Id": winner_id,
+    }
+    if cache_status.get():
+        headers["X-Cache"] = cache_status.get()
+
+    return StreamingResponse(
+        stream_until_disconnect(request, _sse(events)),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+
+async def stream_chat(
+    req: ChatRequest,
+    cache: str = CACHE_DEFAULT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> Tuple[AsyncIterator[Tuple[str, Dict[str, Any]]], str]:
+    """
+    Open a streamed reply (POST /chat/stream without the HTTP parts):
+    its `token` / `done` / `error` events as (event, data) pairs, and
+    the id of the model answering. Also what /ws streams run.
+    """
+    models, active_id = _resolve_registry(req)
+    active_model = models[active_id]
+
+    started = time.perf_counter()
+    messages = await _conversation_messages(req)
+    contexts: Dict[Tuple[str, str], PackedContext] = {}
+
+    async def open_stream(entry: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        with span("context"):
+            context = await build_context(entry, messages, req.generation_params(), priority)
+        contexts[_entry_key(entry)] = context
 
+        return await stream_llm(
+            provider=entry["provider"],
+            model=entry["model"],
+            api_key=entry.get("api_key"),
+            messages=context.messages,
+            params=req.generation_params(),
+            cache=cache,
+            priority=priority,
+        )
+
+    try:
+        # Routing races / fails over on stream open (time to headers)
+        with span("route"):
+            events, winner_id = await route(
+                models, active_id, open_stream, discard=_close_stream,
+                prompt_tokens=conversation_tokens(messages),
+                latency_class=req.latency_class,
+                stream=True,
+            )
+
+    except HTTPException as e:
+        if is_auth_failure(e):
+            await _set_auth_ok(active_model, False)
+        raise
+
+    except Exception as e:
         raise HTTPException(
-            status_code=401,
-            detail="Authentication failed or API key invalid"
+            status_code=502,
+            detail="Unexpected provider error"
         ) from e
+
+    if winner_id == active_id:
+        await _set_auth_ok(active_model, True)
+
+    routed_to = _routed_to(models, winner_id)
+    context = contexts[_entry_key(models[winner_id])]
+
+    # Closing it closes the upstream stream too, even before it started
+    chat_events = ClosingStream(
+        _chat_events(
+            events, started, routed_to, context.report(), routing_decision.get(),
+            on_complete=lambda reply: _save_turn(req, reply, routed_to),
+        ),
+        source=events,
+    )
+
+    return chat_events, winner_id
+
+
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(payload: BatchChatRequest, request: Request):
+    """
+    Run many independent chat requests against the active model
+    with bounded concurrency.
+    Results are returned in request order; a failed item carries an
+    `error` instead of `content` and does not abort the batch.
+    With `?stream=true` (or `Accept: application/x-ndjson`) each result
+    is emitted as an NDJSON line as soon as it finishes.
+    """
+
+    models, active_id = _resolve_registry()
+    active_model = models[active_id]
+
+    if len(payload.requests) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.BATCH_MAX_ITEMS} items)"
+        )
+
+    # The request can only narrow the configured cap (at least 1 in flight)
+    concurrency = max(1, settings.BATCH_MAX_CONCURRENCY)
+    if payload.concurrency is not None:
+        concurrency = min(payload.concurrency, concurrency)
+
+    cache = cache_policy_from_headers(request.headers)
+    priority = priority_from_headers(request.headers, PRIORITY_BATCH)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: ChatRequest) -> BatchChatItem:
+        async with semaphore:
+            try:
+                _validate_messages(item)
+                if item.conversation_id is not None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="conversation_id is not supported in batch requests",
+                    )
+
+                async def call(entry: Dict[str, Any]) -> str:
+                    context = await build_context(
+                        entry, item.message_dicts(), item.generation_params(), priority
+                    )
+                    return await call_llm(
+                        provider=entry["provider"],
+                        model=entry["model"],
+                        api_key=entry.get("api_key"),
+                        messages=context.messages,
+                        params=item.generation_params(),
+                        cache=cache,
+                        priority=priority,
+                    )
+
+                reply, winner_id = await route(
+                    models, active_id, call,
+                    prompt_tokens=conversation_tokens(item.message_dicts()),
+                    latency_class=item.latency_class,
+                )
+                return BatchChatItem(index=index, content=reply, model_id=winner_id)
+
+            except HTTPException as e:
+                error = BatchChatError(status=e.status_code, detail=e.detail)
+
+            except Exception:
+                error = BatchChatError(
+                    status=502,
+                    detail="Unexpected provider error",
+                )
+
+            # Model whose error this is (None if routing never started)
+            failed_id = (routing_decision.get() or {}).get("failed_model_id")
+            return BatchChatItem(index=index, model_id=failed_id, error=error)
+
+    tasks = [
+        asyncio.ensure_future(run(i, item))
+        for i, item in enumerate(payload.requests)
+    ]
+
+    stream = (
+        request.query_params.get("stream", "").lower() in ("1", "true")
+        or "application/x-ndjson" in request.headers.get("accept", "")
+    )
+
+    if stream:
+        return StreamingResponse(
+            stream_until_disconnect(request, _ndjson(tasks, active_model, active_id)),
+            media_type="application/x-ndjson",
+        )
+
+    try:
+        results = await cancel_on_disconnect(request, asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    await _record_batch_auth(active_model, active_id, results)
+    return BatchChatResponse(results=results)
+
+
+async def _ndjson(
+    tasks: "list[asyncio.Future[BatchChatItem]]",
+    active_model: Dict[str, Any],
+    active_id: str,
+) -> AsyncIterator[str]:
+    results = []
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            results.append(item)
+            yield item.model_dump_json(exclude_none=True) + "\n"
+    finally:
+        # Client went away: stop the remaining items
+        for task in tasks:
+            task.cancel()
+
+    await _record_batch_auth(active_model, active_id, results)
+
+
+async def _record_batch_auth(
+    active_model: Dict[str, Any],
+    active_id: str,
+    results: "list[BatchChatItem]",
+) -> None:
+    # Any success on the active model proves the key; otherwise only
+    # a 401 / 403 from the active model (not a fallback) marks it bad
+    active = [r for r in results if r.model_id == active_id]
+
+    if any(r.error is None for r in active):
+        await _set_auth_ok(active_model, True)
+    elif any(r.error is not None and r.error.status in (401, 403) for r in active):
+        await _set_auth_ok(active_model, False)
+
+
+# ---- Background jobs ----
+
+@router.post("/chat/jobs", response_model=ChatJob, status_code=202)
+async def submit_chat_job(req: ChatRequest, request: Request, response: Response):
+    """
+    Queue a chat request to run in the background and return its job
+    straight away; the result is fetched from GET /chat/jobs/{id}.
+    Jobs run as batch traffic, and queued or interrupted jobs survive
+    a restart.
+    """
+    _resolve_registry(req)
+
+    job = await submit_job(req, priority_from_headers(request.headers, PRIORITY_BATCH))
+    if job is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many jobs",
+            headers={"Retry-After": str(math.ceil(settings.JOBS_LEASE_SECONDS))},
+        )
+
+    response.headers["Location"] = f"/chat/jobs/{job['id']}"
+    return job
+
+
+@router.get("/chat/jobs", response_model=List[ChatJob])
+def list_chat_jobs(
+    response: Response,
+    status: Optional[Literal["queued", "running", "succeeded", "failed", "cancelled"]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Newest first, without results; the total is sent as X-Total-Count.
+    """
+    store = get_job_store()
+    response.headers["X-Total-Count"] = str(store.count(status))
+    return store.list(status=status, offset=offset, limit=limit)
+
+
+@router.get("/chat/jobs/{job_id}", response_model=ChatJob)
+async def get_chat_job(
+    job_id: str,
+    request: Request,
+    wait: float = Query(0, ge=0),
+):
+    """
+    With `?wait=N` the request is held until the job finishes or N
+    seconds pass (at most JOBS_MAX_WAIT), instead of polling.
+    """
+    job = await cancel_on_disconnect(
+        request, wait_for_job(job_id, min(wait, settings.JOBS_MAX_WAIT))
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@router.post("/chat/jobs/{job_id}/cancel", response_model=ChatJob)
+async def cancel_chat_job(job_id: str):
+    """
+    Stop a queued or running job; a finished job is returned as is.
+    """
+    job = await cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@router.delete("/chat/jobs/{job_id}")
+async def delete_chat_job(job_id: str):
+    # Stop it first if it is still running
+    await cancel_job(job_id)
+
+    if not get_job_store().delete(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {"ok": True}
+
+
+async def _close_stream(events: AsyncIterator[Dict[str, Any]]) -> None:
+    # A hedged stream that lost the race
+    await events.aclose()
+
+
+async def _chat_events(
+    events: AsyncIterator[Dict[str, Any]],
+    started: float,
+    routed_to: Dict[str, Any],
+    context: Dict[str, Any],
+    routing: Optional[Dict[str, Any]],
+    on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    ttft_ms = None
+    parts = []
+
+    try:
+        async for event in events:
+            if event["type"] == "token":
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                parts.append(event["content"])
+                yield "token", {"content": event["content"]}
+
+            elif event["type"] == "done":
+                # Only a complete reply is stored
+                if on_complete is not None:
+                    await on_complete("".join(parts))
+                yield "done", {
+                    **routed_to,
+                    "usage": event.get("usage"),
+                    "context": context,
+                    "routing": routing,
+                    "timing": {
+                        "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+                        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                    },
+                }
+
+    except HTTPException as e:
+        yield "error", {"status": e.status_code, "detail": e.detail}
+
+    except Exception:
+        # Internals (URLs, payloads) stay in the log, not in the reply
+        logger.exception("Chat stream failed")
+        yield "error", {"status": 502, "detail": "Unexpected provider error"}
+
+
+async def _sse(events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[str]:
+    try:
+        async for event, data in events:
+            yield _sse_event(event, data)
+    finally:
+        await events.aclose()
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 import uuid
 
 from app.persistence.config_store import (
@@ -10,22 +12,44 @@ from app.persistence.config_store import (
     ensure_registry,
     get_active_model,
     update_active_model,
+    add_registry_model,
+    set_active_model,
 )
 from app.manifest.system import system_state
-from app.services.llm import call_llm
+from app.registry.providers import requires_api_key
+from app.services.health import HEALTH_OK, verify_models
 
 router = APIRouter(prefix="/config", tags=["config"])
 
 
+class RoutingConfig(BaseModel):
+    mode: Literal["single", "failover", "hedge", "auto"] = "single"
+    # Registry ids tried / raced after the active model, in order
+    # (auto: the pool chosen from per request, with the active model)
+    fallbacks: List[str] = Field(default_factory=list)
+    # Fixed hedge delay; defaults to the active model's observed p95
+    hedge_after_ms: Optional[float] = None
+
+
 class UpdateConfigRequest(BaseModel):
+    # Switch to another registry entry (keeps its verification status)
+    active_model_id: Optional[str] = None
     model_id: Optional[str] = None
     api_key: Optional[str] = None
+    routing: Optional[RoutingConfig] = None
+
+
+class AddModelRequest(BaseModel):
+    provider: str
+    model_id: str
+    api_key: Optional[str] = None
 
 
 class SetupConfigRequest(BaseModel):
     provider: str
     model_id: str
-    api_key: str
+    # Required unless the provider is keyless (see KEYLESS_PROVIDERS)
+    api_key: Optional[str] = None
 
 
 @router.post("/setup")
@@ -34,6 +58,10 @@ def setup_config(payload: SetupConfigRequest):
     Fresh setup.
     Creates a registry with a single active model.
     """
+    api_key = (payload.api_key or "").strip() or None
+    if api_key is None and requires_api_key(payload.provider):
+        raise HTTPException(status_code=400, detail="API key required")
+
     model_uuid = str(uuid.uuid4())
 
     config = {
@@ -41,7 +69,7 @@ def setup_config(payload: SetupConfigRequest):
             model_uuid: {
                 "provider": payload.provider,
                 "model": payload.model_id,
-                "api_key": payload.api_key.strip(),
+                "api_key": api_key,
                 "auth_ok": None,
             }
         },
@@ -66,11 +94,28 @@ def update_config_route(payload: UpdateConfigRequest):
     # Ensure registry exists (may persist migration)
     config = ensure_registry(config)
 
+    if payload.active_model_id is not None:
+        if payload.active_model_id not in config["models"]:
+            raise HTTPException(status_code=400, detail="Unknown model id")
+        set_active_model(config, payload.active_model_id)
+
     patch = {}
 
     if payload.model_id is not None:
         patch["model"] = payload.model_id
 
+    if payload.routing is not None:
+        unknown = [
+            fid for fid in payload.routing.fallbacks
+            if fid not in config["models"]
+        ]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fallback model ids: {', '.join(unknown)}"
+            )
+        patch["routing"] = payload.routing.model_dump()
+
     if payload.api_key is not None and payload.api_key.strip():
         active = get_active_model(config)
         if not active:
@@ -87,41 +132,72 @@ def update_config_route(payload: UpdateConfigRequest):
     return {"ok": True}
 
 
+@router.post("/models")
+def add_registry_model_route(payload: AddModelRequest):
+    """
+    Register an additional model (e.g. a routing fallback).
+    The active model is unchanged.
+    """
+    config = load_config()
+    if not config:
+        raise HTTPException(status_code=400, detail="System not configured")
+
+    # Ensure registry exists (may persist migration)
+    ensure_registry(config)
+
+    model_uuid = add_registry_model({
+        "provider": payload.provider,
+        "model": payload.model_id,
+        "api_key": (payload.api_key or "").strip() or None,
+        "auth_ok": None,
+    })
+
+    system_state.load()
+    return {"ok": True, "id": model_uuid}
+
+
 @router.post("/verify")
-def verify_api_key():
+async def verify_api_key(verify_all: bool = Query(False, alias="all")):
     """
     Explicit API key verification.
-    This is the ONLY legal way to unlock chat.
-    Operates on the active model.
+    This is the ONLY legal way to unlock chat (besides the background
+    health checks, which run the same probes).
+    Operates on the active model, or with `?all=true` on every registry
+    entry concurrently. Always reaches the provider, with the cheapest
+    probe it offers (model list, else a one-token completion).
     """
-    config = load_config()
+    # Store access off the event loop (it may wait on a file lock)
+    config = await asyncio.to_thread(load_config)
     if not config:
         raise HTTPException(status_code=400, detail="System not configured")
 
     # Ensure registry exists (may persist migration)
-    config = ensure_registry(config)
+    config = await asyncio.to_thread(ensure_registry, config)
+
+    if verify_all:
+        results = await verify_models(config["models"], max_age=0)
+        await asyncio.to_thread(system_state.load)
+        return {
+            "ok": all(r["status"] == HEALTH_OK for r in results.values()),
+            "models": results,
+        }
 
+    active_id = config["active_model_id"]
     active = get_active_model(config)
     if not active:
         raise HTTPException(status_code=400, detail="Active model not found")
 
-    try:
-        # Cheap validation call
-        call_llm(
-            provider=active["provider"],
-            model=active["model"],
-            api_key=active.get("api_key"),
-            message="ping",
-        )
+    # Provider outages leave the previous verdict untouched
+    result = (await verify_models({active_id: active}, max_age=0))[active_id]
+    await asyncio.to_thread(system_state.load)
 
-        update_active_model(config, {"auth_ok": True})
-        system_state.load()
-        return {"ok": True}
+    if result["error"] is not None:
+        raise HTTPException(
+            status_code=result["error"]["status"],
+            detail=result["error"]["detail"],
+        )
 
-    except HTTPException:
-        update_active_model(config, {"auth_ok": False})
-        system_state.load()
-        raise
+    return {"ok": True}
 
 
 @router.post("/reset")
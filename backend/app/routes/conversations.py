@@ -0,0 +1,134 @@
+import sqlite3
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from app.persistence.conversation_store import get_conversation_store
+from app.schemas.conversation import (
+    AppendMessagesRequest,
+    ConversationCreate,
+    ConversationDetail,
+    ConversationMessage,
+    ConversationOut,
+    SearchResponse,
+)
+from app.services.search import fts_query
+
+router = APIRouter(prefix="/conversations", tags=["conversations"])
+
+
+@router.post("", response_model=ConversationOut)
+def create_conversation(payload: ConversationCreate):
+    """
+    Start a server-side conversation. Chat requests that carry its
+    `conversation_id` only need to send the new message(s).
+    """
+    return get_conversation_store().create(
+        title=payload.title,
+        messages=[m.model_dump() for m in payload.messages],
+    )
+
+
+@router.get("", response_model=List[ConversationOut])
+def list_conversations(
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Most recently updated first; the total is sent as X-Total-Count.
+    """
+    store = get_conversation_store()
+    response.headers["X-Total-Count"] = str(store.count())
+    return store.list(offset=offset, limit=limit)
+
+
+@router.get("/search", response_model=SearchResponse)
+def search_messages(
+    q: str = Query(..., min_length=1),
+    provider: Optional[str] = Query(None),
+    model: Optional[str] = Query(None),
+    role: Optional[Literal["user", "assistant", "system"]] = Query(None),
+    conversation_id: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    raw: bool = Query(False),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Full-text search over message contents, best matches first.
+    `q` is free text (all terms must match, the last one as a prefix);
+    with `raw=true` it is passed through as an FTS5 query.
+    `provider` / `model` match the model that wrote a reply.
+    """
+    store = get_conversation_store()
+    if not store.search_enabled:
+        raise HTTPException(status_code=501, detail="Search needs SQLite with FTS5")
+
+    match = q if raw else fts_query(q)
+
+    try:
+        # One extra row tells whether another page exists
+        hits = store.search(
+            match,
+            provider=provider,
+            model=model,
+            role=role,
+            conversation_id=conversation_id,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            offset=offset,
+            limit=limit + 1,
+        )
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+
+    return {
+        "results": hits[:limit],
+        "offset": offset,
+        "limit": limit,
+        "has_more": len(hits) > limit,
+        "pending": store.pending_index(),
+    }
+
+
+@router.get("/{conversation_id}", response_model=ConversationDetail)
+def get_conversation(
+    conversation_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Conversation with one page of its messages (by position).
+    """
+    store = get_conversation_store()
+
+    conversation = store.get(conversation_id)
+    messages = store.messages(conversation_id, offset=offset, limit=limit)
+
+    if conversation is None or messages is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return {**conversation, "messages": messages}
+
+
+@router.post("/{conversation_id}/messages", response_model=List[ConversationMessage])
+def append_messages(conversation_id: str, payload: AppendMessagesRequest):
+    appended = get_conversation_store().append(
+        conversation_id, [m.model_dump() for m in payload.messages]
+    )
+
+    if appended is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return appended
+
+
+@router.delete("/{conversation_id}")
+def delete_conversation(conversation_id: str):
+    if not get_conversation_store().delete(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return {"ok": True}
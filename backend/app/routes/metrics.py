@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
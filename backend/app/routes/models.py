@@ -1,19 +1,48 @@
-from fastapi import APIRouter, HTTPException, Query
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from app.registry.models import (
     get_models_for_provider,
-    get_all_models_for_provider,
+    model_registry,
 )
-from app.persistence.model_store import add_user_model
 
 router = APIRouter()
 
 @router.get("/models")
-def list_models(provider: str = Query(...)):
+def list_models(
+    request: Request,
+    response: Response,
+    provider: str = Query(...),
+    q: Optional[str] = Query(None),
+    source: Optional[Literal["builtin", "user"]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+    """
+    Built-in + user models for a provider.
+    Filter with `q` (id / name substring) and `source`, page with
+    `offset` / `limit`; the unpaged total is sent as X-Total-Count.
+    Responses carry an ETag: a matching If-None-Match gets a 304.
+    """
     try:
-        return get_all_models_for_provider(provider)
+        get_models_for_provider(provider)
     except KeyError:
         raise HTTPException(status_code=400, detail="Unknown provider")
 
+    etag = model_registry.etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    models = model_registry.list(provider, query=q, source=source)
+
+    response.headers.update(headers)
+    response.headers["X-Total-Count"] = str(len(models))
+
+    end = offset + limit if limit is not None else None
+    return models[offset:end]
+
 @router.post("/models")
 def add_model(payload: dict):
     provider = payload.get("provider")
@@ -39,5 +68,41 @@ def add_model(payload: dict):
     if "base_url" in payload:
         model["base_url"] = payload["base_url"]
 
-    add_user_model(model)
-    return {"ok": True}
\ No newline at end of file
+    # Context size in tokens (bounds history packing for this model)
+    if "context_window" in payload:
+        if not isinstance(payload["context_window"], int) or payload["context_window"] <= 0:
+            raise HTTPException(status_code=400, detail="context_window must be a positive integer")
+        model["context_window"] = payload["context_window"]
+
+    # Local server API flavour: "ollama" or "openai" (compatible)
+    if "api" in payload:
+        if payload["api"] not in ("ollama", "openai"):
+            raise HTTPException(status_code=400, detail="api must be 'ollama' or 'openai'")
+        model["api"] = payload["api"]
+
+    # Re-adding an id replaces the existing user model
+    try:
+        model_registry.add(model)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"ok": True}
+
+@router.delete("/models")
+def remove_model(provider: str = Query(...), id: str = Query(...)):
+    try:
+        get_models_for_provider(provider)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Unknown provider")
+
+    if not model_registry.remove(provider, id):
+        raise HTTPException(status_code=404, detail="Model not found")
+
+    return {"ok": True}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
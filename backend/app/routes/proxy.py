@@ -0,0 +1,109 @@
+import json
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.persistence.config_store import load_config
+from app.services.cache import cache_policy_from_headers, cache_status
+from app.services.llm import UpstreamErrorResponse, proxy_chat_completions
+from app.services.scheduler import PRIORITY_INTERACTIVE, priority_from_headers
+from app.utils.disconnect import cancel_on_disconnect, stream_until_disconnect
+from app.utils.timing import span
+
+router = APIRouter(prefix="/v1")
+
+
+def _resolve_entry(model: str) -> Dict[str, Any]:
+    """
+    Registry entry serving `model`, preferring the active one.
+    """
+    config = load_config()
+    if not config or not config.get("models"):
+        raise HTTPException(
+            status_code=400,
+            detail="System not configured. Run setup first."
+        )
+
+    models = config["models"]
+    active = models.get(config.get("active_model_id"))
+    candidates = ([active] if active else []) + list(models.values())
+
+    for entry in candidates:
+        if entry.get("model") == model:
+            return entry
+
+    raise HTTPException(status_code=404, detail=f"Model {model} is not configured")
+
+
+def _parse_body(body: bytes) -> Dict[str, Any]:
+    # Parsed for routing and rate limiting only; `body` is what gets sent
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    if (
+        not isinstance(payload, dict)
+        or not isinstance(payload.get("model"), str)
+        or not isinstance(payload.get("messages"), list)
+        or not all(isinstance(m, dict) for m in payload["messages"])
+    ):
+        raise HTTPException(status_code=400, detail="Expected model and messages")
+
+    return payload
+
+
+@router.post("/chat/completions")
+async def chat_completions(request: Request):
+    """
+    OpenAI-compatible pass-through.
+    The request body is forwarded unchanged to the provider of the
+    registry entry whose model it names (with that entry's key; the
+    caller's Authorization header is ignored), and the provider's
+    response, including SSE streams, is relayed as raw bytes.
+    A client disconnect aborts the upstream request.
+    """
+    with span("parse"):
+        body = await request.body()
+        payload = _parse_body(body)
+
+    entry = _resolve_entry(payload["model"])
+
+    return await cancel_on_disconnect(request, _relay(request, entry, body, payload))
+
+
+async def _relay(
+    request: Request,
+    entry: Dict[str, Any],
+    body: bytes,
+    payload: Dict[str, Any],
+) -> Response:
+    try:
+        result = await proxy_chat_completions(
+            provider=entry["provider"],
+            model=entry["model"],
+            api_key=entry.get("api_key"),
+            body=body,
+            payload=payload,
+            accept_encoding=request.headers.get("accept-encoding"),
+            cache=cache_policy_from_headers(request.headers),
+            priority=priority_from_headers(request.headers, PRIORITY_INTERACTIVE),
+        )
+    except UpstreamErrorResponse as e:
+        return Response(content=e.content, status_code=e.status_code, headers=e.headers)
+
+    headers = result.headers
+    if cache_status.get():
+        headers["X-Cache"] = cache_status.get()
+
+    if result.stream is not None:
+        headers.setdefault("Cache-Control", "no-cache")
+        headers["X-Accel-Buffering"] = "no"
+        return StreamingResponse(
+            stream_until_disconnect(request, result.stream),
+            status_code=result.status_code,
+            headers=headers,
+        )
+
+    return Response(content=result.content, status_code=result.status_code, headers=headers)
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter
 from app.manifest.system import system_state
 from app.schemas.system import SystemState
@@ -5,5 +7,8 @@ from app.schemas.system import SystemState
 router = APIRouter()
 
 @router.get("/status", response_model=SystemState)
-def system_status():
-    return SystemState(**system_state.as_dict())
\ No newline at end of file
+async def system_status():
+    # Only the config reload blocks; the stats are read on the event
+    # loop that owns them
+    await asyncio.to_thread(system_state.refresh)
+    return SystemState(**system_state.as_dict())
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional, Set
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.config import settings
+from app.manifest.system import system_state
+from app.routes.chat import stream_chat
+from app.schemas.chat import ChatRequest
+from app.schemas.system import SystemState
+from app.services.cache import cache_policy_from_headers
+from app.services.scheduler import PRIORITY_INTERACTIVE, priority_from_headers
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Close code for a client that stopped reading (RFC 6455 "try again later")
+_CLOSE_SLOW_CLIENT = 1013
+
+
+class _SlowClient(Exception):
+    pass
+
+
+class _SendBuffer:
+    """
+    Frames waiting to be written to one socket, at most `limit` bytes.
+    Stream frames wait for room, which pauses the upstream read behind
+    them; a state frame replaces an unsent one instead of queueing.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self._frames: Deque[str] = deque()
+        self._state: Optional[str] = None
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    async def put(self, frame: str) -> None:
+        # One frame may overshoot, so frames larger than the limit pass
+        while self.size >= self.limit:
+            self._writable.clear()
+            try:
+                await asyncio.wait_for(self._writable.wait(), settings.WS_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise _SlowClient()
+
+        self._frames.append(frame)
+        self.size += len(frame)
+        self._readable.set()
+
+    def put_nowait(self, frame: str) -> None:
+        """
+        For replies to client frames, which must not wait: a client
+        that keeps sending without reading is cut off instead.
+        """
+        if self.size >= self.limit:
+            raise _SlowClient()
+
+        self._frames.append(frame)
+        self.size += len(frame)
+        self._readable.set()
+
+    def put_state(self, frame: str) -> None:
+        self._state = frame
+        self._readable.set()
+
+    async def get(self) -> str:
+        while not self._frames and self._state is None:
+            self._readable.clear()
+            await self._readable.wait()
+
+        if self._state is not None:
+            frame, self._state = self._state, None
+            return frame
+
+        frame = self._frames.popleft()
+        self.size -= len(frame)
+        if self.size < self.limit:
+            self._writable.set()
+        return frame
+
+
+class _StateFeed:
+    """
+    SystemState snapshots for every open socket: checked once per
+    WS_STATE_INTERVAL while anyone is connected, and pushed only when
+    the configuration or a model's health verdict changes (counters
+    and latency stats move all the time; /status has them).
+    """
+
+    def __init__(self):
+        self._buffers: Set[_SendBuffer] = set()
+        self._last: Optional[str] = None
+        self._last_key: Optional[Hashable] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def subscribe(self, buffer: _SendBuffer) -> None:
+        self._buffers.add(buffer)
+        if self._last is not None:
+            buffer.put_state(self._last)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def unsubscribe(self, buffer: _SendBuffer) -> None:
+        self._buffers.discard(buffer)
+        if not self._buffers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._last = None
+            self._last_key = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._check()
+            except Exception:
+                # Keep the feed alive; the next round tries again
+                logger.exception("WebSocket state feed failed")
+
+            await asyncio.sleep(settings.WS_STATE_INTERVAL)
+
+    async def _check(self) -> None:
+        # Reads the config store: off the event loop
+        await asyncio.to_thread(system_state.refresh)
+        state = SystemState(**system_state.as_dict())
+
+        key = _state_key(state)
+        if key == self._last_key:
+            return
+
+        self._last_key = key
+        self._last = json.dumps({"type": "state", "state": state.model_dump()})
+        for buffer in self._buffers:
+            buffer.put_state(self._last)
+
+
+def _state_key(state: SystemState) -> Hashable:
+    health = state.health or {}
+    return (
+        state.configured,
+        state.provider,
+        state.model,
+        state.api_key_present,
+        state.auth_ok,
+        tuple(sorted(
+            (model_id, result["status"] if result else None)
+            for model_id, result in health.items()
+        )),
+    )
+
+
+_state_feed = _StateFeed()
+
+
+class _Connection:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.buffer = _SendBuffer(settings.WS_SEND_BUFFER)
+        self.streams: Dict[str, "asyncio.Task[None]"] = {}
+        self.slow = asyncio.Event()
+
+        # Per connection, as for HTTP requests
+        self.cache = cache_policy_from_headers(websocket.headers)
+        self.priority = priority_from_headers(websocket.headers, PRIORITY_INTERACTIVE)
+
+    async def run(self) -> None:
+        reader = asyncio.ensure_future(self._read())
+        writer = asyncio.ensure_future(self._write())
+        slow = asyncio.ensure_future(self.slow.wait())
+        _state_feed.subscribe(self.buffer)
+
+        try:
+            await asyncio.wait({reader, writer, slow}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            _state_feed.unsubscribe(self.buffer)
+            for task in (reader, writer, slow, *self.streams.values()):
+                task.cancel()
+
+        if self.slow.is_set():
+            # The close frame queues behind unread data: don't wait for
+            # it for long (the transport is dropped when we return)
+            try:
+                await asyncio.wait_for(
+                    self.websocket.close(code=_CLOSE_SLOW_CLIENT, reason="Client too slow"),
+                    settings.WS_SEND_TIMEOUT,
+                )
+            except (asyncio.TimeoutError, WebSocketDisconnect):
+                pass
+
+    async def _read(self) -> None:
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+                if message.get("text") is None:
+                    self._error(None, 400, "Expected a text frame")
+                    continue
+
+                self._handle(message["text"])
+
+        except _SlowClient:
+            self.slow.set()
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                await self.websocket.send_text(await self.buffer.get())
+        except (WebSocketDisconnect, RuntimeError):
+            # Socket closed under us
+            pass
+
+    def _handle(self, text: str) -> None:
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            frame = None
+
+        if not isinstance(frame, dict) or not isinstance(frame.get("id"), str):
+            self._error(None, 400, "Expected a JSON object with a string id")
+            return
+
+        stream_id = frame["id"]
+
+        if frame.get("type") == "cancel":
+            task = self.streams.pop(stream_id, None)
+            if task is not None:
+                task.cancel()
+                self._notify({"type": "cancelled", "id": stream_id})
+            return
+
+        if frame.get("type") != "chat":
+            self._error(stream_id, 400, "Unknown frame type")
+            return
+
+        if stream_id in self.streams:
+            self._error(stream_id, 409, "Stream id already in use")
+            return
+
+        if len(self.streams) >= settings.WS_MAX_STREAMS:
+            self._error(stream_id, 429, f"Too many streams (max {settings.WS_MAX_STREAMS})")
+            return
+
+        try:
+            req = ChatRequest.model_validate(frame.get("request"))
+        except ValidationError as e:
+            self._error(stream_id, 422, e.errors(include_url=False, include_context=False))
+            return
+
+        self.streams[stream_id] = asyncio.ensure_future(self._stream(stream_id, req))
+
+    async def _stream(self, stream_id: str, req: ChatRequest) -> None:
+        events = None
+
+        try:
+            events, winner_id = await stream_chat(req, cache=self.cache, priority=self.priority)
+            await self._send({"type": "start", "id": stream_id, "model_id": winner_id})
+
+            async for event, data in events:
+                await self._send({"type": event, "id": stream_id, **data})
+
+        except _SlowClient:
+            self.slow.set()
+
+        except HTTPException as e:
+            await self._send_error(stream_id, e.status_code, e.detail)
+
+        except Exception:
+            logger.exception("WebSocket stream failed")
+            await self._send_error(stream_id, 502, "Unexpected provider error")
+
+        finally:
+            if self.streams.get(stream_id) is asyncio.current_task():
+                del self.streams[stream_id]
+            if events is not None:
+                await events.aclose()
+
+    async def _send(self, frame: Dict[str, Any]) -> None:
+        await self.buffer.put(json.dumps(frame))
+
+    async def _send_error(self, stream_id: str, status: int, detail: Any) -> None:
+        # Ends a stream: a client too slow to take it is disconnected
+        try:
+            await self._send({"type": "error", "id": stream_id, "status": status, "detail": detail})
+        except _SlowClient:
+            self.slow.set()
+
+    def _notify(self, frame: Dict[str, Any]) -> None:
+        self.buffer.put_nowait(json.dumps(frame))
+
+    def _error(self, stream_id: Optional[str], status: int, detail: Any) -> None:
+        self._notify({"type": "error", "id": stream_id, "status": status, "detail": detail})
+
+
+@router.websocket("/ws")
+async def websocket_chat(websocket: WebSocket):
+    """
+    Chat over one persistent connection, many streams at once.
+
+    Client frames (JSON text):
+    - {"type": "chat", "id": <stream id>, "request": <ChatRequest>}
+    - {"type": "cancel", "id": <stream id>}
+
+    Server frames carry the stream id: `start` (model_id), then the
+    `token` / `done` / `error` events of POST /chat/stream, or
+    `cancelled`. `state` frames (no id) push SystemState whenever the
+    configuration or a model's health changes. A client that stops
+    reading has its streams paused once WS_SEND_BUFFER bytes are
+    pending and is disconnected after WS_SEND_TIMEOUT seconds.
+    """
+    await websocket.accept()
+    await _Connection(websocket).run()
@@ -1,3 +1,3 @@
-from .chat import ChatRequest, ChatResponse
+from .chat import ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse
 from .models import ModelOut
 from .system import SystemState
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 
 
 class ChatMessage(BaseModel):
@@ -10,6 +10,100 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
 
+    # Server-side conversation: `messages` then only holds the new turn(s),
+    # and the turn plus the reply are appended to it
+    conversation_id: Optional[str] = None
+
+    # Optional generation parameters (forwarded to the provider)
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    top_p: Optional[float] = None
+
+    # For auto routing: how much speed matters for this request
+    # (default ROUTING_AUTO_DEFAULT_CLASS)
+    latency_class: Optional[Literal["fast", "balanced", "quality"]] = None
+
+    def generation_params(self) -> Dict[str, Any]:
+        return self.model_dump(
+            include={"temperature", "max_tokens", "top_p"},
+            exclude_none=True,
+        )
+
+    def message_dicts(self) -> List[Dict[str, str]]:
+        return [m.model_dump() for m in self.messages]
+
+
+class ContextReport(BaseModel):
+    # Estimated prompt size after packing, and the model's budget
+    prompt_tokens: int
+    budget: int
+    # Oldest turns left out to fit the budget
+    trimmed_messages: int
+    trimmed_tokens: int
+    # Left-out turns were replaced by a summary
+    summarized: bool
+
+
+class RoutingReport(BaseModel):
+    mode: str
+    # Estimated prompt size the choice was based on
+    prompt_tokens: int
+    # Registry ids in the order they were (or would have been) tried
+    candidates: List[str]
+    # Auto mode only
+    latency_class: Optional[str] = None
+    reason: Optional[str] = None
+    predicted_ms: Optional[Dict[str, Optional[float]]] = None
+
 
 class ChatResponse(BaseModel):
     content: str
+
+    # Registry entry that produced the answer (may be a fallback)
+    model_id: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+
+    context: Optional[ContextReport] = None
+    routing: Optional[RoutingReport] = None
+    conversation_id: Optional[str] = None
+
+
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
+    # Max items in flight at once (capped by BATCH_MAX_CONCURRENCY)
+    concurrency: Optional[int] = Field(None, ge=1)
+
+
+class BatchChatError(BaseModel):
+    status: int
+    detail: Any
+
+
+class BatchChatItem(BaseModel):
+    index: int
+    content: Optional[str] = None
+    # Registry entry that answered, or whose error `error` is
+    model_id: Optional[str] = None
+    error: Optional[BatchChatError] = None
+
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatItem]
+
+
+class ChatJob(BaseModel):
+    id: str
+    # queued | running | succeeded | failed | cancelled
+    status: str
+    priority: str
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # When a finished job is dropped
+    expires_at: Optional[float] = None
+
+    # Set once the job has finished (not included in listings)
+    result: Optional[ChatResponse] = None
+    error: Optional[BatchChatError] = None
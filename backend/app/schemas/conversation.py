@@ -0,0 +1,60 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from .chat import ChatMessage
+
+
+class ConversationCreate(BaseModel):
+    title: Optional[str] = None
+    messages: List[ChatMessage] = Field(default_factory=list)
+
+
+class AppendMessagesRequest(BaseModel):
+    messages: List[ChatMessage]
+
+
+class ConversationMessage(BaseModel):
+    seq: int
+    role: str
+    content: str
+    created_at: float
+    # Model that wrote an assistant message
+    provider: Optional[str] = None
+    model: Optional[str] = None
+
+
+class ConversationOut(BaseModel):
+    id: str
+    title: Optional[str] = None
+    message_count: int
+    created_at: float
+    updated_at: float
+
+
+class ConversationDetail(ConversationOut):
+    # One page of the thread (see offset / limit)
+    messages: List[ConversationMessage]
+
+
+class SearchHit(BaseModel):
+    conversation_id: str
+    title: Optional[str] = None
+    seq: int
+    role: str
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    created_at: float
+    # Matching excerpt with terms wrapped in <mark>…</mark>
+    # (message text is not HTML-escaped)
+    snippet: str
+    # Relevance, higher is better
+    score: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    offset: int
+    limit: int
+    has_more: bool
+    # Recent messages not yet in the index
+    pending: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 class SystemState(BaseModel):
@@ -9,3 +9,13 @@ class SystemState(BaseModel):
     display_name: Optional[str] = None
     auth_ok: Optional[bool] = None
     api_key_present: Optional[bool] = None  # ← ADD
+
+    # Runtime stats
+    cache: Optional[Dict[str, Any]] = None
+    singleflight: Optional[Dict[str, Any]] = None
+    rate_limits: Optional[Dict[str, Any]] = None
+    scheduler: Optional[Dict[str, Any]] = None
+    latency: Optional[Dict[str, Any]] = None
+    stream_latency: Optional[Dict[str, Any]] = None
+    breakers: Optional[Dict[str, Any]] = None
+    health: Optional[Dict[str, Any]] = None
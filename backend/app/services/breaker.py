@@ -0,0 +1,169 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.config import settings
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_transport_failure(error: BaseException) -> bool:
+    """
+    Failures that say the provider is unhealthy (5xx, timeouts,
+    connection errors), as opposed to auth or request errors.
+    """
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500 and error.status_code != 501
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+def is_auth_failure(error: BaseException) -> bool:
+    return isinstance(error, HTTPException) and error.status_code in (401, 403)
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker over a sliding time window.
+
+    closed:    calls pass; opens when at least BREAKER_MIN_REQUESTS
+               outcomes in the window have a failure rate at or above
+               BREAKER_FAILURE_RATE.
+    open:      calls fail fast with 503 for BREAKER_OPEN_SECONDS.
+    half_open: a limited number of probe calls pass; a success closes
+               the circuit, a failure opens it again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+
+        # (timestamp, ok) outcomes inside the window
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._probes = 0
+
+    def before_call(self) -> None:
+        """
+        Raise 503 if the circuit does not admit a call right now.
+        """
+        if self.state == OPEN:
+            remaining = self.opened_at + settings.BREAKER_OPEN_SECONDS - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self.state = HALF_OPEN
+            self._probes = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes >= settings.BREAKER_HALF_OPEN_PROBES:
+                self._reject(1.0)
+            self._probes += 1
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self._outcomes.clear()
+            self._probes = 0
+            return
+
+        self._record(True)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+
+        self._record(False)
+
+        total, failures = self._counts()
+        if (
+            total >= settings.BREAKER_MIN_REQUESTS
+            and failures / total >= settings.BREAKER_FAILURE_RATE
+        ):
+            self._open()
+
+    def record_neutral(self) -> None:
+        """
+        Outcome that says nothing about provider health (auth or
+        request error). Releases a half-open probe slot.
+        """
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def is_open(self) -> bool:
+        """
+        Failing fast right now (not even a probe would be admitted).
+        """
+        return (
+            self.state == OPEN
+            and time.monotonic() < self.opened_at + settings.BREAKER_OPEN_SECONDS
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        total, failures = self._counts()
+        opened_for = 0.0
+        if self.state == OPEN:
+            opened_for = max(
+                0.0,
+                self.opened_at + settings.BREAKER_OPEN_SECONDS - time.monotonic(),
+            )
+
+        return {
+            "state": self.state,
+            "requests": total,
+            "failure_rate": round(failures / total, 3) if total else None,
+            "retry_in": round(opened_for, 1),
+            "rejected": self.rejected,
+        }
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        self._trim(now)
+
+    def _counts(self) -> Tuple[int, int]:
+        self._trim(time.monotonic())
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return len(self._outcomes), failures
+
+    def _trim(self, now: float) -> None:
+        horizon = now - settings.BREAKER_WINDOW_SECONDS
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            self._outcomes.popleft()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._probes = 0
+
+    def _reject(self, retry_after: float) -> None:
+        self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"{self.name} is unavailable (circuit open)",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+
+def get_breaker(provider: str, model: str) -> CircuitBreaker:
+    breaker = _breakers.get((provider, model))
+
+    if breaker is None:
+        breaker = CircuitBreaker(f"{provider}/{model}")
+        _breakers[(provider, model)] = breaker
+
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Any]:
+    return {b.name: b.stats() for b in _breakers.values()}
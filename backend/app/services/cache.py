@@ -0,0 +1,241 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+# Cache policies accepted by call_llm / stream_llm
+CACHE_DEFAULT = "default"   # read and write
+CACHE_REFRESH = "refresh"   # skip lookup, store the fresh result
+CACHE_BYPASS = "bypass"     # neither read nor write
+
+# Outcome of the most recent lookup in this request context
+# ("HIT", "MISS" or None when the cache was not consulted)
+cache_status: ContextVar[Optional[str]] = ContextVar("cache_status", default=None)
+
+
+def cache_key(
+    provider: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Stable key for a completion request.
+    Messages are normalised (line endings, surrounding whitespace)
+    so trivially different prompts share an entry.
+    """
+    normalized = [
+        [m.get("role", "user"), m.get("content", "").replace("\r\n", "\n").strip()]
+        for m in messages
+    ]
+
+    raw = json.dumps(
+        [provider, model, normalized, params or {}],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cache_policy_from_headers(headers: Any) -> str:
+    """
+    Map request headers to a cache policy.
+    `Cache-Control: no-store` / `X-Cache-Bypass: 1` skip the cache,
+    `Cache-Control: no-cache` forces a fresh upstream call.
+    """
+    if headers.get("x-cache-bypass", "").lower() in ("1", "true", "yes"):
+        return CACHE_BYPASS
+
+    directives = {
+        d.strip().lower()
+        for d in headers.get("cache-control", "").split(",")
+    }
+
+    if "no-store" in directives:
+        return CACHE_BYPASS
+    if "no-cache" in directives:
+        return CACHE_REFRESH
+    return CACHE_DEFAULT
+
+
+class ResponseCache:
+    """
+    Exact-match completion cache.
+    Memory tier: LRU bounded by entry count and total bytes, with TTL.
+    Optional disk tier (SQLite) consulted on memory misses.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        disk_path: Optional[Path] = None,
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_path = disk_path
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._disk: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry:
+                self._remove(key)
+
+            value, expires_at = self._disk_get(key, now)
+            if value is not None:
+                self._put(key, value, expires_at)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._put(key, value, expires_at)
+            self._disk_set(key, value, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._disk_conn():
+                self._disk.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    # ---- Memory tier ----
+
+    def _put(self, key: str, value: str, expires_at: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (expires_at, value)
+        self._bytes += size
+
+        while (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value.encode())
+
+    # ---- Disk tier ----
+
+    def _disk_conn(self) -> Optional[sqlite3.Connection]:
+        if self.disk_path is None:
+            return None
+
+        if self._disk is None:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._disk = sqlite3.connect(
+                self.disk_path, isolation_level=None, check_same_thread=False
+            )
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("PRAGMA synchronous=NORMAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS responses_expires_at"
+                " ON responses (expires_at)"
+            )
+
+        return self._disk
+
+    def _disk_get(self, key: str, now: float) -> Tuple[Optional[str], float]:
+        conn = self._disk_conn()
+        if conn is None:
+            return None, 0.0
+
+        row = conn.execute(
+            "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+
+        return (row[0], row[1]) if row else (None, 0.0)
+
+    def _disk_set(self, key: str, value: str, expires_at: float) -> None:
+        conn = self._disk_conn()
+        if conn is None:
+            return
+
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+
+def _disk_path() -> Optional[Path]:
+    if not settings.RESPONSE_CACHE_DISK_PATH:
+        return None
+    return Path(settings.RESPONSE_CACHE_DISK_PATH).expanduser()
+
+
+# Process-wide response cache (disabled unless RESPONSE_CACHE_ENABLED=1)
+response_cache = ResponseCache(
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    disk_path=_disk_path(),
+)
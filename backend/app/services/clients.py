@@ -0,0 +1,81 @@
+import importlib.util
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+
+# HTTP/2 needs the optional `h2` package (httpx[http2])
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# One long-lived pooled client per provider
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+# Upstream timeout (seconds) for calls made in this context, overriding
+# HTTP_TIMEOUT (e.g. background jobs allow long generations)
+upstream_timeout: ContextVar[Optional[float]] = ContextVar("upstream_timeout", default=None)
+
+
+class UpstreamTiming:
+    """
+    Seconds the last upstream call made in a context took, from send
+    (after the rate limiter let it through) to the full response, or
+    to the response headers for streams. A mutable holder, so that
+    calls run in tasks copying the context (e.g. single-flight) still
+    report back to whoever set it.
+    """
+
+    def __init__(self):
+        self.seconds: Optional[float] = None
+
+
+upstream_timing: ContextVar[Optional[UpstreamTiming]] = ContextVar("upstream_timing", default=None)
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    """
+    Return the shared client for a provider, creating it on first use.
+    Connections are kept alive and reused across requests.
+    """
+    client = _clients.get(provider)
+
+    if client is None or client.is_closed:
+        client = _new_client()
+        _clients[provider] = client
+
+    return client
+
+
+def request_timeout() -> Any:
+    """
+    `timeout` argument for building an upstream request.
+    """
+    timeout = upstream_timeout.get()
+    return httpx.Timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+
+
+def _new_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+    return httpx.AsyncClient(
+        http2=settings.HTTP2_ENABLED and _HTTP2_AVAILABLE,
+        limits=limits,
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT),
+    )
+
+
+async def close_clients() -> None:
+    """
+    Close every pooled client. Called at backend shutdown.
+    """
+    clients = list(_clients.values())
+    _clients.clear()
+
+    for client in clients:
+        await client.aclose()
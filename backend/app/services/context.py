@@ -0,0 +1,190 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.registry.models import get_model_by_id
+from app.services.llm import call_llm
+from app.services.scheduler import PRIORITY_INTERACTIVE
+
+# Word pieces of up to 4 characters or single punctuation marks:
+# close to BPE counts for prose and code, without a tokenizer
+_PIECE_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Role / separator tokens added per chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_SUMMARY_PROMPT = (
+    "Summarise the conversation below in a few sentences. Keep names, "
+    "facts, decisions and open questions; omit pleasantries."
+)
+_SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+@lru_cache(maxsize=settings.CONTEXT_ESTIMATOR_CACHE)
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate token count of `text` (cached per distinct string,
+    so history resent every turn is only scanned once).
+    """
+    return len(_PIECE_RE.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut `text` after about `max_tokens` estimated tokens.
+    """
+    for i, piece in enumerate(_PIECE_RE.finditer(text)):
+        if i == max_tokens:
+            return text[:piece.start()].rstrip()
+    return text
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def conversation_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def context_budget(provider: str, model: str, params: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Prompt token budget for a model: its `context_window` (registry,
+    else CONTEXT_DEFAULT_WINDOW) minus the completion allowance,
+    capped at CONTEXT_MAX_PROMPT_TOKENS.
+    """
+    entry = get_model_by_id(provider, model) or {}
+    window = entry.get("context_window") or settings.CONTEXT_DEFAULT_WINDOW
+    completion = (params or {}).get("max_tokens") or settings.RATE_LIMIT_DEFAULT_COMPLETION_TOKENS
+
+    return max(0, min(settings.CONTEXT_MAX_PROMPT_TOKENS, window - completion))
+
+
+class PackedContext:
+    """
+    Messages to send upstream plus what packing left out.
+    """
+
+    def __init__(
+        self,
+        messages: List[Dict[str, str]],
+        budget: int,
+        prompt_tokens: int,
+        trimmed_messages: int = 0,
+        trimmed_tokens: int = 0,
+    ):
+        self.messages = messages
+        self.budget = budget
+        self.prompt_tokens = prompt_tokens
+        self.trimmed_messages = trimmed_messages
+        self.trimmed_tokens = trimmed_tokens
+        self.summarized = False
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "budget": self.budget,
+            "trimmed_messages": self.trimmed_messages,
+            "trimmed_tokens": self.trimmed_tokens,
+            "summarized": self.summarized,
+        }
+
+
+def pack_messages(
+    messages: List[Dict[str, str]],
+    budget: int,
+) -> Tuple[PackedContext, List[Dict[str, str]]]:
+    """
+    Keep every system message and the most recent turns that fit in
+    `budget` (the latest message is always kept).
+    Returns the packed context and the dropped (oldest) turns.
+    """
+    system = [m for m in messages if m["role"] == "system"]
+    turns = [m for m in messages if m["role"] != "system"]
+
+    used = sum(message_tokens(m) for m in system)
+    kept = 0
+
+    for message in reversed(turns):
+        cost = message_tokens(message)
+        if kept and used + cost > budget:
+            break
+        used += cost
+        kept += 1
+
+    dropped = turns[:len(turns) - kept]
+    packed = PackedContext(
+        messages=system + turns[len(turns) - kept:],
+        budget=budget,
+        prompt_tokens=used,
+        trimmed_messages=len(dropped),
+        trimmed_tokens=sum(message_tokens(m) for m in dropped),
+    )
+    return packed, dropped
+
+
+async def build_context(
+    entry: Dict[str, Any],
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> PackedContext:
+    """
+    Fit a conversation into the budget of a registry entry's model.
+    With CONTEXT_SUMMARIZE, dropped turns are replaced by a summary
+    (best effort: on failure they are simply left out); the summary
+    call queues at `priority`.
+    """
+    budget = context_budget(entry["provider"], entry["model"], params)
+    packed, dropped = pack_messages(messages, budget)
+
+    if not dropped or not settings.CONTEXT_SUMMARIZE:
+        return packed
+
+    # Re-pack leaving room for the summary
+    packed, dropped = pack_messages(messages, budget - settings.CONTEXT_SUMMARY_TOKENS)
+
+    try:
+        summary = await _summarize(entry, dropped, budget, priority)
+    except HTTPException:
+        return packed
+
+    # Models don't always honour max_tokens: hold the summary to its share
+    room = settings.CONTEXT_SUMMARY_TOKENS - MESSAGE_OVERHEAD_TOKENS - estimate_tokens(_SUMMARY_PREFIX)
+    summary_message = {
+        "role": "system",
+        "content": _SUMMARY_PREFIX + truncate_tokens(summary, room),
+    }
+
+    system_count = sum(1 for m in packed.messages if m["role"] == "system")
+    packed.messages.insert(system_count, summary_message)
+    packed.prompt_tokens += message_tokens(summary_message)
+    packed.budget = budget
+    packed.summarized = True
+    return packed
+
+
+async def _summarize(
+    entry: Dict[str, Any],
+    dropped: List[Dict[str, str]],
+    budget: int,
+    priority: str,
+) -> str:
+    # The transcript itself must fit: summarise its most recent part
+    recent, _ = pack_messages(dropped, budget - estimate_tokens(_SUMMARY_PROMPT))
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in recent.messages)
+
+    return await call_llm(
+        provider=entry["provider"],
+        model=entry["model"],
+        api_key=entry.get("api_key"),
+        messages=[
+            {"role": "system", "content": _SUMMARY_PROMPT},
+            {"role": "user", "content": transcript},
+        ],
+        params={"max_tokens": settings.CONTEXT_SUMMARY_TOKENS},
+        priority=priority,
+    )
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.persistence.config_store import load_config, update_registry_models
+from app.services.breaker import is_auth_failure
+from app.services.llm import has_free_probe, probe_model
+
+logger = logging.getLogger(__name__)
+
+# Verdicts
+HEALTH_OK = "ok"
+HEALTH_AUTH_FAILED = "auth_failed"
+HEALTH_UNAVAILABLE = "unavailable"
+
+
+def _entry_key(entry: Dict[str, Any]) -> str:
+    # A new key or model is a different thing to verify
+    raw = f"{entry.get('provider')}\0{entry.get('model')}\0{entry.get('api_key') or ''}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class HealthCache:
+    """
+    Verification results per registry entry (provider, model, key),
+    fresh for `ttl` seconds (run_health_checks renews them before they
+    expire). Concurrent checks of one entry share a single probe.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._probes: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+    async def check(self, entry: Dict[str, Any], max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Result no older than `max_age` seconds (default: the TTL),
+        probing the provider if the cached one is older.
+        """
+        key = _entry_key(entry)
+        max_age = self.ttl if max_age is None else max_age
+
+        cached = self._results.get(key)
+        if cached is not None and time.time() - cached["checked_at"] <= max_age:
+            return cached
+
+        probe = self._probes.get(key)
+        if probe is None:
+            probe = asyncio.ensure_future(self._probe(key, entry))
+            self._probes[key] = probe
+
+        # Shielded: one caller giving up does not cancel the others' probe
+        return await asyncio.shield(probe)
+
+    async def check_all(
+        self,
+        models: Dict[str, Dict[str, Any]],
+        max_age: Optional[float] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        check() every registry entry concurrently, by entry id.
+        """
+        results = await asyncio.gather(*(
+            self.check(entry, max_age) for entry in models.values()
+        ))
+        return dict(zip(models, results))
+
+    def status(self, entry: Dict[str, Any]) -> Optional[str]:
+        """
+        Latest verdict for one entry, stale or not (None if never checked).
+        """
+        result = self._results.get(_entry_key(entry))
+        return result["status"] if result is not None else None
+
+    def report(self, models: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Latest result per entry id (None if never checked).
+        """
+        now = time.time()
+        report = {}
+
+        for model_id, entry in models.items():
+            result = self._results.get(_entry_key(entry))
+            report[model_id] = (
+                {**result, "fresh": now - result["checked_at"] <= self.ttl}
+                if result is not None else None
+            )
+
+        return report
+
+    async def _probe(self, key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"status": HEALTH_OK, "probe": None, "error": None}
+
+        try:
+            result["probe"] = await probe_model(
+                entry["provider"], entry["model"], entry.get("api_key")
+            )
+        except HTTPException as e:
+            result["status"] = HEALTH_AUTH_FAILED if is_auth_failure(e) else HEALTH_UNAVAILABLE
+            result["error"] = {"status": e.status_code, "detail": e.detail}
+        except Exception:
+            result["status"] = HEALTH_UNAVAILABLE
+            result["error"] = {"status": 502, "detail": "Unexpected provider error"}
+        finally:
+            self._probes.pop(key, None)
+
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["checked_at"] = time.time()
+        self._results[key] = result
+        return result
+
+
+# Process-wide health results
+health_cache = HealthCache(ttl=settings.HEALTH_TTL)
+
+
+async def verify_models(
+    models: Dict[str, Dict[str, Any]],
+    max_age: Optional[float] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Check registry entries concurrently and store each one's auth
+    verdict as its `auth_ok`. Outages leave `auth_ok` untouched.
+    """
+    results = await health_cache.check_all(models, max_age)
+
+    patches = {
+        model_id: {"auth_ok": result["status"] == HEALTH_OK}
+        for model_id, result in results.items()
+        if result["status"] in (HEALTH_OK, HEALTH_AUTH_FAILED)
+        and models[model_id].get("auth_ok") != (result["status"] == HEALTH_OK)
+    }
+    if patches:
+        await asyncio.to_thread(update_registry_models, patches)
+
+    return results
+
+
+async def run_health_checks() -> None:
+    """
+    Keep every registered model's health result fresh, so switching
+    models needs no verification round trip. Runs for the lifetime
+    of the app; each round re-probes the results that would expire
+    before the next one. Models only a completion can probe are left
+    to explicit verification unless HEALTH_CHECK_COMPLETIONS is set.
+    A failed round is logged and the next one runs as usual.
+    """
+    if settings.HEALTH_CHECK_INTERVAL <= 0:
+        return
+
+    while True:
+        try:
+            config = await asyncio.to_thread(load_config)
+            models = {
+                model_id: entry
+                for model_id, entry in ((config or {}).get("models") or {}).items()
+                if settings.HEALTH_CHECK_COMPLETIONS or has_free_probe(entry.get("provider"))
+            }
+            if models:
+                await verify_models(
+                    models,
+                    max_age=max(0.0, settings.HEALTH_TTL - settings.HEALTH_CHECK_INTERVAL),
+                )
+        except RuntimeError:
+            # Config reset meanwhile
+            pass
+        except Exception:
+            logger.exception("Background health check failed")
+
+        await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
@@ -0,0 +1,191 @@
+import asyncio
+import sqlite3
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.persistence.job_store import FINISHED_STATES, get_job_store
+from app.schemas.chat import ChatRequest, ChatResponse
+from app.services.clients import upstream_timeout
+
+# Runs one job: the chat request and its priority class
+JobHandler = Callable[..., Awaitable[ChatResponse]]
+
+# Wakeup key for idle workers
+_QUEUE = "queue"
+
+# Expired jobs are hidden on read; this only reclaims their rows
+_PURGE_INTERVAL = 60
+
+# Jobs running in this process, by id
+_running: Dict[str, "asyncio.Task[ChatResponse]"] = {}
+
+
+class _Wakeups:
+    """
+    In-process wakeups, by key (a job id, or _QUEUE for new jobs).
+    Changes made by other processes are picked up by polling every
+    JOBS_POLL_INTERVAL instead.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def notify(self, key: str) -> None:
+        event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def wait(self, key: str, timeout: float) -> None:
+        event = self._events.setdefault(key, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+_wakeups = _Wakeups()
+
+
+# ---- API side ----
+
+async def submit_job(req: ChatRequest, priority: str) -> Optional[Dict[str, Any]]:
+    """
+    Queue a chat request. None if the job store is full.
+    """
+    job = await asyncio.to_thread(
+        get_job_store().create, req.model_dump(exclude_none=True), priority
+    )
+    if job is not None:
+        _wakeups.notify(_QUEUE)
+    return job
+
+
+async def wait_for_job(job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """
+    The job once it has finished, or as it is after `timeout` seconds.
+    None if it does not exist.
+    """
+    store = get_job_store()
+    deadline = asyncio.get_running_loop().time() + timeout
+
+    while True:
+        job = await asyncio.to_thread(store.get, job_id)
+        remaining = deadline - asyncio.get_running_loop().time()
+
+        if job is None or job["status"] in FINISHED_STATES or remaining <= 0:
+            return job
+
+        await _wakeups.wait(job_id, min(remaining, settings.JOBS_POLL_INTERVAL))
+
+
+async def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Cancel a queued or running job. A job running in another process
+    stops at that worker's next lease renewal.
+    """
+    job = await asyncio.to_thread(get_job_store().cancel, job_id)
+
+    task = _running.get(job_id)
+    if task is not None:
+        task.cancel()
+    _wakeups.notify(job_id)
+
+    return job
+
+
+# ---- Workers ----
+
+async def run_job_workers(handler: JobHandler) -> None:
+    """
+    Run queued chat jobs, JOBS_CONCURRENCY at a time, for the lifetime
+    of the app. Every process may run workers: jobs are claimed inside
+    a write transaction. On shutdown running jobs go back to the queue.
+    """
+    # Nobody is waiting on the response: allow long generations
+    upstream_timeout.set(settings.JOBS_UPSTREAM_TIMEOUT)
+
+    await asyncio.gather(
+        _sweep(),
+        *(_work(handler) for _ in range(settings.JOBS_CONCURRENCY)),
+    )
+
+
+async def _work(handler: JobHandler) -> None:
+    store = get_job_store()
+
+    while True:
+        try:
+            job = await asyncio.to_thread(store.claim)
+        except sqlite3.Error:
+            # Busy / locked: retry next round
+            job = None
+
+        if job is None:
+            await _wakeups.wait(_QUEUE, settings.JOBS_POLL_INTERVAL)
+            continue
+
+        await _run(job, handler)
+
+
+async def _run(job: Dict[str, Any], handler: JobHandler) -> None:
+    store = get_job_store()
+    job_id = job["id"]
+
+    task = asyncio.ensure_future(
+        handler(ChatRequest.model_validate(job["request"]), priority=job["priority"])
+    )
+    _running[job_id] = task
+
+    try:
+        # Keep the lease while the job runs
+        while not task.done():
+            await asyncio.wait({task}, timeout=settings.JOBS_LEASE_SECONDS / 3)
+
+            if not task.done() and not await _renew(job_id):
+                # Cancelled, or lease lost to another worker
+                task.cancel()
+
+    except asyncio.CancelledError:
+        # Shutting down: back to the queue for the next worker
+        task.cancel()
+        store.release(job_id)
+        raise
+
+    finally:
+        _running.pop(job_id, None)
+
+    if task.cancelled():
+        return
+
+    result = error = None
+    try:
+        result = task.result().model_dump()
+    except HTTPException as e:
+        error = {"status": e.status_code, "detail": e.detail}
+    except Exception:
+        error = {"status": 502, "detail": "Unexpected provider error"}
+
+    await asyncio.to_thread(store.finish, job_id, result, error)
+    _wakeups.notify(job_id)
+
+
+async def _renew(job_id: str) -> bool:
+    try:
+        return await asyncio.to_thread(get_job_store().renew, job_id)
+    except sqlite3.Error:
+        # Busy / locked: the lease still has time left
+        return True
+
+
+async def _sweep() -> None:
+    store = get_job_store()
+
+    while True:
+        try:
+            await asyncio.to_thread(store.purge)
+        except sqlite3.Error:
+            pass
+
+        await asyncio.sleep(_PURGE_INTERVAL)
@@ -1,33 +1,125 @@
-import requests
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import httpx
 from fastapi import HTTPException
 
+from app.services.cache import (
+    CACHE_BYPASS,
+    CACHE_DEFAULT,
+    CACHE_REFRESH,
+    cache_key,
+    cache_status,
+    response_cache,
+)
+from app.config import settings
+from app.services.breaker import get_breaker, is_transport_failure
+from app.services.clients import get_client, request_timeout, upstream_timing
+from app.services.metrics import (
+    record_ttft,
+    record_upstream,
+    record_usage,
+)
+from app.services.ratelimit import (
+    Permit,
+    ProviderLimiter,
+    backoff_delay,
+    estimate_request_tokens,
+    get_limiter,
+    parse_retry_after,
+)
+from app.services.scheduler import PRIORITY_INTERACTIVE, PRIORITY_VERIFY, SlotStream, scheduler
+from app.services.singleflight import SingleFlight, StreamFlight
+from app.registry.models import get_model_by_id
+from app.utils.streams import ClosingStream
+from app.utils.timing import span
+
 
 # ---- Provider endpoints ----
 
-GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-HF_CHAT_URL = "https://api-inference.huggingface.co/models"
+GROQ_CHAT_URL = settings.GROQ_CHAT_URL
+OPENAI_CHAT_URL = settings.OPENAI_CHAT_URL
+HF_CHAT_URL = settings.HF_CHAT_URL
+
+
+T = TypeVar("T")
+
+# Identical concurrent requests share one upstream call
+call_flight = SingleFlight()
+stream_flight = StreamFlight(max_lag=settings.SINGLEFLIGHT_STREAM_MAX_LAG)
 
 
 # ---- Main dispatcher ----
 
-def call_llm(
+async def call_llm(
     provider: str,
     model: str,
     api_key: str | None,
-    message: str,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+    cache: str = CACHE_DEFAULT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> str:
+    """
+    Run a completion over chat `messages` ({"role", "content"} dicts,
+    already packed to fit the model; see app.services.context).
+    `params` are generation parameters (temperature, max_tokens, top_p)
+    forwarded to the provider.
+    `cache` is a response cache policy (see app.services.cache).
+    `priority` is the scheduler class the upstream call queues in
+    (see app.services.scheduler); cache hits never queue.
+    """
+    key = _cache_lookup_key(provider, model, messages, params, cache)
+
+    if key and cache != CACHE_REFRESH:
+        with span("cache"):
+            hit = response_cache.get(key)
+        cache_status.set("HIT" if hit is not None else "MISS")
+        if hit is not None:
+            return hit
+
+    async def run() -> str:
+        slot = await scheduler.acquire(priority)
+        try:
+            reply = await _guarded(
+                provider, model,
+                lambda: _dispatch(provider, model, api_key, messages, params),
+            )
+        finally:
+            slot.release()
+        if key:
+            response_cache.set(key, reply)
+        return reply
+
+    if settings.SINGLEFLIGHT_ENABLED:
+        flight_key = _flight_key(provider, model, api_key, messages, params)
+        return await call_flight.do(flight_key, run)
+
+    return await run()
+
+
+async def _dispatch(
+    provider: str,
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]],
 ) -> str:
     if provider == "groq":
-        return _call_groq(model, api_key, message)
+        return await _call_groq(model, api_key, messages, params)
 
     if provider == "openai":
-        return _call_openai(model, api_key, message)
+        return await _call_openai(model, api_key, messages, params)
 
     if provider == "huggingface":
-        return _call_huggingface(model, api_key, message)
+        return await _call_huggingface(model, api_key, messages, params)
 
     if provider == "local":
-        return _call_local(model, message)
+        return await _call_local(model, api_key, messages, params)
 
     raise HTTPException(
         status_code=400,
@@ -35,15 +127,371 @@ def call_llm(
     )
 
 
+async def stream_llm(
+    provider: str,
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+    cache: str = CACHE_DEFAULT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of call_llm (the scheduler slot is held
+    until the stream ends).
+    Returns an async iterator of {"type": "token", "content": ...} events
+    as the provider produces them, followed by one
+    {"type": "done", "usage": ...} event.
+    Upstream errors are raised when awaited, before the first event.
+    """
+    key = _cache_lookup_key(provider, model, messages, params, cache)
+
+    if key and cache != CACHE_REFRESH:
+        with span("cache"):
+            hit = response_cache.get(key)
+        cache_status.set("HIT" if hit is not None else "MISS")
+        if hit is not None:
+            return _single_event_stream(hit)
+
+    async def open_stream() -> AsyncIterator[Dict[str, Any]]:
+        slot = await scheduler.acquire(priority)
+        started = time.perf_counter()
+        try:
+            events = await _guarded(
+                provider, model,
+                lambda: _open_stream(provider, model, api_key, messages, params),
+                stream=True,
+            )
+        except BaseException:
+            slot.release()
+            raise
+
+        events = ClosingStream(_observe_stream(provider, model, events, started), source=events)
+        if key:
+            events = ClosingStream(_cache_stream(key, events), source=events)
+        return SlotStream(events, slot)
+
+    if settings.SINGLEFLIGHT_ENABLED:
+        flight_key = _flight_key(provider, model, api_key, messages, params)
+        return await stream_flight.subscribe(flight_key, open_stream)
+
+    return await open_stream()
+
+
+async def _open_stream(
+    provider: str,
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]],
+) -> AsyncIterator[Dict[str, Any]]:
+    if provider == "groq":
+        return await _stream_openai_compatible(
+            "groq", GROQ_CHAT_URL, "Groq", model, api_key, messages, params
+        )
+
+    if provider == "openai":
+        return await _stream_openai_compatible(
+            "openai", OPENAI_CHAT_URL, "OpenAI", model, api_key, messages, params
+        )
+
+    if provider == "local":
+        return await _stream_local(model, api_key, messages, params)
+
+    if provider == "huggingface":
+        # No native stream mode: emit the full completion as one token
+        reply = await _dispatch(provider, model, api_key, messages, params)
+        return _single_event_stream(reply)
+
+    raise HTTPException(
+        status_code=400,
+        detail=f"Unsupported provider: {provider}"
+    )
+
+
+async def _guarded(
+    provider: str,
+    model: str,
+    fn: Callable[[], Awaitable[T]],
+    stream: bool = False,
+) -> T:
+    """
+    Run an upstream call behind the provider/model circuit breaker
+    and record its outcome and latency.
+    Only transport failures (5xx, timeouts) count against the circuit;
+    an open circuit fails fast with 503.
+    Streams record success later, when the stream completes.
+    """
+    breaker = get_breaker(provider, model)
+    started = time.perf_counter()
+
+    try:
+        breaker.before_call()
+    except HTTPException as e:
+        record_upstream(provider, model, started, e)
+        raise
+
+    try:
+        result = await fn()
+    except asyncio.CancelledError as e:
+        # Caller went away: says nothing about the provider
+        breaker.record_neutral()
+        record_upstream(provider, model, started, e)
+        raise
+    except BaseException as e:
+        if is_transport_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_neutral()
+        record_upstream(provider, model, started, e)
+        raise
+
+    breaker.record_success()
+    if not stream:
+        record_upstream(provider, model, started)
+    return result
+
+
+async def _observe_stream(
+    provider: str,
+    model: str,
+    events: AsyncIterator[Dict[str, Any]],
+    started: float,
+) -> AsyncIterator[Dict[str, Any]]:
+    # TTFT, total latency and usage for a streamed completion
+    first_token_at = None
+    finished = False
+
+    try:
+        async for event in events:
+            if event["type"] == "token" and first_token_at is None:
+                first_token_at = time.perf_counter()
+                record_ttft(provider, model, started)
+
+            elif event["type"] == "done":
+                finished = True
+                record_upstream(provider, model, started)
+                record_usage(
+                    provider, model, event.get("usage"),
+                    time.perf_counter() - (first_token_at or started),
+                )
+
+            yield event
+
+    except (Exception, asyncio.CancelledError, GeneratorExit) as e:
+        # Closed / cancelled before the end: counted as "cancelled"
+        if not finished:
+            record_upstream(provider, model, started, e)
+        raise
+
+
+def _flight_key(
+    provider: str,
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]],
+) -> str:
+    # Scoped by API key so callers never share another key's result
+    key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+    request_hash = cache_key(provider, model, messages, params)
+    return f"{request_hash}:{key_hash}"
+
+
+def _cache_lookup_key(
+    provider: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]],
+    cache: str,
+) -> Optional[str]:
+    if not response_cache.enabled or cache == CACHE_BYPASS:
+        return None
+
+    return cache_key(provider, model, messages, params)
+
+
+async def _cache_stream(
+    key: str,
+    events: AsyncIterator[Dict[str, Any]],
+) -> AsyncIterator[Dict[str, Any]]:
+    # Store the completion once the stream finished cleanly
+    parts = []
+
+    async for event in events:
+        if event["type"] == "token":
+            parts.append(event["content"])
+        elif event["type"] == "done":
+            response_cache.set(key, "".join(parts))
+        yield event
+
+
+# ---- Connection warm-up ----
+
+_WARM_URLS = {
+    "groq": GROQ_CHAT_URL,
+    "openai": OPENAI_CHAT_URL,
+    "huggingface": HF_CHAT_URL,
+}
+
+
+async def warm_up(providers: Iterable[str]) -> None:
+    """
+    Open pooled connections (TCP + TLS) to the given providers so the
+    first chat request does not pay the handshake. Failures are ignored.
+    """
+    async def _warm(provider: str) -> None:
+        try:
+            await get_client(provider).head(_WARM_URLS[provider], timeout=5)
+        except httpx.HTTPError:
+            pass
+
+    await asyncio.gather(*(
+        _warm(p) for p in set(providers) if p in _WARM_URLS
+    ))
+
+
+# ---- Upstream transport ----
+
+# Upstream statuses retried with backoff
+_RETRY_STATUSES = (429, 503)
+
+
+async def _send(
+    provider: str,
+    api_key: str | None,
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    stream: bool = False,
+    limiter: Optional[ProviderLimiter] = None,
+    content: Optional[bytes] = None,
+) -> Tuple[httpx.Response, Permit]:
+    """
+    POST through the provider's rate limiter (or the given `limiter`).
+    The body is `payload` as JSON, or `content` verbatim when given
+    (`payload` then only sizes the request for the limiter).
+    429 / 503 responses are retried with jittered backoff that honours
+    Retry-After; a 429 also pauses every request for the same key.
+    The caller must release the returned permit once the response
+    has been consumed.
+    """
+    limiter = limiter or get_limiter(provider, api_key)
+    client = get_client(provider)
+    tokens = estimate_request_tokens(payload)
+
+    attempt = 0
+    while True:
+        with span("queue"):
+            permit = await limiter.acquire(tokens)
+
+        r = None
+        try:
+            if content is not None:
+                request = client.build_request(
+                    "POST", url, content=content, headers=headers, timeout=request_timeout()
+                )
+            else:
+                request = client.build_request(
+                    "POST", url, json=payload, headers=headers, timeout=request_timeout()
+                )
+            with span("upstream"):
+                # Latency signal for the limiter is time to headers: a
+                # long generation must not look like an overloaded upstream
+                r = await client.send(request, stream=True)
+                permit.observe()
+                if not stream:
+                    await r.aread()
+        except BaseException as e:
+            if r is not None:
+                await r.aclose()
+            await permit.release(failed=True)
+            _raise_transport_error(provider, e)
+            raise
+
+        retry_after = parse_retry_after(r.headers.get("retry-after"))
+        if r.status_code == 429:
+            limiter.throttled += 1
+            if retry_after is not None:
+                limiter.pause(retry_after)
+
+        if (
+            r.status_code not in _RETRY_STATUSES
+            or attempt >= settings.RATE_LIMIT_MAX_RETRIES
+        ):
+            timing = upstream_timing.get()
+            if timing is not None:
+                timing.seconds = time.monotonic() - permit.started
+            return r, permit
+
+        await r.aclose()
+        await permit.release(throttled=r.status_code == 429)
+
+        limiter.retries += 1
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
+        attempt += 1
+
+
+async def _post(
+    provider: str,
+    api_key: str | None,
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    limiter: Optional[ProviderLimiter] = None,
+) -> httpx.Response:
+    r, permit = await _send(provider, api_key, url, payload, headers, limiter=limiter)
+    await permit.release(throttled=r.status_code == 429)
+    return r
+
+
+def _raise_transport_error(provider: str, e: BaseException) -> None:
+    if isinstance(e, httpx.TimeoutException):
+        raise HTTPException(
+            status_code=504, detail=f"{provider} request timed out"
+        ) from e
+    if isinstance(e, httpx.TransportError):
+        raise HTTPException(
+            status_code=502, detail=f"{provider} unreachable: {e}"
+        ) from e
+
+
+def _raise_for_status(r: httpx.Response, label: str) -> None:
+    if r.status_code == 401:
+        raise HTTPException(status_code=401, detail=f"Invalid {label} API key")
+
+    if r.status_code == 429:
+        retry_after = r.headers.get("retry-after")
+        raise HTTPException(
+            status_code=429,
+            detail=f"{label} rate limit exceeded",
+            headers={"Retry-After": retry_after} if retry_after else None,
+        )
+
+    if not r.is_success:
+        # Request errors (400, 403, 404, 422 ...) keep their status so
+        # they are not mistaken for an outage; 5xx become a 502
+        raise HTTPException(
+            status_code=r.status_code if 400 <= r.status_code < 500 else 502,
+            detail=f"{label} error: {r.text}"
+        )
+
+
 # ---- Providers ----
 
-def _call_groq(model: str, api_key: str | None, message: str) -> str:
+async def _call_groq(
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
     if not api_key:
         raise HTTPException(status_code=401, detail="Missing Groq API key")
 
     payload = {
         "model": model,
-        "messages": [{"role": "user", "content": message}],
+        "messages": messages,
+        **(params or {}),
     }
 
     headers = {
@@ -51,28 +499,28 @@ def _call_groq(model: str, api_key: str | None, message: str) -> str:
         "Content-Type": "application/json",
     }
 
-    r = requests.post(GROQ_CHAT_URL, json=payload, headers=headers, timeout=30)
+    r = await _post("groq", api_key, GROQ_CHAT_URL, payload, headers)
+    _raise_for_status(r, "Groq")
 
-    if r.status_code == 401:
-        raise HTTPException(status_code=401, detail="Invalid Groq API key")
-
-    if not r.ok:
-        raise HTTPException(
-            status_code=502,
-            detail=f"Groq error: {r.text}"
-        )
-
-    data = r.json()
+    with span("decode"):
+        data = r.json()
+    record_usage("groq", model, data.get("usage"), r.elapsed.total_seconds())
     return data["choices"][0]["message"]["content"]
 
 
-def _call_openai(model: str, api_key: str | None, message: str) -> str:
+async def _call_openai(
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
     if not api_key:
         raise HTTPException(status_code=401, detail="Missing OpenAI API key")
 
     payload = {
         "model": model,
-        "messages": [{"role": "user", "content": message}],
+        "messages": messages,
+        **(params or {}),
     }
 
     headers = {
@@ -80,22 +528,21 @@ def _call_openai(model: str, api_key: str | None, message: str) -> str:
         "Content-Type": "application/json",
     }
 
-    r = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-
-    if r.status_code == 401:
-        raise HTTPException(status_code=401, detail="Invalid OpenAI API key")
-
-    if not r.ok:
-        raise HTTPException(
-            status_code=502,
-            detail=f"OpenAI error: {r.text}"
-        )
+    r = await _post("openai", api_key, OPENAI_CHAT_URL, payload, headers)
+    _raise_for_status(r, "OpenAI")
 
-    data = r.json()
+    with span("decode"):
+        data = r.json()
+    record_usage("openai", model, data.get("usage"), r.elapsed.total_seconds())
     return data["choices"][0]["message"]["content"]
 
 
-def _call_huggingface(model: str, api_key: str | None, message: str) -> str:
+async def _call_huggingface(
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
     if not api_key:
         raise HTTPException(status_code=401, detail="Missing HuggingFace API key")
 
@@ -105,26 +552,17 @@ def _call_huggingface(model: str, api_key: str | None, message: str) -> str:
     }
 
     payload = {
-        "inputs": message,
+        "inputs": _render_prompt(messages),
     }
 
-    r = requests.post(
-        f"{HF_CHAT_URL}/{model}",
-        json=payload,
-        headers=headers,
-        timeout=30,
-    )
+    if params:
+        payload["parameters"] = _hf_parameters(params)
 
-    if r.status_code == 401:
-        raise HTTPException(status_code=401, detail="Invalid HuggingFace API key")
-
-    if not r.ok:
-        raise HTTPException(
-            status_code=502,
-            detail=f"HuggingFace error: {r.text}"
-        )
+    r = await _post("huggingface", api_key, f"{HF_CHAT_URL}/{model}", payload, headers)
+    _raise_for_status(r, "HuggingFace")
 
-    data = r.json()
+    with span("decode"):
+        data = r.json()
 
     # HF responses vary by model
     if isinstance(data, list) and "generated_text" in data[0]:
@@ -136,12 +574,610 @@ def _call_huggingface(model: str, api_key: str | None, message: str) -> str:
     )
 
 
-def _call_local(model: str, message: str) -> str:
+def _render_prompt(messages: List[Dict[str, str]]) -> str:
+    # Text-generation endpoints take one prompt: render the transcript
+    if len(messages) == 1 and messages[0]["role"] == "user":
+        return messages[0]["content"]
+
+    lines = [f"{m['role'].capitalize()}: {m['content']}" for m in messages]
+    return "\n".join(lines + ["Assistant:"])
+
+
+def _hf_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
+    # HF inference names the length limit max_new_tokens
+    parameters = dict(params)
+    if "max_tokens" in parameters:
+        parameters["max_new_tokens"] = parameters.pop("max_tokens")
+    return parameters
+
+
+async def _call_local(
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
     """
-    Placeholder for Ollama / local engines.
-    No API key.
+    Self-hosted model (Ollama or an OpenAI-compatible server).
+    The API key is optional.
     """
-    raise HTTPException(
-        status_code=501,
-        detail="Local provider not implemented yet"
+    base_url, api = _local_backend(model)
+    limiter = _local_limiter(base_url)
+    headers = _auth_headers(api_key)
+
+    if api == "openai":
+        payload = {
+            "model": model,
+            "messages": messages,
+            **(params or {}),
+        }
+
+        r = await _post("local", api_key, f"{base_url}/chat/completions", payload, headers, limiter)
+        _raise_for_status(r, "Local")
+
+        with span("decode"):
+            data = r.json()
+        record_usage("local", model, data.get("usage"), r.elapsed.total_seconds())
+        return data["choices"][0]["message"]["content"]
+
+    payload = _ollama_payload(model, messages, params, stream=False)
+
+    r = await _post("local", api_key, f"{base_url}/api/chat", payload, headers, limiter)
+    _raise_for_status(r, "Local")
+
+    with span("decode"):
+        data = r.json()
+
+    # eval_duration is generation time in nanoseconds
+    generation_seconds = (data.get("eval_duration") or 0) / 1e9 or r.elapsed.total_seconds()
+    record_usage("local", model, _ollama_usage(data), generation_seconds)
+    return data["message"]["content"]
+
+
+def _local_backend(model: str) -> Tuple[str, str]:
+    """
+    Base URL and API flavour ("ollama" | "openai") for a local model.
+    Per-model `base_url` / `api` come from user models; a base URL
+    ending in /v1 is taken as OpenAI-compatible.
+    """
+    entry = get_model_by_id("local", model) or {}
+    base_url = (entry.get("base_url") or settings.LOCAL_BASE_URL).rstrip("/")
+    api = entry.get("api") or ("openai" if base_url.endswith("/v1") else settings.LOCAL_API)
+    return base_url, api
+
+
+def _local_limiter(base_url: str) -> ProviderLimiter:
+    # Concurrency is capped per backend server, not per key
+    return get_limiter("local", base_url, max_concurrency=settings.LOCAL_MAX_CONCURRENCY)
+
+
+def _auth_headers(api_key: str | None) -> Dict[str, str]:
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+def _ollama_keep_alive() -> str | int:
+    # Ollama takes a duration ("30m") or seconds (-1 = keep loaded)
+    value = settings.LOCAL_KEEP_ALIVE
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _ollama_payload(
+    model: str,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]],
+    stream: bool,
+) -> Dict[str, Any]:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": _ollama_keep_alive(),
+    }
+
+    if params:
+        payload["options"] = _ollama_options(params)
+
+    return payload
+
+
+def _ollama_options(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Ollama names the completion budget num_predict
+    options = dict(params)
+    if "max_tokens" in options:
+        options["num_predict"] = options.pop("max_tokens")
+    return options
+
+
+def _ollama_usage(data: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    if "eval_count" not in data:
+        return None
+
+    prompt = data.get("prompt_eval_count") or 0
+    completion = data.get("eval_count") or 0
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+    }
+
+
+async def preload_local_models(models: Iterable[str]) -> None:
+    """
+    Ask Ollama to load the given models (an empty chat with keep_alive)
+    so the first request does not pay model load time.
+    Failures are ignored.
+    """
+    async def _preload(model: str) -> None:
+        base_url, api = _local_backend(model)
+        if api != "ollama":
+            return
+
+        try:
+            await get_client("local").post(
+                f"{base_url}/api/chat",
+                json={"model": model, "messages": [], "keep_alive": _ollama_keep_alive()},
+                timeout=settings.LOCAL_PRELOAD_TIMEOUT,
+            )
+        except httpx.HTTPError:
+            pass
+
+    await asyncio.gather(*(_preload(m) for m in set(models)))
+
+
+# ---- Streaming ----
+
+async def _stream_openai_compatible(
+    provider: str,
+    url: str,
+    label: str,
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+    limiter: Optional[ProviderLimiter] = None,
+    key_required: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    if key_required and not api_key:
+        raise HTTPException(status_code=401, detail=f"Missing {label} API key")
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        **(params or {}),
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+
+    headers = _auth_headers(api_key)
+
+    r, permit = await _send(provider, api_key, url, payload, headers, stream=True, limiter=limiter)
+    await _raise_for_stream_status(r, permit, label)
+
+    return _response_stream(_iter_openai_sse(r, permit), r, permit)
+
+
+async def _stream_local(
+    model: str,
+    api_key: str | None,
+    messages: List[Dict[str, str]],
+    params: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    base_url, api = _local_backend(model)
+    limiter = _local_limiter(base_url)
+
+    if api == "openai":
+        return await _stream_openai_compatible(
+            "local", f"{base_url}/chat/completions", "Local", model, api_key, messages, params,
+            limiter=limiter, key_required=False,
+        )
+
+    payload = _ollama_payload(model, messages, params, stream=True)
+    headers = _auth_headers(api_key)
+
+    r, permit = await _send(
+        "local", api_key, f"{base_url}/api/chat", payload, headers, stream=True, limiter=limiter
     )
+    await _raise_for_stream_status(r, permit, "Local")
+
+    return _response_stream(_iter_ollama_ndjson(r, permit), r, permit)
+
+
+def _response_stream(
+    events: AsyncIterator[Any],
+    r: httpx.Response,
+    permit: Permit,
+) -> ClosingStream:
+    # Closes the response and releases its permit even when the
+    # stream is closed before anything was read from it
+    async def close() -> None:
+        await r.aclose()
+        await permit.release()
+
+    return ClosingStream(events, on_close=close)
+
+
+async def _raise_for_stream_status(r: httpx.Response, permit: Permit, label: str) -> None:
+    if r.is_success:
+        return
+
+    try:
+        await r.aread()
+    finally:
+        await r.aclose()
+        await permit.release(throttled=r.status_code == 429)
+    _raise_for_status(r, label)
+
+
+async def _iter_openai_sse(
+    r: httpx.Response,
+    permit: Permit,
+) -> AsyncIterator[Dict[str, Any]]:
+    usage = None
+
+    try:
+        async for line in r.aiter_lines():
+            if not line or not line.startswith("data:"):
+                continue
+
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+
+            chunk = json.loads(data)
+
+            # OpenAI sends usage in a final choice-less chunk,
+            # Groq attaches it under x_groq on the last chunk
+            usage = (
+                chunk.get("usage")
+                or (chunk.get("x_groq") or {}).get("usage")
+                or usage
+            )
+
+            for choice in chunk.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield {"type": "token", "content": content}
+    finally:
+        await r.aclose()
+        await permit.release()
+
+    yield {"type": "done", "usage": usage}
+
+
+async def _iter_ollama_ndjson(
+    r: httpx.Response,
+    permit: Permit,
+) -> AsyncIterator[Dict[str, Any]]:
+    # One JSON object per line; the last has done=true and the counts
+    usage = None
+
+    try:
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise HTTPException(status_code=502, detail=f"Local error: {chunk['error']}")
+
+            content = (chunk.get("message") or {}).get("content")
+            if content:
+                yield {"type": "token", "content": content}
+
+            if chunk.get("done"):
+                usage = _ollama_usage(chunk)
+                break
+    finally:
+        await r.aclose()
+        await permit.release()
+
+    yield {"type": "done", "usage": usage}
+
+
+async def _single_event_stream(content: str) -> AsyncIterator[Dict[str, Any]]:
+    yield {"type": "token", "content": content}
+    yield {"type": "done", "usage": None}
+
+
+# ---- Health probes ----
+
+PROBE_MODEL_LIST = "model_list"
+PROBE_COMPLETION = "completion"
+
+_PROBE_LABELS = {"groq": "Groq", "openai": "OpenAI", "local": "Local"}
+
+
+def has_free_probe(provider: str) -> bool:
+    """
+    Whether probe_model checks the provider through its model list,
+    rather than a (billed, rate limited) one-token completion.
+    """
+    return provider in _PROBE_LABELS
+
+
+async def probe_model(provider: str, model: str, api_key: str | None) -> str:
+    """
+    Cheapest request proving that `api_key` can use `model`: the
+    provider's model list where it has one, else a one-token
+    completion. Returns the probe used (PROBE_*); failures raise
+    HTTPException as call_llm does (401 for a rejected key).
+    Queues in the verify scheduler class.
+    """
+    slot = await scheduler.acquire(PRIORITY_VERIFY)
+    try:
+        return await _guarded(provider, model, lambda: _probe(provider, model, api_key))
+    finally:
+        slot.release()
+
+
+async def _probe(provider: str, model: str, api_key: str | None) -> str:
+    if provider in ("groq", "openai"):
+        if not api_key:
+            raise HTTPException(
+                status_code=401, detail=f"Missing {_PROBE_LABELS[provider]} API key"
+            )
+        # OpenAI-style API root: .../v1/chat/completions -> .../v1/models
+        root = _WARM_URLS[provider].rsplit("/chat/completions", 1)[0]
+        await _probe_model_list(provider, model, api_key, f"{root}/models")
+        return PROBE_MODEL_LIST
+
+    if provider == "local":
+        base_url, api = _local_backend(model)
+        url = f"{base_url}/models" if api == "openai" else f"{base_url}/api/tags"
+        await _probe_model_list(provider, model, api_key, url, _local_limiter(base_url))
+        return PROBE_MODEL_LIST
+
+    # No model list to check against (HuggingFace)
+    await _dispatch(
+        provider, model, api_key,
+        [{"role": "user", "content": "ping"}],
+        {"max_tokens": 1},
+    )
+    return PROBE_COMPLETION
+
+
+async def _probe_model_list(
+    provider: str,
+    model: str,
+    api_key: str | None,
+    url: str,
+    limiter: Optional[ProviderLimiter] = None,
+) -> None:
+    limiter = limiter or get_limiter(provider, api_key)
+    label = _PROBE_LABELS[provider]
+
+    permit = await limiter.acquire(0)
+    try:
+        r = await get_client(provider).get(
+            url, headers=_auth_headers(api_key), timeout=request_timeout()
+        )
+    except BaseException as e:
+        await permit.release(failed=True)
+        _raise_transport_error(provider, e)
+        raise
+
+    permit.observe()
+    await permit.release(throttled=r.status_code == 429)
+    _raise_for_status(r, label)
+
+    with span("decode"):
+        data = r.json()
+
+    # OpenAI: {"data": [{"id"}]}; Ollama: {"models": [{"name"}]}
+    listed = {m.get("id") for m in data.get("data") or []}
+    listed |= {m.get("name") for m in data.get("models") or []}
+
+    if model not in listed and f"{model}:latest" not in listed:
+        raise HTTPException(status_code=404, detail=f"{label} model {model} not found")
+
+
+# ---- OpenAI-compatible pass-through ----
+
+# Upstream response headers relayed to pass-through clients
+_PROXY_HEADERS = ("content-type", "content-encoding", "retry-after", "x-request-id")
+_PROXY_HEADER_PREFIXES = ("x-ratelimit-", "openai-")
+
+# `usage` object (one level of nesting for *_tokens_details)
+_USAGE_RE = re.compile(rb'"usage"\s*:\s*(\{(?:[^{}]|\{[^{}]*\})*\})')
+
+# Streamed usage arrives in the last chunks: only the tail is scanned
+_USAGE_TAIL_BYTES = 4096
+
+
+class ProxyResponse:
+    """
+    Upstream response for the pass-through endpoint: `content` for a
+    complete body, or `stream`, an async iterator of raw byte chunks.
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Dict[str, str],
+        content: Optional[bytes] = None,
+        stream: Optional[AsyncIterator[bytes]] = None,
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.stream = stream
+
+
+class UpstreamErrorResponse(HTTPException):
+    """
+    Error response from the provider, relayed to the client unchanged.
+    Raised (rather than returned) so the breaker and metrics count it.
+    """
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes):
+        super().__init__(status_code=status_code, detail="Upstream error", headers=headers)
+        self.content = content
+
+
+async def proxy_chat_completions(
+    provider: str,
+    model: str,
+    api_key: str | None,
+    body: bytes,
+    payload: Dict[str, Any],
+    accept_encoding: Optional[str] = None,
+    cache: str = CACHE_DEFAULT,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> ProxyResponse:
+    """
+    Forward an OpenAI chat completions request body to the provider
+    byte for byte and relay the response (JSON or SSE) the same way,
+    with no decode / re-encode. `payload` is the parsed body, used
+    only to size the request for the rate limiter.
+    Goes through the same cache, scheduler, limiter, breaker and
+    metrics as call_llm; identical bodies share cache entries.
+    Upstream error responses raise UpstreamErrorResponse.
+    """
+    stream = payload.get("stream") is True
+    media_type = "text/event-stream" if stream else "application/json"
+    key = _raw_cache_key(provider, body) if response_cache.enabled and cache != CACHE_BYPASS else None
+
+    if key and cache != CACHE_REFRESH:
+        with span("cache"):
+            hit = response_cache.get(key)
+        cache_status.set("HIT" if hit is not None else "MISS")
+        if hit is not None:
+            return ProxyResponse(200, {"content-type": media_type}, content=hit.encode())
+
+    url, limiter = _proxy_target(provider, model, api_key)
+    headers = _auth_headers(api_key)
+    # Whatever the client accepts is what it gets: no transcoding here
+    headers["Accept-Encoding"] = accept_encoding or "identity"
+
+    async def send() -> Tuple[httpx.Response, Permit]:
+        r, permit = await _send(
+            provider, api_key, url, payload, headers,
+            stream=True, limiter=limiter, content=body,
+        )
+        if not r.is_success:
+            try:
+                content = await r.aread()
+            finally:
+                await r.aclose()
+                await permit.release(throttled=r.status_code == 429)
+            raise UpstreamErrorResponse(r.status_code, _relay_headers(r), content)
+        return r, permit
+
+    slot = await scheduler.acquire(priority)
+    started = time.perf_counter()
+    try:
+        r, permit = await _guarded(provider, model, send, stream=True)
+    except BaseException:
+        slot.release()
+        raise
+
+    # Only identity-encoded bodies are cached (hits are served as-is)
+    if "content-encoding" in r.headers:
+        key = None
+
+    relay = SlotStream(
+        _response_stream(_relay_raw(provider, model, r, permit, started, key), r, permit),
+        slot,
+    )
+    if stream:
+        return ProxyResponse(r.status_code, _relay_headers(r), stream=relay)
+
+    content = b"".join([chunk async for chunk in relay])
+    return ProxyResponse(r.status_code, _relay_headers(r), content=content)
+
+
+def _proxy_target(
+    provider: str,
+    model: str,
+    api_key: str | None,
+) -> Tuple[str, Optional[ProviderLimiter]]:
+    # Chat completions URL and limiter override for a provider
+    if provider == "local":
+        base_url, api = _local_backend(model)
+        # Ollama serves the OpenAI API under /v1
+        url = f"{base_url}/chat/completions" if api == "openai" else f"{base_url}/v1/chat/completions"
+        return url, _local_limiter(base_url)
+
+    urls = {"groq": (GROQ_CHAT_URL, "Groq"), "openai": (OPENAI_CHAT_URL, "OpenAI")}
+    if provider not in urls:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provider {provider} has no OpenAI-compatible endpoint"
+        )
+
+    url, label = urls[provider]
+    if not api_key:
+        raise HTTPException(status_code=401, detail=f"Missing {label} API key")
+    return url, None
+
+
+def _raw_cache_key(provider: str, body: bytes) -> str:
+    # Exact request bytes (the body names the model)
+    return "raw:" + hashlib.sha256(provider.encode() + b"\0" + body).hexdigest()
+
+
+def _relay_headers(r: httpx.Response) -> Dict[str, str]:
+    return {
+        name: value
+        for name, value in r.headers.items()
+        if name in _PROXY_HEADERS or name.startswith(_PROXY_HEADER_PREFIXES)
+    }
+
+
+def _scan_usage(data: bytes) -> Optional[Dict[str, Any]]:
+    # Last usage object in a raw body, without parsing the rest
+    matches = _USAGE_RE.findall(data)
+    if not matches:
+        return None
+
+    try:
+        return json.loads(matches[-1])
+    except ValueError:
+        return None
+
+
+async def _relay_raw(
+    provider: str,
+    model: str,
+    r: httpx.Response,
+    permit: Permit,
+    started: float,
+    key: Optional[str],
+) -> AsyncIterator[bytes]:
+    # Raw upstream chunks, recording TTFT / latency / usage on the way
+    first_chunk_at = None
+    tail = b""
+    parts: Optional[List[bytes]] = [] if key else None
+
+    try:
+        async for chunk in r.aiter_raw():
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter()
+                record_ttft(provider, model, started)
+
+            tail = (tail + chunk)[-_USAGE_TAIL_BYTES:]
+            if parts is not None:
+                parts.append(chunk)
+            yield chunk
+
+    except (Exception, asyncio.CancelledError, GeneratorExit) as e:
+        record_upstream(provider, model, started, e)
+        raise
+    finally:
+        await r.aclose()
+        await permit.release()
+
+    record_upstream(provider, model, started)
+    record_usage(
+        provider, model, _scan_usage(tail),
+        time.perf_counter() - (first_chunk_at or started),
+    )
+
+    if parts is not None:
+        response_cache.set(key, b"".join(parts).decode("utf-8", "replace"))
@@ -0,0 +1,308 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+
+# Latency buckets (seconds) shared by the latency histograms
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 400, 800, 1600)
+
+
+class _Shards:
+    """
+    One dict per thread. Writers only touch their own shard, so the
+    hot path needs no lock; readers merge copies of every shard.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[Dict[Any, Any]] = []
+
+    def mine(self) -> Dict[Any, Any]:
+        shard = getattr(self._local, "shard", None)
+
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._all.append(shard)
+
+        return shard
+
+    def copies(self) -> List[Dict[Any, Any]]:
+        with self._lock:
+            shards = list(self._all)
+        return [shard.copy() for shard in shards]
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._shards = _Shards()
+
+    def inc(self, *label_values: str, value: float = 1.0) -> None:
+        shard = self._shards.mine()
+        shard[label_values] = shard.get(label_values, 0.0) + value
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._shards.copies():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_num(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._shards = _Shards()
+
+    def observe(self, *label_values: str, value: float) -> None:
+        shard = self._shards.mine()
+        series = shard.get(label_values)
+
+        if series is None:
+            # [per-bucket counts..., +Inf count, sum]
+            series = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> Dict[Tuple[str, ...], List[float]]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._shards.copies():
+            for key, series in shard.items():
+                merged = totals.setdefault(key, [0] * len(series))
+                for i, v in enumerate(list(series)):
+                    merged[i] += v
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        for key, series in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.labels + ("le",), key + (_num(bound),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+
+            total = cumulative + series[len(self.buckets)]
+            le = _labels(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{le} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {total}")
+
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ---- Metric definitions ----
+
+UPSTREAM_REQUESTS = Counter(
+    "projectx_upstream_requests_total",
+    "Upstream completion requests by outcome",
+    ("provider", "model", "outcome"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "projectx_upstream_latency_seconds",
+    "Upstream completion latency (full response)",
+    ("provider", "model"),
+)
+UPSTREAM_TTFT = Histogram(
+    "projectx_upstream_ttft_seconds",
+    "Upstream time to first token (streaming)",
+    ("provider", "model"),
+)
+UPSTREAM_TOKENS = Counter(
+    "projectx_upstream_tokens_total",
+    "Tokens reported in provider usage",
+    ("provider", "model", "kind"),
+)
+UPSTREAM_THROUGHPUT = Histogram(
+    "projectx_upstream_completion_tokens_per_second",
+    "Completion tokens per second per response",
+    ("provider", "model"),
+    buckets=THROUGHPUT_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "projectx_http_requests_total",
+    "HTTP requests by route and status",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "projectx_http_request_duration_seconds",
+    "HTTP request duration including streamed body",
+    ("method", "route"),
+)
+HTTP_CANCELLED = Counter(
+    "projectx_http_cancelled_total",
+    "Requests abandoned by the client before the response completed",
+    ("method", "route"),
+)
+
+ALL_METRICS = (
+    UPSTREAM_REQUESTS,
+    UPSTREAM_LATENCY,
+    UPSTREAM_TTFT,
+    UPSTREAM_TOKENS,
+    UPSTREAM_THROUGHPUT,
+    HTTP_REQUESTS,
+    HTTP_LATENCY,
+    HTTP_CANCELLED,
+)
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- Recording helpers ----
+
+def error_class(error: BaseException) -> str:
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    if isinstance(error, HTTPException):
+        status = error.status_code
+        if status in (401, 403):
+            return "auth_error"
+        if status == 429:
+            return "rate_limited"
+        if status == 503:
+            return "unavailable"
+        if status == 504:
+            return "timeout"
+        if status >= 500:
+            return "upstream_error"
+        return "client_error"
+    return "internal_error"
+
+
+def record_upstream(
+    provider: str,
+    model: str,
+    started: float,
+    error: Optional[BaseException] = None,
+) -> None:
+    outcome = "ok" if error is None else error_class(error)
+    UPSTREAM_REQUESTS.inc(provider, model, outcome)
+
+    if error is None:
+        UPSTREAM_LATENCY.observe(provider, model, value=time.perf_counter() - started)
+
+
+def record_cancelled(scope: Dict[str, Any]) -> None:
+    # Client went away mid-request (streams included, whatever the status)
+    HTTP_CANCELLED.inc(scope.get("method", ""), _route_path(scope))
+
+
+def record_ttft(provider: str, model: str, started: float) -> None:
+    UPSTREAM_TTFT.observe(provider, model, value=time.perf_counter() - started)
+
+
+def record_usage(
+    provider: str,
+    model: str,
+    usage: Optional[Dict[str, Any]],
+    generation_seconds: Optional[float] = None,
+) -> None:
+    """
+    Count prompt / completion tokens from a provider `usage` object.
+    """
+    if not usage:
+        return
+
+    prompt = usage.get("prompt_tokens") or 0
+    completion = usage.get("completion_tokens") or 0
+
+    if prompt:
+        UPSTREAM_TOKENS.inc(provider, model, "prompt", value=prompt)
+    if completion:
+        UPSTREAM_TOKENS.inc(provider, model, "completion", value=completion)
+        if generation_seconds:
+            UPSTREAM_THROUGHPUT.observe(
+                provider, model, value=completion / generation_seconds
+            )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts and latency.
+    Uses the matched route template so path params don't explode
+    label cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = _route_path(scope)
+            method = scope.get("method", "")
+
+            HTTP_REQUESTS.inc(method, path, str(status))
+            HTTP_LATENCY.observe(method, path, value=time.perf_counter() - started)
+
+
+def _route_path(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,308 @@
+import asyncio
+import email.utils
+import hashlib
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute.
+    Takes are reserved up front (the balance may go negative), so the
+    returned wait time gives FIFO ordering without polling.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def take(self, n: float) -> float:
+        """
+        Reserve n tokens; return seconds to wait before using them.
+        """
+        self._refill()
+        self.tokens -= n
+        return max(0.0, -self.tokens / self._rate)
+
+    def refund(self, n: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + n)
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit.
+    Additive increase (+1 per limit's worth of successes), multiplicative
+    decrease on upstream 429s (x0.5) and on latency (time to response
+    headers) well above the observed baseline (x0.9).
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self._changed = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float], throttled: bool) -> None:
+        async with self._changed:
+            self.in_flight -= 1
+
+            if throttled:
+                self.limit = max(self.minimum, self.limit * 0.5)
+            elif latency is not None:
+                self._observe(latency)
+
+            self._changed.notify_all()
+
+    def _observe(self, latency: float) -> None:
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+            return
+
+        if latency > self.baseline_latency * settings.RATE_LIMIT_LATENCY_FACTOR:
+            self.limit = max(self.minimum, self.limit * 0.9)
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+        # Slow-moving baseline so a single outlier doesn't shift it
+        self.baseline_latency = 0.95 * self.baseline_latency + 0.05 * latency
+
+
+class Permit:
+    """
+    Admission for one upstream request; must be released exactly once.
+    """
+
+    def __init__(self, limiter: "ProviderLimiter"):
+        self.limiter = limiter
+        self.started = time.monotonic()
+        self.latency: Optional[float] = None
+        self._released = False
+
+    def observe(self) -> None:
+        """
+        Record upstream latency (response headers received).
+        Streams release their permit much later, at end of stream.
+        """
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+    async def release(self, throttled: bool = False, failed: bool = False) -> None:
+        if self._released:
+            return
+        self._released = True
+
+        latency = None if failed else self.latency
+        await self.limiter.concurrency.release(latency, throttled)
+
+
+class ProviderLimiter:
+    """
+    Request/token budgets and adaptive concurrency for one provider key.
+    Callers beyond the wait queue bound, or whose wait would exceed
+    RATE_LIMIT_MAX_WAIT, are rejected immediately with a 429.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float,
+        tpm: float,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+        cap = max_concurrency or settings.RATE_LIMIT_MAX_CONCURRENCY
+        self.concurrency = AdaptiveConcurrency(
+            initial=min(settings.RATE_LIMIT_INITIAL_CONCURRENCY, cap),
+            minimum=1,
+            maximum=min(settings.RATE_LIMIT_MAX_CONCURRENCY, cap),
+        )
+
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.retries = 0
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens: int) -> Permit:
+        if self.queued >= settings.RATE_LIMIT_MAX_QUEUE:
+            self._reject(1.0)
+
+        now = time.monotonic()
+        wait = max(0.0, self._paused_until - now)
+
+        if self.requests:
+            wait = max(wait, self.requests.take(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.take(tokens))
+
+        if wait > settings.RATE_LIMIT_MAX_WAIT:
+            if self.requests:
+                self.requests.refund(1)
+            if self.tokens:
+                self.tokens.refund(tokens)
+            self._reject(wait)
+
+        self.queued += 1
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            await self.concurrency.acquire()
+        except asyncio.CancelledError:
+            # Gave up before sending: the reservation is unused
+            if self.requests:
+                self.requests.refund(1)
+            if self.tokens:
+                self.tokens.refund(tokens)
+            raise
+        finally:
+            self.queued -= 1
+
+        return Permit(self)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold every request for this key until the provider's
+        Retry-After has elapsed.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "rpm_available": round(self.requests.available(), 1) if self.requests else None,
+            "tpm_available": round(self.tokens.available(), 1) if self.tokens else None,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+    def _reject(self, retry_after: float) -> None:
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit queue full for {self.name}",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+_limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+
+
+def get_limiter(
+    provider: str,
+    api_key: Optional[str],
+    max_concurrency: Optional[int] = None,
+) -> ProviderLimiter:
+    """
+    Limiter for a provider + API key pair (limits are per key upstream).
+    Self-hosted backends are keyed by base URL and pass a fixed
+    `max_concurrency` cap instead.
+    """
+    key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()[:8]
+    limiter = _limiters.get((provider, key_hash))
+
+    if limiter is None:
+        rpm, tpm = _limits_for(provider)
+        limiter = ProviderLimiter(f"{provider}:{key_hash}", rpm, tpm, max_concurrency)
+        _limiters[(provider, key_hash)] = limiter
+
+    return limiter
+
+
+def limiter_stats() -> Dict[str, Any]:
+    return {limiter.name: limiter.stats() for limiter in _limiters.values()}
+
+
+def _limits_for(provider: str) -> Tuple[float, float]:
+    # Per-provider overrides, e.g. RATE_LIMIT_GROQ_RPM=30
+    prefix = f"RATE_LIMIT_{provider.upper().replace('-', '_')}"
+    overrides = settings.RATE_LIMIT_OVERRIDES
+    rpm = overrides.get(f"{prefix}_RPM", settings.RATE_LIMIT_RPM)
+    tpm = overrides.get(f"{prefix}_TPM", settings.RATE_LIMIT_TPM)
+    return rpm, tpm
+
+
+def estimate_request_tokens(payload: Dict[str, Any]) -> int:
+    """
+    Rough token cost of a request for the tokens/min budget:
+    prompt size (~4 chars per token) plus the completion allowance.
+    """
+    if "messages" in payload:
+        chars = sum(len(m.get("content") or "") for m in payload["messages"])
+        completion = payload.get("max_tokens") or settings.RATE_LIMIT_DEFAULT_COMPLETION_TOKENS
+    else:
+        chars = len(str(payload.get("inputs", "")))
+        completion = (payload.get("parameters") or {}).get(
+            "max_new_tokens", settings.RATE_LIMIT_DEFAULT_COMPLETION_TOKENS
+        )
+
+    return chars // 4 + 1 + int(completion)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After as seconds (delta-seconds or HTTP-date form).
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float]) -> float:
+    """
+    Full-jitter exponential backoff, never shorter than Retry-After.
+    """
+    ceiling = min(
+        settings.RATE_LIMIT_BACKOFF_MAX,
+        settings.RATE_LIMIT_BACKOFF_BASE * (2 ** attempt),
+    )
+    delay = random.uniform(0, ceiling)
+
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+
+    return delay
@@ -0,0 +1,371 @@
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.breaker import get_breaker, is_transport_failure
+from app.services.cache import cache_status
+from app.services.clients import UpstreamTiming, upstream_timing
+from app.services.context import context_budget
+from app.services.health import HEALTH_OK, health_cache
+
+T = TypeVar("T")
+
+# Routing modes for a registry entry's "routing" setting
+ROUTING_SINGLE = "single"       # active model only
+ROUTING_FAILOVER = "failover"   # next fallback after a 5xx / timeout
+ROUTING_HEDGE = "hedge"         # duplicate to a fallback once p95 has passed
+ROUTING_AUTO = "auto"           # pick per request from active + fallbacks
+
+ROUTING_MODES = (ROUTING_SINGLE, ROUTING_FAILOVER, ROUTING_HEDGE, ROUTING_AUTO)
+
+# Latency classes a chat request may ask for (auto mode)
+LATENCY_FAST = "fast"           # lowest predicted latency
+LATENCY_BALANCED = "balanced"   # fastest for short prompts, else the active model
+LATENCY_QUALITY = "quality"     # the active model whenever the prompt fits
+
+LATENCY_CLASSES = (LATENCY_FAST, LATENCY_BALANCED, LATENCY_QUALITY)
+
+# How the most recent route() in this request context chose its
+# candidates (None when no routing happened)
+routing_decision: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "routing_decision", default=None
+)
+
+
+class LatencyTracker:
+    """
+    Recent successful upstream latencies per registry entry: a window
+    of samples for percentiles, and exponentially weighted averages of
+    latency and prompt size for predicting the next call (see predict).
+    One tracker holds one kind of latency (full completion, or time
+    to open a stream), so its percentiles compare like with like.
+    """
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.window = window
+        self.alpha = alpha
+        self._samples: Dict[str, Deque[float]] = {}
+        # EWMA of x (prompt tokens), y (seconds), x*x and x*y, per entry
+        self._ewma: Dict[str, Dict[str, float]] = {}
+
+    def record(self, model_id: str, seconds: float, prompt_tokens: int = 0) -> None:
+        samples = self._samples.get(model_id)
+        if samples is None:
+            samples = self._samples[model_id] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+        x, y = float(prompt_tokens), seconds
+        point = {"x": x, "y": y, "xx": x * x, "xy": x * y}
+        ewma = self._ewma.get(model_id)
+
+        if ewma is None:
+            ewma = self._ewma[model_id] = {**point, "samples": 0}
+        else:
+            for key, value in point.items():
+                ewma[key] += self.alpha * (value - ewma[key])
+
+        ewma["samples"] += 1
+        ewma["updated"] = time.monotonic()
+
+    def percentile(self, model_id: str, q: float) -> Optional[float]:
+        samples = self._samples.get(model_id)
+        if not samples or len(samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def predict(self, model_id: str, prompt_tokens: int) -> Optional[float]:
+        """
+        Expected seconds for a call with `prompt_tokens` of prompt:
+        fixed overhead plus prompt tokens over the model's throughput,
+        both fitted to the weighted samples. None without samples from
+        the last ROUTING_AUTO_STALE_SECONDS.
+        """
+        ewma = self._ewma.get(model_id)
+        if ewma is None or time.monotonic() - ewma["updated"] > settings.ROUTING_AUTO_STALE_SECONDS:
+            return None
+
+        overhead, per_token = _fit(ewma)
+        return overhead + per_token * prompt_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {}
+
+        for model_id, samples in self._samples.items():
+            stats[model_id] = {
+                "samples": len(samples),
+                "p50_ms": _ms(self.percentile(model_id, 0.5)),
+                "p95_ms": _ms(self.percentile(model_id, 0.95)),
+            }
+
+            ewma = self._ewma.get(model_id)
+            if ewma is not None:
+                overhead, per_token = _fit(ewma)
+                stats[model_id].update({
+                    "ewma_ms": _ms(ewma["y"]),
+                    "overhead_ms": _ms(overhead),
+                    "prompt_tokens_per_s": round(1 / per_token) if per_token > 0 else None,
+                })
+
+        return stats
+
+
+def _fit(ewma: Dict[str, float]) -> Tuple[float, float]:
+    # Weighted least squares of seconds on prompt tokens:
+    # (seconds at zero tokens, seconds per token)
+    variance = ewma["xx"] - ewma["x"] ** 2
+    per_token = 0.0
+    if variance > 1.0:
+        per_token = max(0.0, (ewma["xy"] - ewma["x"] * ewma["y"]) / variance)
+
+    return max(0.0, ewma["y"] - per_token * ewma["x"]), per_token
+
+
+# Completions: send to full response
+latency_tracker = LatencyTracker(alpha=settings.ROUTING_EWMA_ALPHA)
+# Streams: send to response headers
+stream_latency_tracker = LatencyTracker(alpha=settings.ROUTING_EWMA_ALPHA)
+
+
+def routing_plan(
+    models: Dict[str, Dict[str, Any]],
+    active_id: str,
+    tracker: LatencyTracker = latency_tracker,
+) -> Tuple[str, List[str], Optional[float]]:
+    """
+    Resolve the active entry's routing setting into
+    (mode, candidate ids in order, hedge delay in seconds); the hedge
+    delay defaults to the active entry's p95 in `tracker`.
+    """
+    routing = models[active_id].get("routing") or {}
+    mode = routing.get("mode") or ROUTING_SINGLE
+
+    if mode not in ROUTING_MODES:
+        mode = ROUTING_SINGLE
+
+    candidates = [active_id]
+    if mode != ROUTING_SINGLE:
+        candidates += [
+            fid for fid in routing.get("fallbacks") or []
+            if fid in models and fid != active_id
+        ]
+
+    hedge_delay = None
+    if mode == ROUTING_HEDGE:
+        if routing.get("hedge_after_ms") is not None:
+            hedge_delay = routing["hedge_after_ms"] / 1000
+        else:
+            p95 = tracker.percentile(active_id, 0.95)
+            hedge_delay = p95 if p95 is not None else settings.HEDGE_DEFAULT_DELAY_MS / 1000
+
+    return mode, candidates, hedge_delay
+
+
+def rank_candidates(
+    models: Dict[str, Dict[str, Any]],
+    pool: List[str],
+    prompt_tokens: int,
+    latency_class: str,
+    tracker: LatencyTracker = latency_tracker,
+) -> Tuple[List[str], str, Dict[str, Optional[float]]]:
+    """
+    Order an auto-routing pool (active model first) for one request:
+    (candidate ids, reason for the first pick, predicted latencies).
+
+    Models that are up and whose context budget holds the prompt come
+    first; among them "quality" requests, and "balanced" ones with a
+    long prompt, keep pool order, the others go fastest first. Models
+    without recent samples count as fastest, so they get measured.
+    The rest stay behind as failover candidates. Latencies are
+    predicted from `tracker`.
+    """
+    predicted = {
+        model_id: tracker.predict(model_id, prompt_tokens)
+        for model_id in pool
+    }
+
+    def eligible(model_id: str) -> bool:
+        entry = models[model_id]
+        return (
+            entry.get("auth_ok") is not False
+            and health_cache.status(entry) in (None, HEALTH_OK)
+            and not get_breaker(entry["provider"], entry["model"]).is_open()
+            and prompt_tokens <= context_budget(entry["provider"], entry["model"])
+        )
+
+    preferred = [model_id for model_id in pool if eligible(model_id)]
+    rest = [model_id for model_id in pool if model_id not in preferred]
+
+    if not preferred:
+        return pool, "no model is up and fits the prompt", predicted
+
+    if latency_class == LATENCY_QUALITY:
+        reason = "quality requested"
+    elif latency_class == LATENCY_BALANCED and prompt_tokens > settings.ROUTING_AUTO_SHORT_PROMPT_TOKENS:
+        reason = "long prompt"
+    else:
+        # Stable: ties and unmeasured models keep pool order
+        preferred.sort(key=lambda model_id: (predicted[model_id] is not None, predicted[model_id] or 0.0))
+        if predicted[preferred[0]] is None:
+            reason = "no recent samples"
+        elif latency_class == LATENCY_FAST:
+            reason = "fastest"
+        else:
+            reason = "fastest for short prompt"
+
+    if pool[0] in rest:
+        # Down, or its context window is too small for the prompt
+        reason = f"{reason}; {pool[0]} skipped"
+
+    return preferred + rest, reason, predicted
+
+
+async def route(
+    models: Dict[str, Dict[str, Any]],
+    active_id: str,
+    call: Callable[[Dict[str, Any]], Awaitable[T]],
+    discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    prompt_tokens: int = 0,
+    latency_class: Optional[str] = None,
+    stream: bool = False,
+) -> Tuple[T, str]:
+    """
+    Run `call(entry)` according to the active entry's routing mode and
+    return (result, id of the entry that produced it).
+
+    failover: candidates are tried in order; only retryable failures
+    (5xx, 429, timeouts, transport errors) move on to the next one.
+    hedge: additionally, once the hedge delay passes without an answer,
+    the next candidate is started in parallel and the first success wins.
+    Losing calls are cancelled; results that arrive anyway are passed
+    to `discard` (e.g. to close a stream).
+    auto: the candidates are first ordered per request by
+    rank_candidates (estimated `prompt_tokens`, `latency_class`), then
+    tried as in failover.
+
+    Each success records the upstream call's latency (see
+    UpstreamTiming): time to open the stream in stream_latency_tracker
+    when `stream` is set, else time to the full reply in
+    latency_tracker. Hedge delays and predictions use the same tracker.
+
+    The decision is left in `routing_decision`; on failure it also
+    names the entry whose error is raised (`failed_model_id`).
+    """
+    tracker = stream_latency_tracker if stream else latency_tracker
+    mode, candidates, hedge_delay = routing_plan(models, active_id, tracker)
+    decision: Dict[str, Any] = {
+        "mode": mode,
+        "prompt_tokens": prompt_tokens,
+        "latency_class": None,
+        "reason": None,
+        "predicted_ms": None,
+    }
+
+    if mode == ROUTING_AUTO:
+        latency_class = latency_class or settings.ROUTING_AUTO_DEFAULT_CLASS
+        candidates, reason, predicted = rank_candidates(
+            models, candidates, prompt_tokens, latency_class, tracker
+        )
+        decision.update({
+            "latency_class": latency_class,
+            "reason": reason,
+            "predicted_ms": {model_id: _ms(seconds) for model_id, seconds in predicted.items()},
+        })
+
+    decision["candidates"] = candidates
+    routing_decision.set(decision)
+
+    async def timed(entry_id: str) -> Tuple[T, Optional[str]]:
+        # Fresh per call: a hedge / failover task runs in a copy of the
+        # request context, so its cache status goes back with the result
+        cache_status.set(None)
+        timing = UpstreamTiming()
+        upstream_timing.set(timing)
+        result = await call(models[entry_id])
+        # Unset when no upstream call was made (cache hit, or joined
+        # another request's call): that says nothing about the model
+        if timing.seconds is not None and cache_status.get() != "HIT":
+            tracker.record(entry_id, timing.seconds, prompt_tokens)
+        return result, cache_status.get()
+
+    if len(candidates) == 1:
+        try:
+            result, _ = await timed(candidates[0])
+            return result, candidates[0]
+        except Exception:
+            decision["failed_model_id"] = candidates[0]
+            raise
+
+    remaining = list(candidates)
+    tasks: Dict["asyncio.Task[Tuple[T, Optional[str]]]", str] = {}
+    errors: Dict[str, BaseException] = {}
+
+    def launch() -> None:
+        entry_id = remaining.pop(0)
+        tasks[asyncio.ensure_future(timed(entry_id))] = entry_id
+
+    launch()
+
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(
+                tasks,
+                timeout=hedge_delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            if not done:
+                # Hedge timer fired: race the next candidate
+                launch()
+                continue
+
+            for task in done:
+                entry_id = tasks.pop(task)
+                error = task.exception()
+
+                if error is None:
+                    result, status = task.result()
+                    cache_status.set(status)
+                    return result, entry_id
+
+                errors[entry_id] = error
+                if is_retryable(error) and remaining and not tasks:
+                    launch()
+
+        # Everything failed: surface the active model's error if we have it
+        failed_id = active_id if active_id in errors else next(iter(errors))
+        decision["failed_model_id"] = failed_id
+        raise errors[failed_id]
+
+    finally:
+        for task in tasks:
+            task.cancel()
+            if discard is not None:
+                task.add_done_callback(_discard_late(discard))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Failures worth retrying on another model.
+    """
+    if isinstance(error, HTTPException) and error.status_code == 429:
+        return True
+    return is_transport_failure(error)
+
+
+def _discard_late(discard: Callable[[Any], Awaitable[None]]) -> Callable[["asyncio.Task[Any]"], None]:
+    def callback(task: "asyncio.Task[Any]") -> None:
+        if not task.cancelled() and task.exception() is None:
+            result, _ = task.result()
+            asyncio.ensure_future(discard(result))
+    return callback
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
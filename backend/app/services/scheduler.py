@@ -0,0 +1,298 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils.timing import span
+
+
+# Priority classes for upstream calls
+PRIORITY_INTERACTIVE = "interactive"   # UI chat
+PRIORITY_BATCH = "batch"               # /chat/batch, scripted traffic
+PRIORITY_VERIFY = "verify"             # key verification
+
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_VERIFY)
+
+# Classes a client may ask for, highest first (verify is internal)
+_REQUESTABLE = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+# Recent queue waits kept per class for the percentiles on /status
+_WAIT_SAMPLES = 1000
+
+
+def priority_from_headers(headers: Any, default: str) -> str:
+    """
+    `X-Priority: batch` lowers an endpoint's default class (e.g. a
+    script using /chat). Requests can only lower their priority, so
+    anything else, including asking for a higher class, is ignored.
+    """
+    value = headers.get("x-priority", "").strip().lower()
+    if (
+        value in _REQUESTABLE
+        and default in _REQUESTABLE
+        and _REQUESTABLE.index(value) > _REQUESTABLE.index(default)
+    ):
+        return value
+    return default
+
+
+class Slot:
+    """
+    One admitted upstream call; release() exactly once when it is done
+    (extra calls are ignored). Synchronous, so it is safe from cleanup
+    code that cannot await.
+    """
+
+    def __init__(self, scheduler: "Scheduler"):
+        self.scheduler = scheduler
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.scheduler._release(time.monotonic() - self.started)
+
+
+class _Class:
+    def __init__(self, name: str, weight: float, max_queue: int, deadline: float):
+        self.name = name
+        self.weight = weight
+        self.max_queue = max_queue
+        self.deadline = deadline
+
+        self.queue: Deque["asyncio.Future[Slot]"] = deque()
+        # Virtual finish time for weighted fair dequeueing
+        self.pass_ = 0.0
+
+        self.admitted = 0
+        self.shed = 0
+        self.waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+
+class Scheduler:
+    """
+    Admission control in front of upstream calls.
+
+    At most `max_concurrency` calls run at once; the rest wait in one
+    bounded FIFO queue per priority class. Freed slots go to the
+    non-empty class with the lowest virtual time, which advances by
+    1/weight per dequeue, so under contention classes are served in
+    proportion to their weights and none starves.
+
+    A request is shed with 503 + Retry-After when its class queue is
+    full, when its predicted wait (queue position over the class's
+    share of throughput, from the average slot hold time) exceeds the
+    class deadline, or when it has actually waited that long.
+    """
+
+    def __init__(self, max_concurrency: int, classes: Dict[str, _Class]):
+        self.max_concurrency = max_concurrency
+        self.classes = classes
+        self.in_flight = 0
+        # Average slot hold time (None until the first release)
+        self.service_time: Optional[float] = None
+        self._vtime = 0.0
+
+    async def acquire(self, priority: str) -> Slot:
+        cls = self.classes[priority]
+
+        if self.in_flight < self.max_concurrency and not self._queued():
+            return self._admit(cls)
+
+        if len(cls.queue) >= cls.max_queue:
+            self._shed(cls, f"{priority} queue full")
+
+        estimate = self._estimate_wait(cls)
+        if estimate is not None and estimate > cls.deadline:
+            self._shed(cls, f"{priority} queue wait would exceed {cls.deadline:g}s", estimate)
+
+        if not cls.queue:
+            # Back from idle: no credit for the time it had nothing queued
+            cls.pass_ = max(cls.pass_, self._vtime)
+
+        waiter: "asyncio.Future[Slot]" = asyncio.get_running_loop().create_future()
+        cls.queue.append(waiter)
+        queued_at = time.monotonic()
+
+        try:
+            with span("schedule"):
+                await asyncio.wait_for(asyncio.shield(waiter), cls.deadline)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._forget(cls, waiter)
+            raise
+
+        if not waiter.done():
+            self._forget(cls, waiter)
+            self._shed(cls, f"{priority} queue wait exceeded {cls.deadline:g}s")
+
+        cls.waits.append(time.monotonic() - queued_at)
+        return waiter.result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "service_time_ms": _ms(self.service_time),
+            "classes": {
+                name: {
+                    "queued": len(cls.queue),
+                    "max_queue": cls.max_queue,
+                    "weight": cls.weight,
+                    "deadline_s": cls.deadline,
+                    "admitted": cls.admitted,
+                    "shed": cls.shed,
+                    "wait_p50_ms": _ms(_percentile(cls.waits, 0.5)),
+                    "wait_p95_ms": _ms(_percentile(cls.waits, 0.95)),
+                    "wait_max_ms": _ms(max(cls.waits, default=None)),
+                    "estimated_wait_ms": _ms(self._estimate_wait(cls)),
+                }
+                for name, cls in self.classes.items()
+            },
+        }
+
+    def _queued(self) -> int:
+        return sum(len(cls.queue) for cls in self.classes.values())
+
+    def _admit(self, cls: _Class) -> Slot:
+        self.in_flight += 1
+        cls.admitted += 1
+        return Slot(self)
+
+    def _release(self, held: float) -> None:
+        self.in_flight -= 1
+        self.service_time = (
+            held if self.service_time is None
+            else 0.9 * self.service_time + 0.1 * held
+        )
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_concurrency:
+            cls = self._next_class()
+            if cls is None:
+                return
+
+            waiter = cls.queue.popleft()
+            if waiter.done():
+                continue
+
+            cls.pass_ += 1 / cls.weight
+            self._vtime = cls.pass_
+            waiter.set_result(self._admit(cls))
+
+    def _next_class(self) -> Optional[_Class]:
+        best = None
+        for cls in self.classes.values():
+            if cls.queue and (best is None or cls.pass_ < best.pass_):
+                best = cls
+        return best
+
+    def _estimate_wait(self, cls: _Class) -> Optional[float]:
+        """
+        Expected wait for a request joining `cls` now, in seconds.
+        """
+        if self.service_time is None or self.in_flight < self.max_concurrency:
+            return None if self.service_time is None else 0.0
+
+        active = sum(
+            c.weight for c in self.classes.values()
+            if c.queue or c is cls
+        )
+        throughput = self.max_concurrency / max(self.service_time, 1e-3)
+        return (len(cls.queue) + 1) / (throughput * cls.weight / active)
+
+    def _forget(self, cls: _Class, waiter: "asyncio.Future[Slot]") -> None:
+        if waiter.done() and not waiter.cancelled():
+            # Granted while we gave up: hand the slot back
+            waiter.result().release()
+            return
+
+        waiter.cancel()
+        try:
+            cls.queue.remove(waiter)
+        except ValueError:
+            pass
+
+    def _shed(self, cls: _Class, reason: str, retry_after: Optional[float] = None) -> None:
+        cls.shed += 1
+        retry_after = retry_after if retry_after is not None else self._estimate_wait(cls)
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy: {reason}",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after or 1)))},
+        )
+
+
+class SlotStream:
+    """
+    Event stream that releases its slot when it ends, fails or is
+    closed, including when it is closed or dropped before its first
+    event (a plain async generator would skip its finally block).
+    """
+
+    def __init__(self, events: AsyncIterator[Any], slot: Slot):
+        self._events = events
+        self._slot = slot
+
+    def __aiter__(self) -> "SlotStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._events.__anext__()
+        except BaseException:
+            self._slot.release()
+            raise
+
+    async def aclose(self) -> None:
+        self._slot.release()
+        if hasattr(self._events, "aclose"):
+            await self._events.aclose()
+
+    def __del__(self) -> None:
+        self._slot.release()
+
+
+def _percentile(samples: Deque[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+# Process-wide scheduler
+scheduler = Scheduler(
+    max_concurrency=settings.SCHEDULER_MAX_CONCURRENCY,
+    classes={
+        PRIORITY_INTERACTIVE: _Class(
+            PRIORITY_INTERACTIVE,
+            weight=settings.SCHEDULER_INTERACTIVE_WEIGHT,
+            max_queue=settings.SCHEDULER_INTERACTIVE_QUEUE,
+            deadline=settings.SCHEDULER_INTERACTIVE_DEADLINE,
+        ),
+        PRIORITY_BATCH: _Class(
+            PRIORITY_BATCH,
+            weight=settings.SCHEDULER_BATCH_WEIGHT,
+            max_queue=settings.SCHEDULER_BATCH_QUEUE,
+            deadline=settings.SCHEDULER_BATCH_DEADLINE,
+        ),
+        PRIORITY_VERIFY: _Class(
+            PRIORITY_VERIFY,
+            weight=settings.SCHEDULER_VERIFY_WEIGHT,
+            max_queue=settings.SCHEDULER_VERIFY_QUEUE,
+            deadline=settings.SCHEDULER_VERIFY_DEADLINE,
+        ),
+    },
+)
@@ -0,0 +1,48 @@
+import asyncio
+import re
+import sqlite3
+
+from app.config import settings
+from app.persistence.conversation_store import get_conversation_store
+
+# Matches the FTS5 prefix index (prefix='3') on messages_fts
+MIN_PREFIX_CHARS = 3
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 expression: every term must match
+    (quoted, so punctuation and operators are taken literally) and
+    the last term also matches as a prefix, once it is long enough not
+    to expand to most of the vocabulary.
+    """
+    words = re.findall(r"\S+", text)
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    if terms and len(words[-1]) >= MIN_PREFIX_CHARS:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def run_search_indexer() -> None:
+    """
+    Keep the conversation search index caught up with new messages.
+    Runs for the lifetime of the app; indexing happens in batches on a
+    worker thread, never on the request path. Every worker may run one:
+    batches are claimed inside a write transaction.
+    """
+    store = get_conversation_store()
+    if not store.search_enabled:
+        return
+
+    while True:
+        try:
+            # Drain the backlog, then wait for more
+            while await asyncio.to_thread(
+                store.index_pending, settings.SEARCH_INDEX_BATCH
+            ) == settings.SEARCH_INDEX_BATCH:
+                pass
+        except sqlite3.Error:
+            # Busy / locked: retry next round
+            pass
+
+        await asyncio.sleep(settings.SEARCH_INDEX_INTERVAL)
@@ -0,0 +1,237 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def _consume_exception(f: "asyncio.Future[Any]") -> None:
+    # Avoid "exception was never retrieved" when every waiter left
+    if not f.cancelled():
+        f.exception()
+
+
+class _Call:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+    Every caller receives the shared result or the shared exception.
+    The shared call is cancelled only when all of its callers are.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(_consume_exception)
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self._calls[key] = call
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class _Broadcast:
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+
+        self.opened: "asyncio.Future[None]" = loop.create_future()
+        self.opened.add_done_callback(_consume_exception)
+        self.events: List[Dict[str, Any]] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.changed = asyncio.Condition()
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+
+        # Next event index per subscriber; set when one moves on
+        self.positions: Dict[object, int] = {}
+        self.advanced = asyncio.Event()
+
+    def lag(self) -> int:
+        # How far the slowest subscriber is behind the producer
+        return len(self.events) - min(self.positions.values(), default=len(self.events))
+
+
+class _Subscription:
+    """
+    One subscriber's view of a shared stream. Leaves the flight when
+    it ends, fails or is closed, including when it is closed or
+    dropped before its first event (a plain async generator would
+    skip its finally block and pin the producer).
+    """
+
+    def __init__(self, flight: "StreamFlight", b: _Broadcast, token: object):
+        self._flight = flight
+        self._b = b
+        self._token = token
+        self._events = flight._iterate(b, token)
+        self._left = False
+
+    def __aiter__(self) -> "_Subscription":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return await self._events.__anext__()
+        except BaseException:
+            self._leave()
+            raise
+
+    async def aclose(self) -> None:
+        self._leave()
+        await self._events.aclose()
+
+    def __del__(self) -> None:
+        self._leave()
+
+    def _leave(self) -> None:
+        if not self._left:
+            self._left = True
+            self._flight._leave(self._b, self._token)
+
+
+class StreamFlight:
+    """
+    Single-flight for event streams.
+    The first subscriber opens the upstream stream; later subscribers
+    with the same key share it, receiving the already-produced prefix
+    followed by the live tail. Errors raised while opening are raised
+    to every subscriber; errors mid-stream end every subscriber's
+    iteration with the same exception.
+    The upstream is read at the pace of the slowest subscriber: once
+    one is `max_lag` events behind, reading pauses until it catches up.
+    """
+
+    def __init__(self, max_lag: int = 64):
+        self.max_lag = max_lag
+        self._flights: Dict[str, _Broadcast] = {}
+        self.coalesced = 0
+
+    async def subscribe(
+        self,
+        key: str,
+        open_stream: Callable[[], Awaitable[AsyncIterator[Dict[str, Any]]]],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        b = self._flights.get(key)
+
+        if b is None:
+            b = _Broadcast()
+            self._flights[key] = b
+            b.task = asyncio.ensure_future(self._produce(key, b, open_stream))
+        else:
+            self.coalesced += 1
+
+        # Late subscribers start at the beginning of the shared prefix
+        token = object()
+        b.subscribers += 1
+        b.positions[token] = 0
+        try:
+            await asyncio.shield(b.opened)
+        except BaseException:
+            self._leave(b, token)
+            raise
+
+        return _Subscription(self, b, token)
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def _produce(
+        self,
+        key: str,
+        b: _Broadcast,
+        open_stream: Callable[[], Awaitable[AsyncIterator[Dict[str, Any]]]],
+    ) -> None:
+        events = None
+
+        try:
+            try:
+                events = await open_stream()
+            except asyncio.CancelledError:
+                b.opened.cancel()
+                raise
+            except BaseException as e:
+                b.opened.set_exception(e)
+                return
+
+            b.opened.set_result(None)
+
+            try:
+                async for event in events:
+                    async with b.changed:
+                        b.events.append(event)
+                        b.changed.notify_all()
+
+                    # Backpressure: don't run ahead of the slowest reader
+                    while b.lag() >= self.max_lag:
+                        b.advanced.clear()
+                        await b.advanced.wait()
+            except Exception as e:
+                b.error = e
+
+        finally:
+            if self._flights.get(key) is b:
+                del self._flights[key]
+
+            if events is not None and hasattr(events, "aclose"):
+                await events.aclose()
+
+            b.done = True
+            async with b.changed:
+                b.changed.notify_all()
+
+    async def _iterate(self, b: _Broadcast, token: object) -> AsyncIterator[Dict[str, Any]]:
+        i = 0
+
+        while True:
+            if i < len(b.events):
+                yield b.events[i]
+                i += 1
+                b.positions[token] = i
+                b.advanced.set()
+                continue
+
+            if b.done:
+                if b.error is not None:
+                    raise b.error
+                return
+
+            async with b.changed:
+                await b.changed.wait_for(
+                    lambda: i < len(b.events) or b.done
+                )
+
+    def _leave(self, b: _Broadcast, token: object) -> None:
+        b.subscribers -= 1
+        b.positions.pop(token, None)
+        b.advanced.set()
+
+        # Nobody is listening anymore: stop the upstream stream
+        if b.subscribers == 0 and b.task and not b.task.done():
+            b.task.cancel()
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Optional, Set, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.services.metrics import record_cancelled
+
+T = TypeVar("T")
+
+# Status logged for requests the client abandoned (nginx convention)
+CLIENT_CLOSED_REQUEST = 499
+
+# Detached cleanups still running (the loop only keeps weak references)
+_closing: Set["asyncio.Task[None]"] = set()
+
+
+async def cancel_on_disconnect(request: Request, aw: Awaitable[T]) -> T:
+    """
+    Await `aw`, cancelling it as soon as the client disconnects, so
+    the upstream request is aborted and its limiter slot released.
+    The request body must already have been read.
+    """
+    task = asyncio.ensure_future(aw)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    abandoned = False
+
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            abandoned = True
+            task.cancel()
+            await asyncio.wait({task})
+            record_cancelled(request.scope)
+
+    if abandoned:
+        # Whatever the task ended with, nobody is there to receive it
+        if not task.cancelled():
+            task.exception()
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+    return task.result()
+
+
+async def stream_until_disconnect(
+    request: Request,
+    chunks: AsyncIterator[T],
+) -> AsyncIterator[T]:
+    """
+    Relay a response body, stopping as soon as the client disconnects
+    instead of at the next write. Whatever the source is awaiting (an
+    upstream read, a queue) is cancelled and the source closed.
+    """
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    pending: Optional["asyncio.Future[T]"] = None
+
+    try:
+        while True:
+            pending = asyncio.ensure_future(chunks.__anext__())
+            await asyncio.wait({pending, watcher}, return_when=asyncio.FIRST_COMPLETED)
+
+            if not pending.done():
+                record_cancelled(request.scope)
+                return
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                return
+
+            pending = None
+            yield chunk
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # Server side noticed first (Starlette cancels the body on disconnect)
+        record_cancelled(request.scope)
+        raise
+
+    finally:
+        watcher.cancel()
+        _close_detached(chunks, pending)
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _close_detached(chunks: AsyncIterator[Any], pending: Optional["asyncio.Future[Any]"]) -> None:
+    # Close on a task of its own: the caller may sit in a cancelled
+    # scope where every await is interrupted, which would skip the
+    # source's cleanup (closing the upstream, releasing its permit)
+    async def close() -> None:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                pending.exception()
+
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+
+    task = asyncio.ensure_future(close())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
@@ -0,0 +1,64 @@
+import cProfile
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.config import settings
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampled profiling (PROFILE_SAMPLE_RATE > 0).
+    A sampled request runs under cProfile; if it takes longer than
+    PROFILE_SLOW_MS the stats are written to PROFILE_DIR as a .prof file
+    (pstats format: snakeviz, flameprof, gprof2dot...).
+
+    cProfile hooks the event loop thread, so other requests running
+    concurrently show up in the profile too; only one request is
+    profiled at a time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.slow_ms = settings.PROFILE_SLOW_MS
+        self.directory = Path(settings.PROFILE_DIR).expanduser()
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.sample_rate <= 0
+            or random.random() >= self.sample_rate
+            or not self._busy.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                profiler.disable()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.slow_ms:
+                self._dump(profiler, scope, elapsed_ms)
+        finally:
+            self._busy.release()
+
+    def _dump(self, profiler: cProfile.Profile, scope, elapsed_ms: float) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+        slug = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+        path = self.directory / f"{stamp}-{scope.get('method', '')}-{slug}-{elapsed_ms:.0f}ms.prof"
+        profiler.dump_stats(str(path))
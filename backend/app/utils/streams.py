@@ -0,0 +1,48 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+
+class ClosingStream:
+    """
+    Async iterator over `events`, an async generator reading `source`,
+    that closes `source` and runs `on_close` once when it ends, fails
+    or is closed. Also when closed before its first event: an async
+    generator that never started skips its finally block, and closing
+    it does not reach the stream it would have read.
+    """
+
+    def __init__(
+        self,
+        events: AsyncIterator[Any],
+        source: Optional[AsyncIterator[Any]] = None,
+        on_close: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self._events = events
+        self._source = source
+        self._on_close = on_close
+        self._closed = False
+
+    def __aiter__(self) -> "ClosingStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._events.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            if hasattr(self._events, "aclose"):
+                await self._events.aclose()
+        finally:
+            try:
+                if self._source is not None and hasattr(self._source, "aclose"):
+                    await self._source.aclose()
+            finally:
+                if self._on_close is not None:
+                    await self._on_close()
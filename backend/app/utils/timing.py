@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class _RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+
+# Timings for the current request (None outside ServerTimingMiddleware)
+_current: ContextVar[Optional[_RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a block of the current request; reported in Server-Timing.
+    No-op outside a request.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.spans.append((name, (time.perf_counter() - started) * 1000))
+
+
+def mark_since_start(name: str) -> None:
+    """
+    Record a span from the start of the request until now, e.g. the
+    body read + JSON decode + validation done before a handler runs.
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.spans.append((name, (time.perf_counter() - timings.started) * 1000))
+
+
+def server_timing_header(timings: _RequestTimings) -> str:
+    # Repeated spans (e.g. several config reads) are summed
+    totals: Dict[str, float] = {}
+    for name, dur in timings.spans:
+        totals[name] = totals.get(name, 0.0) + dur
+
+    totals["total"] = (time.perf_counter() - timings.started) * 1000
+    return ", ".join(f"{name};dur={dur:.2f}" for name, dur in totals.items())
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting spans per request and emitting them as a
+    `Server-Timing` response header. For streamed responses the header
+    covers everything up to the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = _RequestTimings()
+        token = _current.set(timings)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(timings).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
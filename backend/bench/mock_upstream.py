@@ -0,0 +1,227 @@
+"""
+Mock OpenAI / Groq compatible upstream for benchmarks.
+
+Serves `POST .../chat/completions` (plain and streamed) and
+`GET .../models` with configurable latency, streaming rate and
+error / 429 injection. Runs offline, stdlib only.
+
+    python -m bench.mock_upstream --port 9100 --latency-ms 200 --rate-429 0.05
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        jitter_ms: float = 10,
+        stream_rate: float = 200,
+        completion_tokens: int = 32,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: float = 0.0,
+    ):
+        # Time to first byte
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Streamed tokens per second (0 = as fast as possible)
+        self.stream_rate = stream_rate
+        self.completion_tokens = completion_tokens
+        # Fraction of requests answered with 500 / 429
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class MockUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: MockConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients hanging up mid-response (cancelled requests) are expected
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockUpstream
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        # Connection warm-up
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if not self.path.rstrip("/").endswith("/models"):
+            return self._json(404, {"error": {"message": "not found"}})
+
+        self._json(200, {
+            "object": "list",
+            "data": [{"id": "mock-model", "object": "model"}],
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        self.server.count()
+        config = self.server.config
+
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+
+        roll = random.random()
+        if roll < config.rate_429:
+            return self._json(
+                429,
+                {"error": {"message": "Rate limit reached"}},
+                {"Retry-After": str(config.retry_after)},
+            )
+        if roll < config.rate_429 + config.error_rate:
+            return self._json(500, {"error": {"message": "Injected failure"}})
+
+        if not self.path.endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+
+        messages = payload.get("messages") or []
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": config.completion_tokens,
+            "total_tokens": prompt_tokens + config.completion_tokens,
+        }
+
+        if payload.get("stream"):
+            return self._stream(payload.get("model"), usage)
+
+        content = " ".join(f"tok{i}" for i in range(config.completion_tokens))
+        self._json(200, {
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, model: str, usage: Dict[str, int]) -> None:
+        config = self.server.config
+        interval = 1 / config.stream_rate if config.stream_rate > 0 else 0
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for i in range(config.completion_tokens):
+            self._chunk({
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": f"tok{i} "}}],
+            })
+            if interval:
+                time.sleep(interval)
+
+        self._chunk({"object": "chat.completion.chunk", "choices": [], "usage": usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, data: Dict[str, Any]) -> None:
+        self._write_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _json(self, status: int, data: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_mock_upstream(
+    config: MockConfig, host: str = "127.0.0.1", port: int = 0
+) -> MockUpstream:
+    """
+    Start the mock server on a background thread (port 0 = any free port).
+    """
+    server = MockUpstream((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--stream-rate", type=float, default=200,
+                        help="streamed tokens per second (0 = unthrottled)")
+    parser.add_argument("--completion-tokens", type=int, default=32)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.0)
+
+
+def mock_config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        stream_rate=args.stream_rate,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockUpstream((args.host, args.port), mock_config_from_args(args))
+    print(f"Mock upstream on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,373 @@
+"""
+Backend load test against a local mock upstream (fully offline).
+
+Starts the mock OpenAI / Groq server, launches the API under uvicorn
+in a subprocess with GROQ_CHAT_URL / OPENAI_CHAT_URL pointed at it
+(and HOME at a temp dir, so the real config is untouched), then drives
+each scenario at a fixed concurrency and reports throughput,
+p50 / p95 / p99 latency and server memory.
+
+Run from backend/:
+
+    python -m bench.run --concurrency 32 --requests 500 --save bench/baseline.json
+    python -m bench.run --concurrency 32 --requests 500 --compare bench/baseline.json
+
+With --compare the exit status is 1 when any scenario regresses past
+--tolerance (latency / throughput / memory) or its error rate grows.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from bench.mock_upstream import add_mock_arguments, mock_config_from_args, start_mock_upstream
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = ("chat", "chat_stream", "models", "status")
+
+
+# ---- Server process ----
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mock_url: str, home: str, extra_env: Dict[str, str]) -> "tuple[subprocess.Popen, str]":
+    port = _free_port()
+    env = {
+        **os.environ,
+        "HOME": home,
+        "GROQ_CHAT_URL": f"{mock_url}/openai/v1/chat/completions",
+        "OPENAI_CHAT_URL": f"{mock_url}/v1/chat/completions",
+        **extra_env,
+    }
+
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with status {proc.returncode}")
+        try:
+            if (await client.get("/status")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+
+    raise RuntimeError("Server did not become ready")
+
+
+def process_memory(pid: int) -> Dict[str, Optional[float]]:
+    """
+    Current and peak RSS in MB (Linux /proc; None elsewhere).
+    """
+    values: Dict[str, Optional[float]] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_mb"] = int(line.split()[1]) / 1024
+                elif line.startswith("VmHWM:"):
+                    values["peak_rss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return values
+
+
+# ---- Load generation ----
+
+def _request_factory(
+    scenario: str, client: httpx.AsyncClient, provider: str, distinct: bool
+) -> Callable[[int], Awaitable[Dict[str, Any]]]:
+    def body(i: int) -> Dict[str, Any]:
+        # Distinct prompts keep the response cache / single-flight out of the way
+        content = f"benchmark request {i}" if distinct else "benchmark request"
+        return {"messages": [{"role": "user", "content": content}]}
+
+    async def chat(i: int) -> Dict[str, Any]:
+        r = await client.post("/chat", json=body(i))
+        return {"status": r.status_code}
+
+    async def chat_stream(i: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        ttft = None
+        failed = False
+        async with client.stream("POST", "/chat/stream", json=body(i)) as r:
+            async for chunk in r.aiter_text():
+                if ttft is None and "event: token" in chunk:
+                    ttft = time.perf_counter() - started
+                failed = failed or "event: error" in chunk
+        # An error event after a 200 still counts as a failed request
+        return {"status": 502 if failed else r.status_code, "ttft": ttft}
+
+    async def models(i: int) -> Dict[str, Any]:
+        r = await client.get("/models", params={"provider": provider})
+        return {"status": r.status_code}
+
+    async def status(i: int) -> Dict[str, Any]:
+        r = await client.get("/status")
+        return {"status": r.status_code}
+
+    return {"chat": chat, "chat_stream": chat_stream, "models": models, "status": status}[scenario]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+async def run_scenario(
+    send: Callable[[int], Awaitable[Dict[str, Any]]],
+    requests: int,
+    concurrency: int,
+    pid: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors = 0
+    peak_rss = 0.0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+
+            started = time.perf_counter()
+            try:
+                result = await send(i)
+            except httpx.HTTPError:
+                result = {"status": 0}
+            latencies.append(time.perf_counter() - started)
+
+            if not 200 <= result["status"] < 400:
+                errors += 1
+            if result.get("ttft") is not None:
+                ttfts.append(result["ttft"])
+
+    async def sample_memory() -> None:
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process_memory(pid)["rss_mb"] or 0)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.ensure_future(sample_memory())
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        sampler.cancel()
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "max_ms": _ms(max(latencies, default=None)),
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss else None,
+    }
+    if ttfts:
+        result["ttft_p50_ms"] = _ms(percentile(ttfts, 50))
+        result["ttft_p95_ms"] = _ms(percentile(ttfts, 95))
+    return result
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    mock_config = mock_config_from_args(args)
+    mock = start_mock_upstream(mock_config)
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    with tempfile.TemporaryDirectory() as home:
+        proc, base_url = start_server(mock.url, home, extra_env)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+                await wait_ready(client, proc)
+
+                r = await client.post("/config/setup", json={
+                    "provider": args.provider,
+                    "model_id": "mock-model",
+                    "api_key": "bench-key",
+                })
+                r.raise_for_status()
+
+                memory_start = process_memory(proc.pid)
+                scenarios = {}
+
+                for name in args.scenarios:
+                    send = _request_factory(name, client, args.provider, not args.repeat_prompt)
+
+                    for i in range(args.warmup):
+                        await send(-1 - i)
+
+                    scenarios[name] = await run_scenario(send, args.requests, args.concurrency, proc.pid)
+                    print(_format_row(name, scenarios[name]), flush=True)
+
+                memory_end = process_memory(proc.pid)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            mock.shutdown()
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "provider": args.provider,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "distinct_prompts": not args.repeat_prompt,
+            "env": extra_env,
+            "mock": mock_config.as_dict(),
+            "upstream_requests": mock.requests,
+        },
+        "memory": {
+            "rss_start_mb": _round(memory_start["rss_mb"]),
+            "rss_end_mb": _round(memory_end["rss_mb"]),
+            "peak_rss_mb": _round(memory_end["peak_rss_mb"]),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def _format_row(name: str, result: Dict[str, Any]) -> str:
+    return (
+        f"{name:<12} {result['throughput_rps']:>9} req/s  "
+        f"p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+        f"p99 {result['p99_ms']:>8} ms  errors {result['errors']}"
+    )
+
+
+# ---- Baseline comparison ----
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Return a list of regressions of `current` against `baseline`.
+    """
+    regressions = []
+
+    for name, base in baseline.get("scenarios", {}).items():
+        result = current["scenarios"].get(name)
+        if result is None:
+            continue
+
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if base.get(key) and result.get(key) and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]} > {base[key]} (+{tolerance:.0%})")
+
+        if (
+            base.get("throughput_rps") and result.get("throughput_rps")
+            and result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance)
+        ):
+            regressions.append(
+                f"{name}: throughput {result['throughput_rps']} < {base['throughput_rps']} (-{tolerance:.0%})"
+            )
+
+        if result["error_rate"] > base.get("error_rate", 0) + 0.01:
+            regressions.append(f"{name}: error rate {result['error_rate']} > {base.get('error_rate', 0)}")
+
+    base_rss = baseline.get("memory", {}).get("peak_rss_mb")
+    rss = current["memory"].get("peak_rss_mb")
+    if base_rss and rss and rss > base_rss * (1 + tolerance):
+        regressions.append(f"memory: peak RSS {rss} MB > {base_rss} MB (+{tolerance:.0%})")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per scenario")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS),
+                        help=f"comma separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--provider", choices=("groq", "openai"), default="groq")
+    parser.add_argument("--repeat-prompt", action="store_true",
+                        help="send the same prompt every time (exercises cache / single-flight)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the server, e.g. RESPONSE_CACHE_ENABLED=1")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail on regressions against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative regression (default 0.2 = 20%%)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run_benchmark(args))
+    print(f"server memory: {results['memory']}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"saved {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("no regressions")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Stores live under HOME: keep them out of the real one
+os.environ["HOME"] = tempfile.mkdtemp(prefix="project_x_tests_")
+os.environ.setdefault("HEALTH_CHECK_INTERVAL", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,97 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.services import breaker as breaker_module
+from app.services.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    is_auth_failure,
+    is_transport_failure,
+)
+from app.services.llm import _raise_for_status
+
+
+@pytest.mark.parametrize("status, transport, auth", [
+    (400, False, False),
+    (401, False, True),
+    (403, False, True),
+    (404, False, False),
+    (422, False, False),
+    (429, False, False),
+    (500, True, False),
+    (503, True, False),
+])
+def test_upstream_status_classification(status, transport, auth):
+    response = httpx.Response(status, text="nope", request=httpx.Request("POST", "http://upstream"))
+
+    with pytest.raises(HTTPException) as e:
+        _raise_for_status(response, "Test")
+
+    assert is_transport_failure(e.value) is transport
+    assert is_auth_failure(e.value) is auth
+    assert e.value.status_code == (502 if status >= 500 else status)
+
+
+def test_transport_errors_count_as_failures():
+    assert is_transport_failure(httpx.ConnectTimeout("slow"))
+    assert is_transport_failure(httpx.ConnectError("refused"))
+    assert not is_transport_failure(ValueError("bad json"))
+
+
+def test_breaker_opens_then_half_opens_then_closes(monkeypatch):
+    monkeypatch.setattr(breaker_module.settings, "BREAKER_MIN_REQUESTS", 4)
+    monkeypatch.setattr(breaker_module.settings, "BREAKER_FAILURE_RATE", 0.5)
+    monkeypatch.setattr(breaker_module.settings, "BREAKER_HALF_OPEN_PROBES", 1)
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, "monotonic", lambda: now[0])
+
+    breaker = CircuitBreaker("test/m")
+    for ok in (True, False, True, False):
+        breaker.before_call()
+        breaker.record_success() if ok else breaker.record_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(HTTPException) as e:
+        breaker.before_call()
+    assert e.value.status_code == 503 and "Retry-After" in e.value.headers
+
+    # After the open period one probe is admitted, a second is not
+    now[0] += breaker_module.settings.BREAKER_OPEN_SECONDS
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(HTTPException):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_half_open_probe_reopens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, "monotonic", lambda: now[0])
+
+    breaker = CircuitBreaker("test/m")
+    breaker._open()
+    now[0] += breaker_module.settings.BREAKER_OPEN_SECONDS
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.is_open()
+
+
+def test_neutral_outcome_frees_the_half_open_probe(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, "monotonic", lambda: now[0])
+
+    breaker = CircuitBreaker("test/m")
+    breaker._open()
+    now[0] += breaker_module.settings.BREAKER_OPEN_SECONDS
+    breaker.before_call()
+
+    breaker.record_neutral()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
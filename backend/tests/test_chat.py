@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from app.routes.chat import _chat_events
+from app.schemas.chat import BatchChatRequest
+from app.utils.streams import ClosingStream
+
+
+class _Upstream:
+    def __init__(self, error=None):
+        self.error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.error is not None:
+            raise self.error
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _events(upstream):
+    return ClosingStream(_chat_events(upstream, 0.0, {}, {}, None), source=upstream)
+
+
+def test_unexpected_errors_do_not_leak_details():
+    upstream = _Upstream(RuntimeError("POST https://internal.example/v1 failed"))
+
+    async def run():
+        return [event async for event in _events(upstream)]
+
+    events = asyncio.run(run())
+
+    assert events == [("error", {"status": 502, "detail": "Unexpected provider error"})]
+    assert upstream.closed
+
+
+def test_closing_before_the_first_event_closes_the_upstream():
+    upstream = _Upstream()
+
+    asyncio.run(_events(upstream).aclose())
+
+    assert upstream.closed
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_batch_concurrency_must_be_positive(concurrency):
+    with pytest.raises(ValidationError):
+        BatchChatRequest(requests=[], concurrency=concurrency)
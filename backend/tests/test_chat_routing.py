@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.persistence.config_store import save_config
+from app.routes import chat
+from app.schemas.chat import BatchChatError, BatchChatItem
+from app.services import clients
+from app.services.cache import response_cache
+
+
+class _Body(httpx.AsyncByteStream):
+    # Unread until consumed, like a network response
+    def __init__(self, data: str):
+        self.data = data.encode()
+
+    async def __aiter__(self):
+        yield self.data
+
+
+@pytest.fixture
+def failover_config(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        model = json.loads(request.content)["model"]
+        body = json.dumps({"choices": [{"message": {"content": f"from {model}"}}]})
+        return httpx.Response(200, stream=_Body(body))
+
+    monkeypatch.setitem(
+        clients._clients, "groq", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    save_config({
+        "models": {
+            "primary": {
+                "provider": "groq", "model": "routed-primary", "api_key": "k", "auth_ok": True,
+                "routing": {"mode": "failover", "fallbacks": ["backup"]},
+            },
+            "backup": {"provider": "groq", "model": "routed-backup", "api_key": "k", "auth_ok": True},
+        },
+        "active_model_id": "primary",
+    })
+    return requests
+
+
+def test_routed_calls_report_their_cache_status(failover_config, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    client = TestClient(app)
+    request = {"messages": [{"role": "user", "content": "cache me through routing"}]}
+
+    first = client.post("/chat", json=request)
+    second = client.post("/chat", json=request)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["content"] == second.json()["content"] == "from routed-primary"
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert len(failover_config) == 1
+
+
+def _item(index, model_id, status=None):
+    error = BatchChatError(status=status, detail="x") if status is not None else None
+    return BatchChatItem(index=index, content=None if error else "ok", model_id=model_id, error=error)
+
+
+@pytest.mark.parametrize("results, expected", [
+    # Only the fallback answered: says nothing about the active key
+    ([_item(0, "backup")], []),
+    ([_item(0, "backup", 401)], []),
+    ([_item(0, "primary", 503), _item(1, "primary")], [True]),
+    ([_item(0, "primary", 401), _item(1, "backup")], [False]),
+    ([_item(0, "primary", 503)], []),
+])
+def test_batch_auth_only_counts_the_active_model(results, expected, monkeypatch):
+    recorded = []
+
+    async def set_auth_ok(active_model, value):
+        recorded.append(value)
+
+    monkeypatch.setattr(chat, "_set_auth_ok", set_auth_ok)
+
+    asyncio.run(chat._record_batch_auth({}, "primary", results))
+
+    assert recorded == expected
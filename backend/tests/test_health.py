@@ -0,0 +1,42 @@
+import asyncio
+
+from app.services import health
+
+CONFIG = {
+    "models": {
+        "a": {"provider": "groq", "model": "m", "api_key": "k"},
+        "b": {"provider": "huggingface", "model": "m", "api_key": "k"},
+    },
+}
+
+
+def _run_rounds(monkeypatch, rounds: int):
+    checked = []
+
+    async def verify_models(models, max_age=None):
+        checked.append(sorted(models))
+        if len(checked) == 1:
+            raise ValueError("boom")
+        return {}
+
+    monkeypatch.setattr(health.settings, "HEALTH_CHECK_INTERVAL", 0.01)
+    monkeypatch.setattr(health, "load_config", lambda: CONFIG)
+    monkeypatch.setattr(health, "verify_models", verify_models)
+
+    async def run():
+        task = asyncio.ensure_future(health.run_health_checks())
+        while len(checked) < rounds and not task.done():
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    return checked
+
+
+def test_background_checks_survive_a_failed_round_and_skip_completion_probes(monkeypatch):
+    assert _run_rounds(monkeypatch, 2) == [["a"], ["a"]]
+
+
+def test_completion_probes_are_opt_in(monkeypatch):
+    monkeypatch.setattr(health.settings, "HEALTH_CHECK_COMPLETIONS", True)
+    assert _run_rounds(monkeypatch, 1) == [["a", "b"]]
@@ -0,0 +1,91 @@
+import pytest
+
+from app.persistence import job_store
+from app.persistence.job_store import (
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobStore,
+)
+
+REQUEST = {"messages": [{"role": "user", "content": "hi"}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs.db")
+
+
+def test_jobs_are_claimed_once_oldest_first(store):
+    first = store.create(REQUEST, "batch")
+    second = store.create(REQUEST, "batch")
+
+    claimed = [store.claim(), store.claim(), store.claim()]
+
+    assert [job and job["id"] for job in claimed] == [first["id"], second["id"], None]
+    assert claimed[0]["status"] == JOB_RUNNING
+    assert claimed[0]["attempts"] == 1
+
+
+def test_lapsed_lease_is_claimed_again(store, monkeypatch):
+    job = store.create(REQUEST, "batch")
+    store.claim()
+    assert store.claim() is None
+
+    # Leases now end as soon as they are taken: the running job lapses
+    monkeypatch.setattr(job_store.settings, "JOBS_LEASE_SECONDS", -1.0)
+    assert store.renew(job["id"])
+    again = store.claim()
+
+    assert again["id"] == job["id"]
+    assert again["attempts"] == 2
+
+
+def test_job_out_of_attempts_is_failed(store, monkeypatch):
+    monkeypatch.setattr(job_store.settings, "JOBS_LEASE_SECONDS", -1.0)
+    monkeypatch.setattr(job_store.settings, "JOBS_MAX_ATTEMPTS", 2)
+    job = store.create(REQUEST, "batch")
+
+    assert store.claim()["attempts"] == 1
+    assert store.claim()["attempts"] == 2
+    assert store.claim() is None
+
+    failed = store.get(job["id"])
+    assert failed["status"] == JOB_FAILED
+    assert "abandoned" in failed["error"]["detail"]
+
+
+def test_released_job_is_requeued_without_using_an_attempt(store):
+    job = store.create(REQUEST, "batch")
+    store.claim()
+    store.release(job["id"])
+
+    assert store.get(job["id"])["status"] == JOB_QUEUED
+    assert store.claim()["attempts"] == 1
+
+
+def test_cancelled_job_cannot_be_renewed_or_finished(store):
+    job = store.create(REQUEST, "batch")
+    store.claim()
+    store.cancel(job["id"])
+
+    assert not store.renew(job["id"])
+    assert not store.finish(job["id"], result={"content": "late"})
+    assert store.get(job["id"])["status"] == JOB_CANCELLED
+
+
+def test_finished_job_expires(store, monkeypatch):
+    job = store.create(REQUEST, "batch")
+    store.claim()
+    assert store.finish(job["id"], result={"content": "ok"})
+    assert store.get(job["id"])["status"] == JOB_SUCCEEDED
+
+    monkeypatch.setattr(job_store.settings, "JOBS_RESULT_TTL", -1.0)
+    other = store.create(REQUEST, "batch")
+    store.claim()
+    store.finish(other["id"], result={"content": "ok"})
+
+    assert store.get(other["id"]) is None
+    assert store.purge() == 1
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.manifest.system import system_state
+from app.routes.config import SetupConfigRequest, setup_config
+from app.services import clients, llm
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class _Body(httpx.AsyncByteStream):
+    # Unread until consumed, like a network response
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+def _respond(data) -> httpx.Response:
+    if isinstance(data, list):
+        content = "\n".join(json.dumps(line) for line in data)
+    else:
+        content = json.dumps(data)
+    return httpx.Response(200, stream=_Body(content.encode()))
+
+
+@pytest.fixture
+def local_server(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        body = json.loads(request.content)
+
+        if request.url.path == "/v1/chat/completions":
+            return _respond({
+                "choices": [{"message": {"content": "openai reply"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 2},
+            })
+
+        assert request.url.path == "/api/chat"
+        if not body["stream"]:
+            return _respond({
+                "message": {"content": "ollama reply"},
+                "done": True, "prompt_eval_count": 1, "eval_count": 2,
+            })
+
+        return _respond([
+            {"message": {"content": "a"}, "done": False},
+            {"message": {"content": "b"}, "done": False},
+            {"done": True, "prompt_eval_count": 1, "eval_count": 2},
+        ])
+
+    monkeypatch.setitem(
+        clients._clients, "local", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(llm.settings, "LOCAL_BASE_URL", "http://ollama.test")
+    return requests
+
+
+def test_ollama_call_and_stream_without_key(local_server):
+    async def run():
+        reply = await llm.call_llm("local", "llama3", None, MESSAGES, cache="bypass")
+        events = await llm.stream_llm("local", "llama3", None, MESSAGES, cache="bypass")
+        return reply, [event async for event in events]
+
+    reply, events = asyncio.run(run())
+
+    assert reply == "ollama reply"
+    assert [e["content"] for e in events if e["type"] == "token"] == ["a", "b"]
+    assert events[-1]["type"] == "done"
+    assert all("authorization" not in r.headers for r in local_server)
+
+
+def test_openai_compatible_server(local_server, monkeypatch):
+    monkeypatch.setattr(llm.settings, "LOCAL_BASE_URL", "http://vllm.test/v1")
+
+    reply = asyncio.run(llm.call_llm("local", "qwen", None, MESSAGES, cache="bypass"))
+
+    assert reply == "openai reply"
+    assert str(local_server[0].url) == "http://vllm.test/v1/chat/completions"
+
+
+def test_setup_without_key_only_for_keyless_providers():
+    setup_config(SetupConfigRequest(provider="local", model_id="llama3"))
+    assert system_state.configured
+
+    with pytest.raises(HTTPException) as e:
+        setup_config(SetupConfigRequest(provider="groq", model_id="m", api_key=" "))
+    assert e.value.status_code == 400
@@ -0,0 +1,89 @@
+import json
+import sqlite3
+
+from app.persistence.backends import SQLiteBackend
+from app.persistence.cache import CachedJSONFile
+
+
+def test_write_equal_to_stale_copy_is_not_skipped(tmp_path):
+    path = tmp_path / "config.json"
+    ours = CachedJSONFile(path, revalidate_after=3600)
+    theirs = CachedJSONFile(path, revalidate_after=3600)
+
+    ours.write({"model": "a"})
+    assert ours.read() == {"model": "a"}
+
+    # Another process changes the file inside our revalidation window
+    theirs.write({"model": "b"})
+
+    assert ours.write({"model": "a"}) is True
+    assert json.loads(path.read_text()) == {"model": "a"}
+
+
+def test_unchanged_write_is_skipped(tmp_path):
+    cached = CachedJSONFile(tmp_path / "config.json", revalidate_after=3600)
+
+    assert cached.write({"model": "a"}) is True
+    assert cached.write({"model": "a"}) is False
+
+
+def test_reads_are_private_copies(tmp_path):
+    cached = CachedJSONFile(tmp_path / "config.json")
+    cached.write({"models": {}})
+
+    cached.read()["models"]["x"] = {}
+    assert cached.read() == {"models": {}}
+
+
+def test_sqlite_versions_increase_across_keys(tmp_path):
+    store = SQLiteBackend(tmp_path / "store.db")
+
+    assert store.write("a", 1) is True
+    assert store.write("b", 1) is True
+    first_a, first_b = store.version("a"), store.version("b")
+
+    assert store.write("a", 1) is False
+    assert store.version("a") == first_a
+
+    store.write("a", 2)
+    assert store.version("a") > first_b > first_a
+
+
+def test_sqlite_delete_leaves_a_tombstone(tmp_path):
+    path = tmp_path / "store.db"
+    store = SQLiteBackend(path)
+
+    store.write("config", {"model": "a"})
+    before = store.version("config")
+    store.delete("config")
+
+    assert store.read("config") is None
+    assert store.version("config") > before
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT value FROM kv WHERE key = 'config'").fetchone() == (None,)
+
+
+def test_sqlite_version_check_sees_other_processes(tmp_path):
+    path = tmp_path / "store.db"
+    ours = SQLiteBackend(path, revalidate_after=3600)
+    theirs = SQLiteBackend(path, revalidate_after=3600)
+
+    ours.write("config", {"model": "a"})
+    theirs.write("config", {"model": "b"})
+
+    # Cached inside the revalidation window until the version moves
+    assert ours.read("config") == {"model": "a"}
+    assert ours.version("config") == theirs.version("config")
+    assert ours.read("config") == {"model": "b"}
+
+
+def test_sqlite_imports_a_legacy_file_once(tmp_path):
+    legacy = tmp_path / "config.json"
+    legacy.write_text(json.dumps({"model": "legacy"}))
+    store = SQLiteBackend(tmp_path / "store.db", legacy_paths={"config": legacy})
+
+    assert store.read("config") == {"model": "legacy"}
+
+    legacy.write_text(json.dumps({"model": "edited"}))
+    fresh = SQLiteBackend(tmp_path / "store.db", legacy_paths={"config": legacy})
+    assert fresh.read("config") == {"model": "legacy"}
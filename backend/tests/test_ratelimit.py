@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.ratelimit import AdaptiveConcurrency, ProviderLimiter
+
+
+def test_cancelled_acquire_refunds_its_reservation():
+    limiter = ProviderLimiter("test", rpm=60, tpm=6000, max_concurrency=1)
+
+    async def run():
+        held = await limiter.acquire(100)
+        waiting = asyncio.ensure_future(limiter.acquire(100))
+        await asyncio.sleep(0.01)
+        assert limiter.queued == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await held.release()
+
+    asyncio.run(run())
+
+    # Only the permit that was used keeps its request and tokens
+    assert limiter.requests.available() == pytest.approx(59, abs=0.1)
+    assert limiter.tokens.available() == pytest.approx(5900, abs=10)
+    assert limiter.queued == 0
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_rejected_acquire_refunds_its_reservation(monkeypatch):
+    monkeypatch.setattr("app.services.ratelimit.settings.RATE_LIMIT_MAX_WAIT", 1.0)
+    limiter = ProviderLimiter("test", rpm=1, tpm=0)
+
+    async def run():
+        await (await limiter.acquire(0)).release()
+        with pytest.raises(HTTPException) as e:
+            await limiter.acquire(0)
+        return e.value
+
+    error = asyncio.run(run())
+
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+    assert limiter.rejected == 1
+    assert limiter.requests.available() == pytest.approx(0, abs=0.1)
+
+
+def test_permit_release_is_idempotent():
+    limiter = ProviderLimiter("test", rpm=0, tpm=0)
+
+    async def run():
+        permit = await limiter.acquire(0)
+        await permit.release()
+        await permit.release()
+
+    asyncio.run(run())
+
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_aimd_halves_on_throttle_and_backs_off_on_slow_responses():
+    concurrency = AdaptiveConcurrency(initial=8, minimum=1, maximum=16)
+
+    async def call(latency, throttled=False):
+        await concurrency.acquire()
+        await concurrency.release(latency, throttled)
+
+    async def run():
+        await call(0.1)
+        await call(0.1)
+        grown = concurrency.limit
+        await call(None, throttled=True)
+        halved = concurrency.limit
+        await call(10.0)
+        return grown, halved, concurrency.limit
+
+    grown, halved, slowed = asyncio.run(run())
+
+    assert grown == pytest.approx(8 + 1 / 8)
+    assert halved == pytest.approx(grown / 2)
+    assert slowed == pytest.approx(halved * 0.9)
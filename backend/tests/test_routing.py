@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.services import routing
+from app.services.clients import upstream_timing
+from app.services.routing import LatencyTracker, rank_candidates, route
+
+
+def _entry(model, **extra):
+    return {"provider": "groq", "model": model, **extra}
+
+
+def test_predict_fits_overhead_and_throughput():
+    tracker = LatencyTracker(alpha=0.2)
+    for _ in range(10):
+        for tokens in (100, 1000, 4000):
+            tracker.record("m", 0.2 + 0.001 * tokens, tokens)
+
+    assert tracker.predict("m", 2000) == pytest.approx(2.2, rel=0.01)
+    assert tracker.predict("unknown", 2000) is None
+
+
+def test_predict_without_prompt_spread_is_the_average():
+    tracker = LatencyTracker(alpha=0.5)
+    tracker.record("m", 1.0, 500)
+    tracker.record("m", 3.0, 500)
+
+    assert tracker.predict("m", 5000) == pytest.approx(2.0)
+
+
+def test_rank_candidates_orders_by_class():
+    tracker = LatencyTracker()
+    tracker.record("slow", 2.0, 100)
+    tracker.record("fast", 0.5, 100)
+    models = {"slow": _entry("rank-slow"), "fast": _entry("rank-fast")}
+
+    order, reason, _ = rank_candidates(models, ["slow", "fast"], 100, "fast", tracker)
+    assert (order, reason) == (["fast", "slow"], "fastest")
+
+    order, reason, _ = rank_candidates(models, ["slow", "fast"], 100, "quality", tracker)
+    assert (order, reason) == (["slow", "fast"], "quality requested")
+
+
+def test_rank_candidates_puts_unusable_models_last():
+    tracker = LatencyTracker()
+    models = {"down": _entry("rank-down", auth_ok=False), "up": _entry("rank-up")}
+
+    order, reason, _ = rank_candidates(models, ["down", "up"], 100, "fast", tracker)
+
+    assert order == ["up", "down"]
+    assert reason.endswith("down skipped")
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_route_records_upstream_time_in_the_matching_tracker(stream):
+    model_id = f"route-{stream}"
+    models = {model_id: _entry(model_id)}
+
+    async def call(entry):
+        # Time spent here (queueing, context) must not count
+        await asyncio.sleep(0.05)
+        upstream_timing.get().seconds = 0.01
+        return "reply"
+
+    result, winner = asyncio.run(route(models, model_id, call, stream=stream))
+
+    recorded = routing.stream_latency_tracker if stream else routing.latency_tracker
+    other = routing.latency_tracker if stream else routing.stream_latency_tracker
+    assert (result, winner) == ("reply", model_id)
+    assert recorded.stats()[model_id]["ewma_ms"] == 10.0
+    assert model_id not in other.stats()
+
+
+def test_route_skips_calls_that_made_no_upstream_request():
+    models = {"b": _entry("route-none")}
+
+    async def call(entry):
+        return "cached"
+
+    asyncio.run(route(models, "b", call))
+
+    assert "b" not in routing.latency_tracker.stats()
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_VERIFY,
+    Scheduler,
+    _Class,
+    priority_from_headers,
+)
+
+
+@pytest.mark.parametrize("header, default, expected", [
+    ("batch", PRIORITY_INTERACTIVE, PRIORITY_BATCH),
+    (" Batch ", PRIORITY_INTERACTIVE, PRIORITY_BATCH),
+    ("interactive", PRIORITY_BATCH, PRIORITY_BATCH),
+    ("verify", PRIORITY_INTERACTIVE, PRIORITY_INTERACTIVE),
+    ("verify", PRIORITY_BATCH, PRIORITY_BATCH),
+    ("batch", PRIORITY_VERIFY, PRIORITY_VERIFY),
+    ("urgent", PRIORITY_INTERACTIVE, PRIORITY_INTERACTIVE),
+    ("", PRIORITY_BATCH, PRIORITY_BATCH),
+])
+def test_priority_header_can_only_lower_the_default(header, default, expected):
+    assert priority_from_headers({"x-priority": header}, default) == expected
+
+
+def _scheduler(max_queue: int = 100, deadline: float = 5.0) -> Scheduler:
+    return Scheduler(1, {
+        PRIORITY_INTERACTIVE: _Class(PRIORITY_INTERACTIVE, 8.0, max_queue, deadline),
+        PRIORITY_BATCH: _Class(PRIORITY_BATCH, 1.0, max_queue, deadline),
+    })
+
+
+def test_full_queue_is_shed():
+    scheduler = _scheduler(max_queue=1)
+
+    async def run():
+        held = await scheduler.acquire(PRIORITY_BATCH)
+        queued = asyncio.ensure_future(scheduler.acquire(PRIORITY_BATCH))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as e:
+            await scheduler.acquire(PRIORITY_BATCH)
+
+        held.release()
+        (await queued).release()
+        return e.value
+
+    error = asyncio.run(run())
+
+    assert error.status_code == 503
+    assert scheduler.classes[PRIORITY_BATCH].shed == 1
+    assert scheduler.in_flight == 0
+
+
+def test_queue_wait_past_the_deadline_is_shed():
+    scheduler = _scheduler(deadline=0.05)
+
+    async def run():
+        held = await scheduler.acquire(PRIORITY_BATCH)
+        try:
+            await scheduler.acquire(PRIORITY_BATCH)
+        finally:
+            held.release()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run())
+
+    assert not scheduler.classes[PRIORITY_BATCH].queue
+    assert scheduler.in_flight == 0
+
+
+def test_queued_classes_share_slots_by_weight():
+    scheduler = _scheduler()
+    order = []
+
+    async def request(priority):
+        slot = await scheduler.acquire(priority)
+        order.append(priority)
+        await asyncio.sleep(0)
+        slot.release()
+
+    async def run():
+        held = await scheduler.acquire(PRIORITY_BATCH)
+        tasks = [
+            asyncio.ensure_future(request(priority))
+            for _ in range(16)
+            for priority in (PRIORITY_BATCH, PRIORITY_INTERACTIVE)
+        ]
+        await asyncio.sleep(0)
+        held.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    # 8:1 while both are queued: the first 9 grants hold one batch call
+    assert order[:9].count(PRIORITY_BATCH) == 1
+    assert len(order) == 32
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import clients, llm
+from app.services.singleflight import SingleFlight
+
+MESSAGES = [{"role": "user", "content": "same question"}]
+
+
+class _Body(httpx.AsyncByteStream):
+    # Unread until consumed, like a network response
+    def __init__(self, data: str):
+        self.data = data.encode()
+
+    async def __aiter__(self):
+        yield self.data
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        if json.loads(request.content).get("stream"):
+            chunk = {"choices": [{"delta": {"content": "shared"}}]}
+            body = f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n"
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=_Body(body))
+        body = json.dumps({"choices": [{"message": {"content": "shared"}}]})
+        return httpx.Response(200, stream=_Body(body))
+
+    monkeypatch.setattr(llm.settings, "SINGLEFLIGHT_ENABLED", True)
+    monkeypatch.setitem(
+        clients._clients, "groq", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return requests
+
+
+def test_identical_concurrent_calls_share_one_upstream_request(upstream):
+    coalesced = llm.call_flight.coalesced
+
+    async def run():
+        return await asyncio.gather(*(
+            llm.call_llm("groq", "m", "flight-key", MESSAGES, cache="bypass")
+            for _ in range(5)
+        ))
+
+    assert asyncio.run(run()) == ["shared"] * 5
+    assert len(upstream) == 1
+    assert llm.call_flight.coalesced - coalesced == 4
+    assert llm.call_flight.in_flight() == 0
+
+
+def test_identical_concurrent_streams_share_one_upstream_request(upstream):
+    async def read():
+        events = await llm.stream_llm("groq", "m", "flight-key", MESSAGES, cache="bypass")
+        return [event["content"] async for event in events if event["type"] == "token"]
+
+    async def run():
+        return await asyncio.gather(read(), read(), read())
+
+    assert asyncio.run(run()) == [["shared"]] * 3
+    assert len(upstream) == 1
+    assert llm.stream_flight.in_flight() == 0
+
+
+def test_callers_share_the_error_and_leaving_keeps_the_call_for_others():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    async def run():
+        leaving = asyncio.ensure_future(flight.do("k", fail))
+        staying = [asyncio.ensure_future(flight.do("k", fail)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leaving.cancel()
+        return await asyncio.gather(*staying, return_exceptions=True)
+
+    errors = asyncio.run(run())
+
+    assert calls == [1]
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flight.in_flight() == 0
+
+
+def test_call_is_cancelled_once_every_caller_left():
+    flight = SingleFlight()
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(10)
+
+    async def run():
+        callers = [asyncio.ensure_future(flight.do("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert started == [1]
+    assert flight.in_flight() == 0
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import clients, llm
+from app.services.ratelimit import get_limiter
+from app.services.scheduler import scheduler
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class _Body(httpx.AsyncByteStream):
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        for token in ("a", "b", "c"):
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        body = _Body()
+        bodies.append(body)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=body)
+
+    monkeypatch.setitem(
+        clients._clients, "groq", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return bodies
+
+
+@pytest.mark.parametrize("singleflight", [True, False])
+def test_stream_closed_before_first_read_releases_everything(upstream, monkeypatch, singleflight):
+    monkeypatch.setattr(llm.settings, "SINGLEFLIGHT_ENABLED", singleflight)
+    api_key = f"key-{singleflight}"
+
+    async def run():
+        events = await llm.stream_llm("groq", "m", api_key, MESSAGES)
+        await events.aclose()
+        # Let the shared producer see the cancellation
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert get_limiter("groq", api_key).concurrency.in_flight == 0
+    assert scheduler.in_flight == 0
+    assert llm.stream_flight.in_flight() == 0
+    assert [body.closed for body in upstream] == [True]
+
+
+def test_stream_read_to_the_end_releases_everything(upstream):
+    async def run():
+        events = await llm.stream_llm("groq", "m", "key-full", MESSAGES)
+        return [event async for event in events]
+
+    events = asyncio.run(run())
+
+    assert [e["content"] for e in events if e["type"] == "token"] == ["a", "b", "c"]
+    assert events[-1]["type"] == "done"
+    assert get_limiter("groq", "key-full").concurrency.in_flight == 0
+    assert scheduler.in_flight == 0
+    assert llm.stream_flight.in_flight() == 0
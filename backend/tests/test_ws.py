@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import ws
+
+
+def test_unexpected_stream_failure_ends_the_stream_with_an_error(monkeypatch):
+    async def stream_chat(req, cache, priority):
+        raise RuntimeError("POST https://internal.example/v1 failed")
+
+    monkeypatch.setattr(ws, "stream_chat", stream_chat)
+    request = {"messages": [{"role": "user", "content": "hi"}]}
+
+    with TestClient(app).websocket_connect("/ws") as socket:
+        assert socket.receive_json()["type"] == "state"
+        socket.send_json({"type": "chat", "id": "s1", "request": request})
+
+        frame = socket.receive_json()
+        while frame["type"] == "state":
+            frame = socket.receive_json()
+
+    assert frame == {
+        "type": "error", "id": "s1", "status": 502, "detail": "Unexpected provider error",
+    }
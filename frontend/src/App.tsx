@@ -48,6 +48,9 @@ function App() {
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
+  // Server-side conversation: only new messages are sent each turn
+  const conversationIdRef = useRef<string | null>(null);
+
   // ✅ SINGLE SOURCE OF TRUTH
   const chatEnabled =
   state?.configured === true &&
@@ -57,7 +60,8 @@ function App() {
 
 
 
-  const contextLoad = 0;
+  // Share of the model's context budget used by the last request
+  const [contextLoad, setContextLoad] = useState(0);
 
   /* =========================
      Effects
@@ -86,30 +90,64 @@ function App() {
 
     setMessages((prev) => [...prev, userMessage]);
 
+    const assistantId = crypto.randomUUID();
+
+    setMessages((prev) => [
+      ...prev,
+      {
+        id: assistantId,
+        role: 'assistant',
+        content: '',
+        timestamp: new Date(),
+      },
+    ]);
+
+    // Append streamed tokens to the placeholder assistant message
+    const appendToken = (token: string) =>
+      setMessages((prev) =>
+        prev.map((msg) =>
+          msg.id === assistantId
+            ? { ...msg, content: msg.content + token }
+            : msg
+        )
+      );
+
     try {
-      const res = await api.chat({
-        messages: [{ role: 'user', content }],
-      });
+      if (!conversationIdRef.current) {
+        const conversation = await api.createConversation();
+        conversationIdRef.current = conversation.id;
+      }
 
-      setMessages((prev) => [
-        ...prev,
+      // History lives on the server, which trims it to the model's budget
+      const result = await api.chat(
         {
-          id: crypto.randomUUID(),
-          role: 'assistant',
-          content: res.content,
-          timestamp: new Date(),
+          conversation_id: conversationIdRef.current,
+          messages: [{ role: 'user', content }],
         },
-      ]);
+        appendToken
+      );
+
+      if (result.context && result.context.budget > 0) {
+        setContextLoad(
+          Math.min(
+            100,
+            Math.round(
+              (result.context.prompt_tokens / result.context.budget) * 100
+            )
+          )
+        );
+      }
     } catch {
-      setMessages((prev) => [
-        ...prev,
-        {
-          id: crypto.randomUUID(),
-          role: 'assistant',
-          content: '⚠️ Chat disabled due to authentication error.',
-          timestamp: new Date(),
-        },
-      ]);
+      setMessages((prev) =>
+        prev.map((msg) =>
+          msg.id === assistantId
+            ? {
+                ...msg,
+                content: '⚠️ Chat disabled due to authentication error.',
+              }
+            : msg
+        )
+      );
     }
   };
 
@@ -27,6 +27,9 @@ export function useAppConfig() {
       .finally(() => setLoading(false));
   }, []);
 
+  // Follow state changes pushed by the server
+  useEffect(() => api.onStatus(setState), []);
+
   // Register auth sync ONCE
   useEffect(() => {
     registerAuthSync(refresh);
@@ -13,6 +13,45 @@ async function request<T>(path: string, options?: RequestInit): Promise<T> {
 
   return res.json();
 }
+type ModelInfo = { id: string; name: string };
+
+export interface SystemStatus {
+  configured: boolean;
+  provider: string | null;
+  model: string | null;
+  display_name: string | null;
+  auth_ok: boolean | null;
+  api_key_present: boolean;
+}
+
+// Last /models response per provider, revalidated with its ETag
+const modelsCache = new Map<string, { etag: string; models: ModelInfo[] }>();
+
+async function getModels(provider: string): Promise<ModelInfo[]> {
+  const cached = modelsCache.get(provider);
+
+  const res = await fetch(
+    `${BASE_URL}/models?provider=${encodeURIComponent(provider)}`,
+    { headers: cached ? { 'If-None-Match': cached.etag } : {} }
+  );
+
+  if (res.status === 304 && cached) {
+    return cached.models;
+  }
+
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(text || `Request failed: ${res.status}`);
+  }
+
+  const models: ModelInfo[] = await res.json();
+  const etag = res.headers.get('ETag');
+  if (etag) {
+    modelsCache.set(provider, { etag, models });
+  }
+  return models;
+}
+
 let onAuthStateChange: (() => Promise<void>) | null = null;
 
 export const registerAuthSync = (fn: () => Promise<void>) => {
@@ -21,24 +60,18 @@ export const registerAuthSync = (fn: () => Promise<void>) => {
 
 export const api = {
   // System
-  getStatus: () =>
-    request<{
-      configured: boolean;
-      provider: string | null;
-      model: string | null;
-      display_name: string | null;
-      auth_ok: boolean | null;
-      api_key_present: boolean;
-    }>('/status'),
+  getStatus: () => request<SystemStatus>('/status'),
+
+  // SystemState pushed over the shared WebSocket whenever it changes;
+  // returns an unsubscribe function
+  onStatus: (listener: (status: SystemStatus) => void) =>
+    chatSocket.subscribe(listener),
 
   // Providers / Models
   getProviders: () =>
     request<{ id: string; name: string }[]>('/providers'),
 
-  getModels: (provider: string) =>
-    request<{ id: string; name: string }[]>(
-      `/models?provider=${provider}`
-    ),
+  getModels,
 
   // Config
   setup: (payload: {
@@ -68,15 +101,33 @@ export const api = {
       }),
     
 
-  // Chat
-  chat: async (payload: {
-    messages: { role: string; content: string }[];
-  }) => {
-    try {
-      return await request<{ content: string }>('/chat', {
+  // Conversations (history kept server-side)
+  createConversation: (payload: { title?: string } = {}) =>
+    request<{ id: string; title: string | null; message_count: number }>(
+      '/conversations',
+      {
         method: 'POST',
         body: JSON.stringify(payload),
-      });
+      }
+    ),
+
+  // Chat
+  chat: async (
+    payload: {
+      messages: { role: string; content: string }[];
+      conversation_id?: string;
+    },
+    onToken?: (token: string) => void,
+    signal?: AbortSignal
+  ) => {
+    try {
+      // Multiplexed on the shared WebSocket; a plain HTTP stream if
+      // the socket can't be opened
+      const socket = await chatSocket.connect().catch(() => null);
+      if (socket) {
+        return await chatSocket.stream(socket, payload, onToken, signal);
+      }
+      return await streamChat(payload, onToken);
     } catch (err) {
       // auth may have changed → resync once
       if (onAuthStateChange) {
@@ -85,4 +136,250 @@ export const api = {
       throw err;
     }
   },
-}  
+}
+
+export interface ContextReport {
+  prompt_tokens: number;
+  budget: number;
+  trimmed_messages: number;
+  trimmed_tokens: number;
+  summarized: boolean;
+}
+
+export interface ChatStreamResult {
+  content: string;
+  usage: Record<string, number> | null;
+  timing: { ttft_ms: number | null; total_ms: number };
+  context: ContextReport | null;
+}
+
+// POST /chat/stream and parse the Server-Sent Events as they arrive
+async function streamChat(
+  payload: {
+    messages: { role: string; content: string }[];
+    conversation_id?: string;
+  },
+  onToken?: (token: string) => void
+): Promise<ChatStreamResult> {
+  const res = await fetch(`${BASE_URL}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  });
+
+  if (!res.ok || !res.body) {
+    const text = await res.text();
+    throw new Error(text || `Request failed: ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+
+  let buffer = '';
+  let content = '';
+  let result: ChatStreamResult | null = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const parsed = JSON.parse(data);
+
+      if (event === 'token') {
+        content += parsed.content;
+        onToken?.(parsed.content);
+      } else if (event === 'done') {
+        result = {
+          content,
+          usage: parsed.usage,
+          timing: parsed.timing,
+          context: parsed.context ?? null,
+        };
+      } else if (event === 'error') {
+        throw new Error(parsed.detail || `Stream failed: ${parsed.status}`);
+      }
+    }
+  }
+
+  return (
+    result ?? {
+      content,
+      usage: null,
+      timing: { ttft_ms: null, total_ms: 0 },
+      context: null,
+    }
+  );
+}
+
+const WS_URL = `${BASE_URL.replace(/^http/, 'ws')}/ws`;
+
+interface PendingStream {
+  content: string;
+  onToken?: (token: string) => void;
+  resolve: (result: ChatStreamResult) => void;
+  reject: (err: Error) => void;
+}
+
+// Frames sent by the server on /ws
+type ServerFrame =
+  | { type: 'state'; state: SystemStatus }
+  | { type: 'start'; id: string; model_id: string }
+  | { type: 'token'; id: string; content: string }
+  | {
+      type: 'done';
+      id: string;
+      usage: Record<string, number> | null;
+      timing: ChatStreamResult['timing'];
+      context?: ContextReport | null;
+    }
+  | { type: 'error'; id: string | null; status: number; detail: unknown }
+  | { type: 'cancelled'; id: string };
+
+// One persistent WebSocket carrying every chat stream (by stream id)
+// and the server's SystemState pushes
+class ChatSocket {
+  private socket: WebSocket | null = null;
+  private opening: Promise<WebSocket> | null = null;
+  private streams = new Map<string, PendingStream>();
+  private listeners = new Set<(status: SystemStatus) => void>();
+  private nextId = 0;
+  private retryDelay = 1000;
+
+  connect(): Promise<WebSocket> {
+    if (this.socket) {
+      return Promise.resolve(this.socket);
+    }
+
+    if (!this.opening) {
+      this.opening = new Promise((resolve, reject) => {
+        const socket = new WebSocket(WS_URL);
+
+        socket.onopen = () => {
+          this.socket = socket;
+          this.opening = null;
+          this.retryDelay = 1000;
+          resolve(socket);
+        };
+
+        socket.onmessage = (e) => this.handleFrame(JSON.parse(e.data));
+
+        socket.onclose = () => {
+          if (this.socket !== socket) {
+            // Never opened
+            this.opening = null;
+            reject(new Error('WebSocket unavailable'));
+            this.reconnect();
+            return;
+          }
+
+          this.socket = null;
+          for (const stream of this.streams.values()) {
+            stream.reject(new Error('Connection lost'));
+          }
+          this.streams.clear();
+          this.reconnect();
+        };
+      });
+    }
+
+    return this.opening;
+  }
+
+  stream(
+    socket: WebSocket,
+    payload: {
+      messages: { role: string; content: string }[];
+      conversation_id?: string;
+    },
+    onToken?: (token: string) => void,
+    signal?: AbortSignal
+  ): Promise<ChatStreamResult> {
+    const id = String(++this.nextId);
+
+    return new Promise((resolve, reject) => {
+      this.streams.set(id, { content: '', onToken, resolve, reject });
+      socket.send(JSON.stringify({ type: 'chat', id, request: payload }));
+
+      // Stops the upstream request too
+      signal?.addEventListener('abort', () => {
+        if (this.streams.has(id)) {
+          socket.send(JSON.stringify({ type: 'cancel', id }));
+        }
+      });
+    });
+  }
+
+  subscribe(listener: (status: SystemStatus) => void): () => void {
+    this.listeners.add(listener);
+    this.connect().catch(() => {});
+
+    return () => {
+      this.listeners.delete(listener);
+    };
+  }
+
+  private handleFrame(frame: ServerFrame) {
+    if (frame.type === 'state') {
+      this.listeners.forEach((listener) => listener(frame.state));
+      return;
+    }
+
+    const stream = frame.id !== null ? this.streams.get(frame.id) : undefined;
+    if (!stream) return;
+
+    if (frame.type === 'token') {
+      stream.content += frame.content;
+      stream.onToken?.(frame.content);
+    } else if (frame.type === 'done') {
+      this.streams.delete(frame.id);
+      stream.resolve({
+        content: stream.content,
+        usage: frame.usage,
+        timing: frame.timing,
+        context: frame.context ?? null,
+      });
+    } else if (frame.type === 'error') {
+      this.streams.delete(frame.id as string);
+      stream.reject(
+        new Error(
+          typeof frame.detail === 'string'
+            ? frame.detail
+            : `Stream failed: ${frame.status}`
+        )
+      );
+    } else if (frame.type === 'cancelled') {
+      this.streams.delete(frame.id);
+      stream.reject(new DOMException('Chat cancelled', 'AbortError'));
+    }
+  }
+
+  // Keep state pushes coming while anyone listens (backing off)
+  private reconnect() {
+    if (this.listeners.size === 0) return;
+
+    const delay = this.retryDelay;
+    this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+    setTimeout(() => {
+      this.connect().catch(() => {});
+    }, delay);
+  }
+}
+
+const chatSocket = new ChatSocket();